@@ -6,18 +6,25 @@ sys.path.append("/home/ju/Workspace/gello_software")
 import tyro
 
 from gello.cameras.realsense_camera import RealSenseCamera, get_device_ids
-from gello.zmq_core.camera_node import ZMQServerCamera
+from gello.zmq_core.camera_node import ZMQPublisherCamera, ZMQServerCamera
 
 
 @dataclass
 class Args:
     hostname: str = "127.0.0.1"
     # hostname: str = "128.32.175.167"
+    stream: bool = False
+    """Publish frames on the camera clock instead of serving requests."""
+    threaded_capture: bool = False
+    """Capture frames on a background thread so reads return the newest frame."""
 
 
 def launch_server(port: int, camera_id: int, args: Args):
-    camera = RealSenseCamera(camera_id)
-    server = ZMQServerCamera(camera, port=port, host=args.hostname)
+    camera = RealSenseCamera(camera_id, threaded=args.threaded_capture)
+    if args.stream:
+        server = ZMQPublisherCamera(camera, port=port, host=args.hostname)
+    else:
+        server = ZMQServerCamera(camera, port=port, host=args.hostname)
     print(f"Starting camera server on port {port}")
     server.serve()
 
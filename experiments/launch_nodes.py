@@ -1,5 +1,7 @@
+import threading
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import tyro
 import sys
@@ -12,12 +14,34 @@ from gello.zmq_core.robot_node import ZMQServerRobot
 class Args:
     robot: str = "bimanual_ur"
     robot_port: int = 6001
+    """Port of the robot server. Clients negotiate the wire protocol on it and
+    fall back to pickle for servers started before the binary protocol."""
     hostname: str = "127.0.0.1"
     robot_ip: str = "192.168.123.100"
+    split_bimanual: bool = False
+    """Serve each arm of bimanual_ur on its own port (robot_port, robot_port + 1)."""
+    publish_port: Optional[int] = None
+    """Also stream observations on this port for streaming clients."""
+    continuous_gripper: bool = False
+    """Follow the GELLO gripper proportionally instead of toggling open/closed (ur)."""
+    sim_headless: bool = False
+    """Run the sim_* robots without the viewer."""
+    sim_lock_step: bool = False
+    """Advance the sim_* physics only when a joint command arrives."""
+    sim_substeps: int = 1
+    """Physics steps of the sim_* robots per command or loop tick."""
+    sim_real_time_factor: Optional[float] = 1.0
+    """Speed of a free-running headless sim, None for as fast as possible."""
 
 
 def launch_robot_server(args: Args):
     port = args.robot_port
+    sim_kwargs = dict(
+        headless=args.sim_headless,
+        lock_step=args.sim_lock_step,
+        n_substeps=args.sim_substeps,
+        real_time_factor=args.sim_real_time_factor,
+    )
     if args.robot == "sim_ur":
         MENAGERIE_ROOT: Path = (
             Path(__file__).parent.parent / "third_party" / "mujoco_menagerie"
@@ -27,7 +51,11 @@ def launch_robot_server(args: Args):
         from gello.robots.sim_robot import MujocoRobotServer
 
         server = MujocoRobotServer(
-            xml_path=xml, gripper_xml_path=gripper_xml, port=port, host=args.hostname
+            xml_path=xml,
+            gripper_xml_path=gripper_xml,
+            port=port,
+            host=args.hostname,
+            **sim_kwargs,
         )
         server.serve()
     elif args.robot == "sim_yam":
@@ -38,7 +66,11 @@ def launch_robot_server(args: Args):
         from gello.robots.sim_robot import MujocoRobotServer
 
         server = MujocoRobotServer(
-            xml_path=xml, gripper_xml_path=None, port=port, host=args.hostname
+            xml_path=xml,
+            gripper_xml_path=None,
+            port=port,
+            host=args.hostname,
+            **sim_kwargs,
         )
         server.serve()
     elif args.robot == "sim_panda":
@@ -50,7 +82,11 @@ def launch_robot_server(args: Args):
         xml = MENAGERIE_ROOT / "franka_emika_panda" / "panda.xml"
         gripper_xml = None
         server = MujocoRobotServer(
-            xml_path=xml, gripper_xml_path=gripper_xml, port=port, host=args.hostname
+            xml_path=xml,
+            gripper_xml_path=gripper_xml,
+            port=port,
+            host=args.hostname,
+            **sim_kwargs,
         )
         server.serve()
     elif args.robot == "sim_xarm":
@@ -62,7 +98,11 @@ def launch_robot_server(args: Args):
         xml = MENAGERIE_ROOT / "ufactory_xarm7" / "xarm7.xml"
         gripper_xml = None
         server = MujocoRobotServer(
-            xml_path=xml, gripper_xml_path=gripper_xml, port=port, host=args.hostname
+            xml_path=xml,
+            gripper_xml_path=gripper_xml,
+            port=port,
+            host=args.hostname,
+            **sim_kwargs,
         )
         server.serve()
 
@@ -74,7 +114,9 @@ def launch_robot_server(args: Args):
         elif args.robot == "ur":
             from gello.robots.ur import URRobot
 
-            robot = URRobot(robot_ip=args.robot_ip)
+            robot = URRobot(
+                robot_ip=args.robot_ip, continuous_gripper=args.continuous_gripper
+            )
         elif args.robot == "panda":
             from gello.robots.panda import PandaRobot
 
@@ -83,9 +125,16 @@ def launch_robot_server(args: Args):
             from gello.robots.ur import URRobot
 
             # IP for the bimanual robot setup is hardcoded
-            _robot_l = URRobot(robot_ip="192.168.123.101",no_gripper=False,gripper_type='chingtek')
-            _robot_r = URRobot(robot_ip="192.168.123.100",no_gripper=False,gripper_type='dh')
-            robot = BimanualRobot(_robot_l, _robot_r)
+            _robot_l = URRobot(robot_ip="192.168.123.101",no_gripper=False,gripper_type='chingtek',continuous_gripper=args.continuous_gripper)
+            _robot_r = URRobot(robot_ip="192.168.123.100",no_gripper=False,gripper_type='dh',continuous_gripper=args.continuous_gripper)
+            if args.split_bimanual:
+                # one server per arm lets the client step both arms concurrently
+                server_r = ZMQServerRobot(_robot_r, port=port + 1, host=args.hostname)
+                threading.Thread(target=server_r.serve, daemon=True).start()
+                print(f"Starting right arm robot server on port {port + 1}")
+                robot = _robot_l
+            else:
+                robot = BimanualRobot(_robot_l, _robot_r)
         elif args.robot == "yam":
             from gello.robots.yam import YAMRobot
 
@@ -97,7 +146,9 @@ def launch_robot_server(args: Args):
             raise NotImplementedError(
                 f"Robot {args.robot} not implemented, choose one of: sim_ur, xarm, ur, bimanual_ur, none"
             )
-        server = ZMQServerRobot(robot, port=port, host=args.hostname)
+        server = ZMQServerRobot(
+            robot, port=port, host=args.hostname, publish_port=args.publish_port
+        )
         print(f"Starting robot server on port {port}")
         server.serve()
 
@@ -15,6 +15,8 @@ from gello.utils.launch_utils import instantiate_from_dict
 # Global variables for cleanup
 active_threads = []
 active_servers = []
+# Called first on cleanup, e.g. to flush recordings when interrupted
+cleanup_callbacks = []
 cleanup_in_progress = False
 
 
@@ -26,6 +28,12 @@ def cleanup():
     cleanup_in_progress = True
 
     print("Cleaning up resources...")
+    for callback in cleanup_callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"Error in cleanup callback: {e}")
+
     for server in active_servers:
         try:
             if hasattr(server, "close"):
@@ -74,6 +82,12 @@ class Args:
     use_save_interface: bool = False
     """Enable saving data with keyboard interface."""
 
+    trace: bool = False
+    """Time every phase of the control loop and print a summary."""
+
+    trace_path: Optional[str] = None
+    """Export the timing trace on exit, .csv or Chrome trace .json."""
+
 
 def signal_handler(signum, frame):
     """Handle shutdown signals gracefully."""
@@ -125,6 +139,7 @@ def main():
     left_robot = instantiate_from_dict(left_robot_cfg)
 
     if bimanual:
+        from gello.agents.layout import BimanualLayout
         from gello.robots.robot import BimanualRobot
 
         right_robot_cfg = right_cfg["robot"]
@@ -134,7 +149,11 @@ def main():
             )
 
         right_robot = instantiate_from_dict(right_robot_cfg)
-        robot = BimanualRobot(left_robot, right_robot)
+        # the arms may differ in DOF, split observations and actions by their
+        # actual sizes
+        layout = BimanualLayout(left_robot.num_dofs(), right_robot.num_dofs())
+        robot = BimanualRobot(left_robot, right_robot, layout=layout)
+        agent.layout = layout
 
         # For bimanual, use the left config for general settings (hz, etc.)
         cfg = left_cfg
@@ -220,8 +239,29 @@ def main():
             expand_user=True,
         )
 
+    tracer = None
+    if args.trace or args.trace_path:
+        from gello.utils.tracing import LoopTracer
+
+        tracer = LoopTracer()
+
+    # SIGINT exits from the signal handler without unwinding the control loop,
+    # so flush the recording and the trace from cleanup()
+    def _finish():
+        if save_interface is not None:
+            save_interface.shutdown()
+        if tracer is not None:
+            print(tracer.format_summary())
+            if args.trace_path is not None:
+                tracer.export(Path(args.trace_path).expanduser())
+
+    cleanup_callbacks.append(_finish)
+
     # Run main control loop
-    run_control_loop(env, agent, save_interface)
+    run_control_loop(env, agent, save_interface, tracer=tracer)
+    cleanup_callbacks.remove(_finish)
+    if tracer is not None and args.trace_path is not None:
+        tracer.export(Path(args.trace_path).expanduser())
 
 
 if __name__ == "__main__":
@@ -8,9 +8,13 @@ import tyro
 import sys
 sys.path.append("/home/ju/Workspace/gello_software")
 from gello.env import RobotEnv
-from gello.robots.robot import PrintRobot
+from gello.robots.robot import BimanualRobot, PrintRobot
 from gello.utils.launch_utils import instantiate_from_dict
-from gello.zmq_core.robot_node import ZMQClientRobot
+from gello.zmq_core.robot_node import (
+    ZMQAsyncClientRobot,
+    ZMQClientRobot,
+    ZMQStreamingClientRobot,
+)
 from gello.zmq_core.camera_node import ZMQClientCamera
 
 
@@ -26,6 +30,10 @@ def print_color(*args, color=None, attrs=(), **kwargs):
 class Args:
     agent: str = "gello"
     robot_port: int = 6001
+    robot_port_right: Optional[int] = None
+    """Port of a separate right arm server; both arms are then stepped concurrently."""
+    robot_publish_port: Optional[int] = None
+    """Read robot observations from the stream published on this port."""
     wrist_camera_port: int = 5000
     base_camera_port: int = 5001
     hostname: str = "127.0.0.1"
@@ -37,6 +45,14 @@ class Args:
     mock: bool = False
     use_save_interface: bool = False
     data_dir: str = "~/bc_data"
+    save_format: str = "hdf5"
+    """Either hdf5 (one file per episode) or pkl (one file per frame)."""
+    save_backpressure: str = "block"
+    """What recording does when the writer falls behind, block or drop frames."""
+    trace: bool = False
+    """Time every phase of the control loop and print a summary."""
+    trace_path: Optional[str] = None
+    """Export the timing trace on exit, .csv or Chrome trace .json."""
     bimanual: bool = True
     verbose: bool = False
 
@@ -55,7 +71,19 @@ def main(args):
             #  "wrist": ZMQClientCamera(port=args.wrist_camera_port, host=args.hostname),
             #  "base": ZMQClientCamera(port=args.base_camera_port, host=args.hostname),
         }
-        robot_client = ZMQClientRobot(port=args.robot_port, host=args.hostname)
+        if args.robot_publish_port is not None:
+            robot_client = ZMQStreamingClientRobot(
+                port=args.robot_port,
+                host=args.hostname,
+                publish_port=args.robot_publish_port,
+            )
+        elif args.robot_port_right is None:
+            robot_client = ZMQClientRobot(port=args.robot_port, host=args.hostname)
+        else:
+            robot_client = BimanualRobot(
+                ZMQAsyncClientRobot(port=args.robot_port, host=args.hostname),
+                ZMQAsyncClientRobot(port=args.robot_port_right, host=args.hostname),
+            )
     env = RobotEnv(robot_client, control_rate_hz=args.hz, camera_dict=camera_clients)
 
     agent_cfg = {}
@@ -265,14 +293,27 @@ def main(args):
         exit()
 
     from gello.utils.control_utils import SaveInterface, run_control_loop
+    from gello.utils.tracing import LoopTracer
 
     save_interface = None
     if args.use_save_interface:
         save_interface = SaveInterface(
-            data_dir=args.data_dir, agent_name=args.agent, expand_user=True
+            data_dir=args.data_dir,
+            agent_name=args.agent,
+            expand_user=True,
+            file_format=args.save_format,
+            backpressure=args.save_backpressure,
         )
 
-    run_control_loop(env, agent, save_interface, use_colors=True)
+    tracer = LoopTracer() if args.trace or args.trace_path else None
+    run_control_loop(
+        env,
+        agent,
+        save_interface,
+        use_colors=True,
+        tracer=tracer,
+        trace_path=args.trace_path,
+    )
 
 
 if __name__ == "__main__":
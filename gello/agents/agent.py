@@ -1,7 +1,10 @@
-from typing import Any, Dict, Protocol
+from typing import Any, Dict, Optional, Protocol
 
 import numpy as np
 
+from gello.agents.layout import BimanualLayout
+from gello.utils.arm_pool import ArmPool
+
 
 class Agent(Protocol):
     def act(self, obs: Dict[str, Any]) -> np.ndarray:
@@ -25,19 +28,52 @@ class DummyAgent(Agent):
 
 
 class BimanualAgent(Agent):
-    def __init__(self, agent_left: Agent, agent_right: Agent):
+    """Two single arm agents, the left agent's action first.
+
+    The observation is split between the agents by ``layout``. Without one,
+    both arms are assumed to have the same DOF, taken from the first
+    observation.
+
+    With ``concurrent`` (the default) both agents act at the same time on an
+    ``ArmPool``, so a slow device read on one side does not delay the other.
+    """
+
+    def __init__(
+        self,
+        agent_left: Agent,
+        agent_right: Agent,
+        layout: Optional[BimanualLayout] = None,
+        concurrent: bool = True,
+    ):
         self.agent_left = agent_left
         self.agent_right = agent_right
+        self.layout = layout
+        self._pool: Optional[ArmPool] = ArmPool() if concurrent else None
 
     def act(self, obs: Dict[str, Any]) -> np.ndarray:
-        left_obs = {}
-        right_obs = {}
-        for key, val in obs.items():
-            L = val.shape[0]
-            half_dim = L // 2
-            assert L == half_dim * 2, f"{key} must be even, something is wrong"
-            left_obs[key] = val[:half_dim]
-            right_obs[key] = val[half_dim:]
-        res = np.concatenate(
-            [self.agent_left.act(left_obs), self.agent_right.act(right_obs)])
-        return res 
+        if self.layout is None:
+            num_dofs = len(obs["joint_positions"])
+            assert num_dofs % 2 == 0, "Arms differ in DOF, give a layout"
+            self.layout = BimanualLayout(num_dofs // 2, num_dofs // 2)
+        left_obs, right_obs = self.layout.split(obs)
+        if self._pool is None:
+            actions = self.agent_left.act(left_obs), self.agent_right.act(right_obs)
+        else:
+            actions = self._pool.run(
+                lambda: self.agent_left.act(left_obs),
+                lambda: self.agent_right.act(right_obs),
+            )
+        return np.concatenate(actions)
+
+    def stats(self) -> Dict[str, float]:
+        """Per-arm latency of ``act``, see ``ArmPool.stats``."""
+        return {} if self._pool is None else self._pool.stats()
+
+    def format_stats(self) -> str:
+        if self._pool is None:
+            return "agents run sequentially"
+        return f"agents: {self._pool.format_stats()}"
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
@@ -0,0 +1,101 @@
+"""Which parts of a bimanual observation and action belong to which arm.
+
+``BimanualRobot`` concatenates the observations of its two arms key by key,
+the left arm's entries first, and takes one action with the left arm's joints
+first. A ``BimanualLayout`` records how wide each arm's part of those arrays
+is, and turns that into slice objects once, so splitting an observation only
+takes views of the arrays. Arms do not need the same number of joints, e.g. an
+xArm (8 DOF with gripper) next to a UR (7 DOF with gripper). Keys that are not
+per arm, such as camera images, are passed to both arms as the same object.
+"""
+
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+# width of one arm's part of an observation entry; None means the arm's DOF
+ARM_KEY_WIDTHS: Dict[str, Optional[int]] = {
+    "joint_positions": None,
+    "joint_velocities": None,
+    "ee_pos_quat": 7,
+    "gripper_position": 1,
+}
+
+
+class BimanualLayout:
+    """Precomputed slices of the left and right arm's parts of each key."""
+
+    def __init__(
+        self,
+        left_dofs: int,
+        right_dofs: int,
+        key_widths: Optional[Mapping[str, Optional[int]]] = None,
+    ):
+        """
+        Args:
+            left_dofs: DOF of the left arm, including the gripper.
+            right_dofs: DOF of the right arm, including the gripper.
+            key_widths: Per arm width of each key that is split between the
+                arms, None for the arm's DOF. Defaults to ``ARM_KEY_WIDTHS``.
+        """
+        if left_dofs <= 0 or right_dofs <= 0:
+            raise ValueError(
+                f"Arms need at least one DOF, got {left_dofs} and {right_dofs}"
+            )
+        self.left_dofs = int(left_dofs)
+        self.right_dofs = int(right_dofs)
+        if key_widths is None:
+            key_widths = ARM_KEY_WIDTHS
+
+        self._slices: Dict[str, Tuple[slice, slice]] = {}
+        self._lengths: Dict[str, int] = {}
+        for key, width in key_widths.items():
+            left_width = self.left_dofs if width is None else width
+            right_width = self.right_dofs if width is None else width
+            self._slices[key] = (
+                slice(0, left_width),
+                slice(left_width, left_width + right_width),
+            )
+            self._lengths[key] = left_width + right_width
+        self.action_slices = (
+            slice(0, self.left_dofs),
+            slice(self.left_dofs, self.left_dofs + self.right_dofs),
+        )
+
+    @property
+    def num_dofs(self) -> int:
+        return self.left_dofs + self.right_dofs
+
+    def __repr__(self) -> str:
+        return f"BimanualLayout(left={self.left_dofs}, right={self.right_dofs})"
+
+    def split(self, obs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Split an observation into the observations of the two arms.
+
+        The per arm entries are views of ``obs``'s arrays, the other entries
+        are shared by both arms.
+        """
+        left_obs = {}
+        right_obs = {}
+        for key, val in obs.items():
+            slices = self._slices.get(key)
+            if slices is None:
+                left_obs[key] = val
+                right_obs[key] = val
+                continue
+            if len(val) != self._lengths[key]:
+                raise ValueError(
+                    f"{key} has length {len(val)}, expected {self._lengths[key]} "
+                    f"for {self}"
+                )
+            left_obs[key] = val[slices[0]]
+            right_obs[key] = val[slices[1]]
+        return left_obs, right_obs
+
+    def split_action(self, action: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if len(action) != self.num_dofs:
+            raise ValueError(
+                f"Action has length {len(action)}, expected {self.num_dofs} "
+                f"for {self}"
+            )
+        return action[self.action_slices[0]], action[self.action_slices[1]]
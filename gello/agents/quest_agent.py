@@ -2,13 +2,15 @@ from typing import Dict
 
 import numpy as np
 import quaternion
-from dm_control import mjcf
-from dm_control.utils.inverse_kinematics import qpos_from_site_pose
 from oculus_reader.reader import OculusReader
 
 from gello.agents.agent import Agent
-from gello.agents.spacemouse_agent import apply_transfer, mj2ur, ur2mj
-from gello.dm_control_tasks.arms.ur5e import UR5e
+from gello.agents.spacemouse_agent import (
+    apply_transfer,
+    make_ik_solver,
+    mj2ur,
+    ur2mj,
+)
 
 # cartensian space control, controller <> robot relative pose matters. This extrinsics is based on
 # our setup, for details please checkout the project page.
@@ -29,11 +31,7 @@ class SingleArmQuestAgent(Agent):
         assert self.which_hand in ["l", "r"]
 
         self.oculus_reader = OculusReader()
-        if robot_type == "ur5":
-            _robot = UR5e()
-        else:
-            raise ValueError(f"Unknown robot type: {robot_type}")
-        self.physics = mjcf.Physics.from_mjcf_model(_robot.mjcf_model)
+        self._ik = make_ik_solver(robot_type)
         self.control_active = False
         self.reference_quest_pose = None
         self.reference_ee_rot_ur = None
@@ -48,13 +46,7 @@ class SingleArmQuestAgent(Agent):
         current_qpos = obs["joint_positions"][:num_dof]  # last one dim is the gripper
         current_gripper_angle = obs["joint_positions"][-1]
         # run the fk
-        self.physics.data.qpos[:num_dof] = current_qpos
-        self.physics.step()
-
-        ee_rot_mj = np.array(
-            self.physics.named.data.site_xmat["attachment_site"]
-        ).reshape(3, 3)
-        ee_pos_mj = np.array(self.physics.named.data.site_xpos["attachment_site"])
+        ee_pos_mj, ee_rot_mj = self._ik.ee_pose(current_qpos)
         if self.which_hand == "l":
             pose_key = "l"
             trigger_key = "leftTrig"
@@ -112,15 +104,9 @@ class SingleArmQuestAgent(Agent):
                 target_quat = quaternion.as_float_array(
                     quaternion.from_rotation_matrix(ur2mj[:3, :3] @ next_ee_rot_ur)
                 )
-                ik_result = qpos_from_site_pose(
-                    self.physics,
-                    "attachment_site",
-                    target_pos=apply_transfer(ur2mj, next_ee_pos_ur),
-                    target_quat=target_quat,
-                    tol=1e-14,
-                    max_steps=400,
+                ik_result = self._ik.solve(
+                    apply_transfer(ur2mj, next_ee_pos_ur), target_quat, current_qpos
                 )
-                self.physics.reset()
                 if ik_result.success:
                     new_qpos = ik_result.qpos[:num_dof]
                 else:
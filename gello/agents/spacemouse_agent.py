@@ -1,14 +1,12 @@
 import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Optional
 
 import numpy as np
-from dm_control import mjcf
-from dm_control.utils.inverse_kinematics import qpos_from_site_pose
 
 from gello.agents.agent import Agent
-from gello.dm_control_tasks.arms.ur5e import UR5e
+from gello.dm_control_tasks.arms.kinematics import InverseKinematics, make_ur_seeds
 
 # mujoco has a slightly different coordinate system than UR control box
 mj2ur = np.array([[0, -1, 0, 0], [1, 0, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
@@ -34,12 +32,20 @@ def apply_transfer(mat: np.ndarray, xyz: np.ndarray) -> np.ndarray:
     return np.matmul(mat, xyz)[:3]
 
 
+def make_ik_solver(robot_type: str) -> InverseKinematics:
+    if robot_type == "ur5":
+        # the attachment site is not exactly the DH tool flange, so the
+        # analytic solutions are only starts that the solver refines
+        return InverseKinematics.for_arm("ur5e", seeds=make_ur_seeds(mj2ur))
+    raise ValueError(f"Unknown robot type: {robot_type}")
+
+
 @dataclass
 class SpacemouseConfig:
     angle_scale: float = 0.24
     translation_scale: float = 0.06
     # only control the xyz, rotation direction, not the gripper
-    invert_control: np.ndarray = np.ones(6)
+    invert_control: np.ndarray = field(default_factory=lambda: np.ones(6))
     rotation_mode: str = "euler"
 
 
@@ -64,11 +70,7 @@ class SpacemouseAgent(Agent):
         self._verbose = verbose
         if self._verbose:
             print(f"robot_type: {robot_type}")
-        if robot_type == "ur5":
-            _robot = UR5e()
-        else:
-            raise ValueError(f"Unknown robot type: {robot_type}")
-        self.physics = mjcf.Physics.from_mjcf_model(_robot.mjcf_model)
+        self._ik = make_ik_solver(robot_type)
 
     def _read_from_spacemouse(self):
         import pyspacemouse
@@ -96,13 +98,7 @@ class SpacemouseAgent(Agent):
             print("act invoked")
         current_qpos = obs["joint_positions"][:num_dof]  # last one dim is the gripper
         current_gripper_angle = obs["joint_positions"][-1]
-        self.physics.data.qpos[:num_dof] = current_qpos
-
-        self.physics.step()
-        ee_rot = np.array(self.physics.named.data.site_xmat["attachment_site"]).reshape(
-            3, 3
-        )
-        ee_pos = np.array(self.physics.named.data.site_xpos["attachment_site"])
+        ee_pos, ee_rot = self._ik.ee_pose(current_qpos)
 
         ee_rot = mj2ur[:3, :3] @ ee_rot
         ee_pos = apply_transfer(mj2ur, ee_pos)
@@ -188,15 +184,9 @@ class SpacemouseAgent(Agent):
         target_quat = quaternion.as_float_array(
             quaternion.from_rotation_matrix(ur2mj[:3, :3] @ new_ee_rot)
         )
-        ik_result = qpos_from_site_pose(
-            self.physics,
-            "attachment_site",
-            target_pos=apply_transfer(ur2mj, new_ee_pos),
-            target_quat=target_quat,
-            tol=1e-14,
-            max_steps=400,
+        ik_result = self._ik.solve(
+            apply_transfer(ur2mj, new_ee_pos), target_quat, current_qpos
         )
-        self.physics.reset()
         if ik_result.success:
             new_qpos = ik_result.qpos[:num_dof]
         else:
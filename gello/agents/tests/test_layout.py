@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from gello.agents.agent import BimanualAgent, DummyAgent
+from gello.agents.layout import BimanualLayout
+from gello.robots.robot import BimanualRobot, PrintRobot
+
+
+def _obs(left_dofs, right_dofs):
+    num_dofs = left_dofs + right_dofs
+    return {
+        "joint_positions": np.arange(num_dofs, dtype=np.float64),
+        "joint_velocities": np.zeros(num_dofs),
+        "ee_pos_quat": np.arange(14, dtype=np.float64),
+        "gripper_position": np.array([0.1, 0.9]),
+        "base_rgb": np.zeros((480, 640, 3), dtype=np.uint8),
+    }
+
+
+def test_split_asymmetric_arms():
+    layout = BimanualLayout(8, 7)
+    obs = _obs(8, 7)
+    left, right = layout.split(obs)
+
+    assert np.array_equal(left["joint_positions"], np.arange(8))
+    assert np.array_equal(right["joint_positions"], np.arange(8, 15))
+    assert np.array_equal(right["ee_pos_quat"], np.arange(7, 14))
+    assert right["gripper_position"].shape == (1,)
+    # views and shared entries, nothing is copied
+    assert np.shares_memory(left["joint_positions"], obs["joint_positions"])
+    assert left["base_rgb"] is obs["base_rgb"]
+    assert right["base_rgb"] is obs["base_rgb"]
+
+    action_l, action_r = layout.split_action(np.arange(15))
+    assert len(action_l) == 8 and len(action_r) == 7
+
+
+def test_split_rejects_wrong_length():
+    layout = BimanualLayout(7, 7)
+    with pytest.raises(ValueError):
+        layout.split(_obs(8, 7))
+    with pytest.raises(ValueError):
+        BimanualLayout(0, 7)
+    with pytest.raises(ValueError):
+        layout.split_action(np.zeros(15))
+
+
+def test_bimanual_agent_with_layout():
+    agent = BimanualAgent(
+        DummyAgent(8), DummyAgent(7), layout=BimanualLayout(8, 7), concurrent=False
+    )
+    assert agent.act(_obs(8, 7)).shape == (15,)
+
+
+def test_bimanual_agent_infers_symmetric_layout():
+    agent = BimanualAgent(DummyAgent(7), DummyAgent(7), concurrent=False)
+    assert agent.act(_obs(7, 7)).shape == (14,)
+    assert agent.layout.left_dofs == agent.layout.right_dofs == 7
+
+
+def test_bimanual_robot_splits_actions_by_layout():
+    robot = BimanualRobot(PrintRobot(8, True), PrintRobot(7, True), concurrent=False)
+    assert robot.layout.left_dofs == 8 and robot.num_dofs() == 15
+    robot.command_joint_state(np.arange(15, dtype=np.float64))
+    assert np.array_equal(robot.get_joint_state(), np.arange(15))
+    with pytest.raises(ValueError):
+        robot.command_joint_state(np.zeros(14))
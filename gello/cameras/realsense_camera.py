@@ -1,6 +1,8 @@
 import os
+import threading
 import time
-from typing import List, Optional, Tuple
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 
@@ -24,7 +26,25 @@ class RealSenseCamera(CameraDriver):
     def __repr__(self) -> str:
         return f"RealSenseCamera(device_id={self._device_id})"
 
-    def __init__(self, device_id: Optional[str] = None, flip: bool = False):
+    def __init__(
+        self,
+        device_id: Optional[str] = None,
+        flip: bool = False,
+        threaded: bool = False,
+        buffer_size: int = 3,
+    ):
+        """Open a RealSense camera.
+
+        Args:
+            device_id: Serial number of the camera, None for any camera.
+            flip: Rotate the images by 180 degrees.
+            threaded: Capture frames on a background thread into a ring buffer,
+                so that ``read`` returns the newest frame without waiting for
+                the camera. The returned arrays are then reused after
+                ``buffer_size`` further reads, copy them to keep them longer.
+            buffer_size: Number of frames in the ring buffer (at least 3) and
+                number of reused output buffers in threaded mode.
+        """
         import pyrealsense2 as rs
 
         self._device_id = device_id
@@ -47,6 +67,43 @@ class RealSenseCamera(CameraDriver):
         self._pipeline.start(config)
         self._flip = flip
 
+        self._threaded = threaded
+        if threaded:
+            # the newest slot and the slot being read must never be written
+            assert buffer_size >= 3, "buffer_size must be at least 3"
+            self._capture = _FrameRingBuffer(buffer_size, height=480, width=640)
+            self._outputs: Dict[Optional[Tuple[int, int]], _OutputBuffers] = {}
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self._thread.start()
+
+    def _capture_loop(self) -> None:
+        while not self._stop_event.is_set():
+            frames = self._pipeline.wait_for_frames()
+            self._capture.write(
+                np.asanyarray(frames.get_color_frame().get_data()),
+                np.asanyarray(frames.get_depth_frame().get_data()),
+                hardware_timestamp=frames.get_timestamp(),
+                frame_number=frames.get_frame_number(),
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """Capture statistics of the background thread.
+
+        Returns:
+            Dict with the number of frames captured, dropped by the device
+            (frame number gaps), overwritten before being read, and the mean
+            and last capture-to-read latency in seconds.
+        """
+        assert self._threaded, "Statistics are only collected in threaded mode"
+        return self._capture.stats()
+
+    def close(self) -> None:
+        if self._threaded:
+            self._stop_event.set()
+            self._thread.join()
+        self._pipeline.stop()
+
     def read(
         self,
         img_size: Optional[Tuple[int, int]] = None,  # farthest: float = 0.12
@@ -63,6 +120,9 @@ class RealSenseCamera(CameraDriver):
         """
         import cv2
 
+        if self._threaded:
+            return self._read_latest(img_size)
+
         frames = self._pipeline.wait_for_frames()
         color_frame = frames.get_color_frame()
         color_image = np.asanyarray(color_frame.get_data())
@@ -85,6 +145,139 @@ class RealSenseCamera(CameraDriver):
 
         return image, depth
 
+    def _read_latest(
+        self, img_size: Optional[Tuple[int, int]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        import cv2
+
+        if img_size not in self._outputs:
+            self._outputs[img_size] = _OutputBuffers(
+                len(self._capture), img_size or (640, 480)
+            )
+        image, depth, scratch_image, scratch_depth = self._outputs[img_size].next()
+        depth_2d = depth[:, :, 0]
+
+        with self._capture.read() as (color_image, depth_image):
+            if img_size is not None:
+                color_image = cv2.resize(color_image, img_size, dst=scratch_image)
+                depth_image = cv2.resize(depth_image, img_size, dst=scratch_depth)
+            if self._flip:
+                # rotate 180 degree's because everything is upside down in order to center the camera
+                color_image = cv2.flip(color_image, -1, dst=scratch_image)
+                cv2.flip(depth_image, -1, dst=depth_2d)
+            else:
+                np.copyto(depth_2d, depth_image)
+            cv2.cvtColor(color_image, cv2.COLOR_BGR2RGB, dst=image)
+        return image, depth
+
+
+class _FrameRingBuffer:
+    """Preallocated ring of color and depth frames filled by a capture thread.
+
+    The writer never touches the slot that is being read, so ``read`` can hand
+    out views into the ring instead of copies.
+    """
+
+    def __init__(self, size: int, height: int, width: int):
+        self._color = np.empty((size, height, width, 3), dtype=np.uint8)
+        self._depth = np.empty((size, height, width), dtype=np.uint16)
+        self._hardware_timestamps = np.zeros(size)
+        self._capture_times = np.zeros(size)
+        self._lock = threading.Lock()
+        self._has_frame = threading.Event()
+        self._latest = -1
+        self._reading = -1
+        self._latest_read = True
+
+        self._num_captured = 0
+        self._num_dropped = 0
+        self._num_unread = 0
+        self._last_frame_number = -1
+        self._last_latency = 0.0
+        self._total_latency = 0.0
+        self._num_reads = 0
+
+    def __len__(self) -> int:
+        return len(self._color)
+
+    def write(
+        self,
+        color: np.ndarray,
+        depth: np.ndarray,
+        hardware_timestamp: float,
+        frame_number: int,
+    ) -> None:
+        with self._lock:
+            slot = (self._latest + 1) % len(self)
+            if slot == self._reading:
+                slot = (slot + 1) % len(self)
+        np.copyto(self._color[slot], color)
+        np.copyto(self._depth[slot], depth)
+        self._hardware_timestamps[slot] = hardware_timestamp
+        self._capture_times[slot] = time.time()
+        with self._lock:
+            if not self._latest_read:
+                self._num_unread += 1
+            if self._last_frame_number >= 0:
+                self._num_dropped += max(0, frame_number - self._last_frame_number - 1)
+            self._last_frame_number = frame_number
+            self._num_captured += 1
+            self._latest = slot
+            self._latest_read = False
+        self._has_frame.set()
+
+    @contextmanager
+    def read(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Lend the newest color and depth frame until the context exits."""
+        self._has_frame.wait()
+        with self._lock:
+            slot = self._reading = self._latest
+            self._latest_read = True
+            self._last_latency = time.time() - self._capture_times[slot]
+            self._total_latency += self._last_latency
+            self._num_reads += 1
+        try:
+            yield self._color[slot], self._depth[slot]
+        finally:
+            with self._lock:
+                self._reading = -1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "frames_captured": self._num_captured,
+                "frames_dropped": self._num_dropped,
+                "frames_unread": self._num_unread,
+                "last_hardware_timestamp_ms": float(
+                    self._hardware_timestamps[self._latest]
+                ),
+                "last_read_latency": float(self._last_latency),
+                "mean_read_latency": float(
+                    self._total_latency / max(self._num_reads, 1)
+                ),
+            }
+
+
+class _OutputBuffers:
+    """Rotating output and scratch buffers for one output size."""
+
+    def __init__(self, count: int, img_size: Tuple[int, int]):
+        width, height = img_size
+        self._images = np.empty((count, height, width, 3), dtype=np.uint8)
+        self._depths = np.empty((count, height, width, 1), dtype=np.uint16)
+        self._scratch_image = np.empty((height, width, 3), dtype=np.uint8)
+        self._scratch_depth = np.empty((height, width), dtype=np.uint16)
+        self._index = 0
+
+    def next(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        self._index = (self._index + 1) % len(self._images)
+        return (
+            self._images[self._index],
+            self._depths[self._index],
+            self._scratch_image,
+            self._scratch_depth,
+        )
+
 
 def _debug_read(camera, save_datastream=False):
     import cv2
@@ -0,0 +1,235 @@
+"""Bookkeeping for incremental conversion of a dataset of demos.
+
+``demo_to_gdict`` keeps a manifest next to the converted trajectories. For
+every source episode it records a fingerprint of its files (size and mtime,
+or a content hash), the trajectory file it was converted to, its train/val
+split and the min/max of its actions. A later run only converts episodes
+that are new or whose fingerprint changed, keeps the split of the others,
+and computes the normalization from the cached min/max instead of reading
+the demos again.
+
+Trajectories are written to a directory per split, ``<split>/...`` under the
+output directory.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+TRAIN = "train"
+VAL = "val"
+
+
+def fingerprint_episode(
+    source_dir: str, hash_contents: bool = False
+) -> Tuple[Dict[str, List[int]], str]:
+    """Fingerprint the files of an episode directory.
+
+    Args:
+        source_dir: Directory of the episode.
+        hash_contents: Hash the contents of the files. Otherwise only their
+            sizes and modification times are used, which is much faster.
+
+    Returns:
+        Size and ``st_mtime_ns`` of every file by relative path, and a digest
+        of all of it.
+    """
+    files: Dict[str, List[int]] = {}
+    for root, _, names in os.walk(source_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            files[os.path.relpath(path, source_dir)] = [stat.st_size, stat.st_mtime_ns]
+
+    digest = hashlib.sha1()
+    for relpath in sorted(files):
+        digest.update(relpath.encode())
+        if hash_contents:
+            with open(os.path.join(source_dir, relpath), "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        else:
+            digest.update(np.asarray(files[relpath], dtype=np.int64).tobytes())
+    return files, digest.hexdigest()
+
+
+def val_bucket(name: str) -> int:
+    """Deterministic pseudo-random bucket in [0, 10000) of an episode name."""
+    return int(hashlib.sha1(name.encode()).hexdigest()[:8], 16) % 10000
+
+
+def is_val_candidate(name: str, val_fraction: float) -> bool:
+    """Deterministic pick of about ``val_fraction`` of the episode names."""
+    return val_bucket(name) < val_fraction * 10000
+
+
+class ConversionManifest:
+    """Source episodes and what they were converted to, saved as JSON.
+
+    Episodes are keyed by the name of their directory. Trajectory files are
+    recorded relative to the output directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.episodes: Dict[str, Dict[str, Any]] = {}
+        self.scale_factor: Optional[np.ndarray] = None
+        self.bias_factor: Optional[np.ndarray] = None
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                raise ValueError(
+                    f"Unsupported manifest version {data.get('version')} in {path}"
+                )
+            self.episodes = data["episodes"]
+            if data.get("scale_factor") is not None:
+                self.scale_factor = np.array(data["scale_factor"])
+                self.bias_factor = np.array(data["bias_factor"])
+
+    @property
+    def output_dir(self) -> str:
+        return os.path.dirname(self.path)
+
+    def output_path(self, name: str) -> Optional[str]:
+        output = self.episodes.get(name, {}).get("output")
+        return None if output is None else os.path.join(self.output_dir, output)
+
+    def is_up_to_date(self, name: str, fingerprint: str) -> bool:
+        """Whether the episode was handled with this fingerprint before.
+
+        Skipped episodes are up to date too, so they are not retried until
+        their files change.
+        """
+        episode = self.episodes.get(name)
+        if episode is None or episode["fingerprint"] != fingerprint:
+            return False
+        if episode.get("skipped"):
+            return True
+        output = self.output_path(name)
+        return output is not None and os.path.exists(output)
+
+    def assign(
+        self, name: str, val_fraction: float = 0.1, max_val: int = 10
+    ) -> Tuple[int, str]:
+        """Trajectory index and split of an episode.
+
+        Known episodes keep theirs. A new episode gets the next free index and
+        goes to the validation split if its name is picked by
+        ``is_val_candidate`` and there are fewer than ``max_val`` validation
+        episodes.
+        """
+        episode = self.episodes.get(name)
+        if episode is not None:
+            return episode["index"], episode["split"]
+        index = 1 + max((e["index"] for e in self.episodes.values()), default=-1)
+        num_val = sum(e["split"] == VAL for e in self.episodes.values())
+        split = (
+            VAL if is_val_candidate(name, val_fraction) and num_val < max_val else TRAIN
+        )
+        return index, split
+
+    def record(
+        self,
+        name: str,
+        index: int,
+        split: str,
+        files: Dict[str, List[int]],
+        fingerprint: str,
+        output: Optional[str] = None,
+        act_min: Optional[np.ndarray] = None,
+        act_max: Optional[np.ndarray] = None,
+    ) -> None:
+        """Record a converted episode, or a skipped one if ``output`` is None."""
+        episode: Dict[str, Any] = {
+            "index": index,
+            "split": split,
+            "files": files,
+            "fingerprint": fingerprint,
+        }
+        if output is None:
+            episode["skipped"] = True
+        else:
+            episode["output"] = os.path.relpath(output, self.output_dir)
+            episode["act_min"] = np.asarray(act_min).tolist()
+            episode["act_max"] = np.asarray(act_max).tolist()
+        self.episodes[name] = episode
+
+    def ensure_val(self) -> Optional[str]:
+        """Move a converted episode to the validation split if it has none.
+
+        ``assign`` picks validation episodes by name, so a small dataset can
+        end up without any. With at least two converted episodes, the train
+        episode with the lowest ``val_bucket`` is moved, trajectory file
+        included, so the choice is stable across runs.
+
+        Returns:
+            The moved episode, or None.
+        """
+        converted = {
+            name: e for name, e in self.episodes.items() if not e.get("skipped")
+        }
+        if len(converted) < 2 or any(e["split"] == VAL for e in converted.values()):
+            return None
+        name = min(converted, key=val_bucket)
+        episode = converted[name]
+        old_output = self.output_path(name)
+        # <split>/... -> val/...
+        output = os.path.join(VAL, *episode["output"].split(os.sep)[1:])
+        new_output = os.path.join(self.output_dir, output)
+        os.makedirs(os.path.dirname(new_output), exist_ok=True)
+        os.replace(old_output, new_output)
+        episode["split"] = VAL
+        episode["output"] = output
+        return name
+
+    def remove_missing(self, names: List[str]) -> List[str]:
+        """Forget the episodes that are not in ``names`` and delete their output.
+
+        Returns:
+            The removed episodes.
+        """
+        removed = [name for name in self.episodes if name not in set(names)]
+        for name in removed:
+            output = self.output_path(name)
+            if output is not None and os.path.exists(output):
+                os.remove(output)
+            del self.episodes[name]
+        return removed
+
+    def converted(self) -> Dict[int, Dict[str, Any]]:
+        """The episodes that have a trajectory, by index."""
+        episodes = [e for e in self.episodes.values() if not e.get("skipped")]
+        return {e["index"]: e for e in sorted(episodes, key=lambda e: e["index"])}
+
+    def action_min_max(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Min and max of the actions of all converted episodes."""
+        episodes = self.converted().values()
+        if not episodes:
+            raise ValueError("No converted episodes")
+        act_min = np.min([e["act_min"] for e in episodes], axis=0)
+        act_max = np.max([e["act_max"] for e in episodes], axis=0)
+        return act_min, act_max
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "episodes": self.episodes,
+            "scale_factor": None,
+            "bias_factor": None,
+        }
+        if self.scale_factor is not None:
+            data["scale_factor"] = np.asarray(self.scale_factor).tolist()
+            data["bias_factor"] = np.asarray(self.bias_factor).tolist()
+        # write a new file and swap it in, so an interrupted run does not
+        # leave a truncated manifest behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
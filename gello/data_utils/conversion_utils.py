@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Tuple
 
 import cv2
 import numpy as np
@@ -21,19 +21,18 @@ def to_numpy(array):
     return array
 
 
-def center_crop(rgb_frame, depth_frame):
-    H, W = rgb_frame.shape[-2:]
-    sq_size = min(H, W)
+def center_crop_slices(height: int, width: int) -> Tuple[slice, slice]:
+    """Rows and columns of the largest square in the center of an image."""
+    sq_size = min(height, width)
+    top = (height - sq_size) // 2
+    left = (width - sq_size) // 2
+    return slice(top, top + sq_size), slice(left, left + sq_size)
 
-    # crop the center square
-    if H > W:
-        rgb_frame = rgb_frame[..., (-sq_size / 2) : (sq_size / 2), :sq_size]
-        depth_frame = depth_frame[..., (-sq_size / 2) : (sq_size / 2), :sq_size]
-    elif W < H:
-        rgb_frame = rgb_frame[..., :sq_size, (-sq_size / 2) : (sq_size / 2)]
-        depth_frame = depth_frame[..., :sq_size, (-sq_size / 2) : (sq_size / 2)]
 
-    return rgb_frame, depth_frame
+def center_crop(rgb_frame, depth_frame):
+    H, W = rgb_frame.shape[-2:]
+    rows, cols = center_crop_slices(H, W)
+    return rgb_frame[..., rows, cols], depth_frame[..., rows, cols]
 
 
 def resize(rgb, depth, size=224):
@@ -47,47 +46,96 @@ def resize(rgb, depth, size=224):
 
 
 def filter_depth(depth, max_depth=2.0, min_depth=0.0):
-    depth[np.isnan(depth)] = 0.0
-    depth[np.isinf(depth)] = 0.0
-    depth = np.clip(depth, min_depth, max_depth)
-    return depth
+    """Zero out NaN and Inf and clip to the depth range, in place."""
+    np.nan_to_num(depth, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.clip(depth, min_depth, max_depth, out=depth)
+
+
+def preproc_images(
+    rgb: np.ndarray,
+    depth: np.ndarray,
+    size: int = 224,
+    max_depth: float = 2.0,
+    min_depth: float = 0.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Center crop, resize and filter the frames of one camera.
+
+    The crop is a view, and every frame is resized straight into the output
+    arrays in uint8 (RGB) and float32 (depth), so no full resolution copies
+    are made. Depth is filtered right after each frame is resized, while it
+    is still in cache.
+
+    Args:
+        rgb: [T, H, W, 3] images.
+        depth: [T, H, W] or [T, H, W, 1] depth images in meters.
+        size: Side of the square output images.
+
+    Returns:
+        [T, 3, size, size] uint8 images and [T, 1, size, size] float32 depth.
+    """
+    num_frames, H, W = rgb.shape[:3]
+    rows, cols = center_crop_slices(H, W)
+    rgb = rgb[:, rows, cols]
+    depth = depth.reshape(num_frames, H, W)[:, rows, cols]
+
+    rgb_out = np.empty((num_frames, size, size, 3), dtype=np.uint8)
+    depth_out = np.empty((num_frames, size, size), dtype=np.float32)
+    for t in range(num_frames):
+        cv2.resize(
+            rgb[t].astype(np.uint8, copy=False),
+            (size, size),
+            dst=rgb_out[t],
+            interpolation=cv2.INTER_LINEAR,
+        )
+        cv2.resize(
+            depth[t].astype(np.float32, copy=False),
+            (size, size),
+            dst=depth_out[t],
+            interpolation=cv2.INTER_LINEAR,
+        )
+        filter_depth(depth_out[t], max_depth, min_depth)
+    return (
+        np.ascontiguousarray(rgb_out.transpose([0, 3, 1, 2])),
+        depth_out[:, None],
+    )
 
 
-def preproc_obs(
-    demo: Dict[str, np.ndarray], joint_only: bool = True
+def preproc_obs_batch(
+    episode: Dict[str, np.ndarray], joint_only: bool = True
 ) -> Dict[str, np.ndarray]:
-    # c h w
-    rgb_wrist = demo.get(f"wrist_rgb").transpose([2, 0, 1]) * 1.0  # type: ignore
-    depth_wrist = demo.get(f"wrist_depth").transpose([2, 0, 1]) * 1.0  # type: ignore
-    rgb_base = demo.get("base_rgb").transpose([2, 0, 1]) * 1.0  # type: ignore
-    depth_base = demo.get("base_depth").transpose([2, 0, 1]) * 1.0  # type: ignore
-
-    # Center crop and fitler depth
-    rgb_wrist, depth_wrist = resize(*center_crop(rgb_wrist, depth_wrist))
-    rgb_base, depth_base = resize(*center_crop(rgb_base, depth_base))
-
-    depth_wrist = filter_depth(depth_wrist)
-    depth_base = filter_depth(depth_base)
-
-    rgb = np.stack([rgb_wrist, rgb_base], axis=0)
-    depth = np.stack([depth_wrist, depth_base], axis=0)
+    """Preprocess a whole episode, every value has the frames as first axis.
+
+    Returns:
+        The stacked observations: ``rgb`` [T, 2, 3, 224, 224] uint8 and
+        ``depth`` [T, 2, 1, 224, 224] float32 of the wrist and base cameras,
+        and ``state``.
+    """
+    rgb_wrist, depth_wrist = preproc_images(
+        episode["wrist_rgb"], episode["wrist_depth"]
+    )
+    rgb_base, depth_base = preproc_images(episode["base_rgb"], episode["base_depth"])
+    rgb = np.stack([rgb_wrist, rgb_base], axis=1)
+    depth = np.stack([depth_wrist, depth_base], axis=1)
+    num_frames = len(rgb)
 
     # Dummy
-    dummy_cam = np.eye(4)
-    K = np.eye(3)
+    dummy_cam = np.broadcast_to(np.eye(4), (num_frames, 4, 4))
+    K = np.broadcast_to(np.eye(3), (num_frames, 3, 3))
 
     # state
-    qpos, qvel, ee_pos_quat, gripper_pos = (
-        demo.get("joint_positions"),  # type: ignore
-        demo.get("joint_velocities"),  # type: ignore
-        demo.get("ee_pos_quat"),  # type: ignore
-        demo.get("gripper_position"),  # type: ignore
-    )
-
+    qpos = episode["joint_positions"]
     if joint_only:
-        state: np.ndarray = qpos
+        state = qpos
     else:
-        state: np.ndarray = np.concatenate([qpos, qvel, ee_pos_quat, gripper_pos[None]])
+        state = np.concatenate(
+            [
+                qpos,
+                episode["joint_velocities"],
+                episode["ee_pos_quat"],
+                np.reshape(episode["gripper_position"], (num_frames, 1)),
+            ],
+            axis=1,
+        )
 
     return {
         "rgb": rgb,
@@ -98,6 +146,26 @@ def preproc_obs(
     }
 
 
+def preproc_obs(
+    demo: Dict[str, np.ndarray], joint_only: bool = True
+) -> Dict[str, np.ndarray]:
+    """Preprocess a single frame, see ``preproc_obs_batch``."""
+    keys = [
+        "wrist_rgb",
+        "wrist_depth",
+        "base_rgb",
+        "base_depth",
+        "joint_positions",
+        "joint_velocities",
+        "ee_pos_quat",
+        "gripper_position",
+    ]
+    episode = {key: np.asarray(demo[key])[None] for key in keys if key in demo}
+    return {
+        key: value[0] for key, value in preproc_obs_batch(episode, joint_only).items()
+    }
+
+
 class Pose(object):
     def __init__(self, x, y, z, qw, qx, qy, qz):
         self.p = np.array([x, y, z])
@@ -1,11 +1,27 @@
+"""Convert recorded demos into gdict trajectories for training.
+
+Every demo is read once. A pool of worker processes converts the demos, a
+chunk of frames at a time, into HDF5 trajectories with the raw actions and
+reports each demo's action min/max. The global min/max give the scale and
+bias that map the actions to [-1, 1], and a second pass rewrites only the
+small actions dataset of each trajectory. Videos and plots of the demos are
+a separate, optional stage that reads the converted trajectories.
+
+With ``--incremental`` the output of earlier runs is kept and only new or
+changed demos are converted, see ``ConversionManifest``.
+"""
+
+import concurrent.futures
 import glob
 import os
 import pickle
 import shutil
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, Iterator, Optional, Tuple
 import sys
 sys.path.append("/home/ju/Workspace/gello_software")
+import cv2
+import h5py
 import numpy as np
 import tyro
 from natsort import natsorted
@@ -16,10 +32,74 @@ from gello.data_utils.plot_utils import plot_in_grid
 np.set_printoptions(precision=3, suppress=True)
 
 import mediapy as mp
-from gdict.data import DictArray, GDict
+from gdict.file import dump_hdf5, load_hdf5
+from gdict.file.hdf5_utils import get_compression_kwargs
+from simple_bc.dataset.traj_store import TRAJ_STORE_DIR, export_traj_store
 from simple_bc.utils.visualization_utils import make_grid_video_from_numpy
 
-from gello.data_utils.conversion_utils import preproc_obs
+from gello.data_utils.conversion_manifest import (
+    MANIFEST_FILE,
+    TRAIN,
+    VAL,
+    ConversionManifest,
+    fingerprint_episode,
+)
+from gello.data_utils.conversion_utils import preproc_obs_batch
+from gello.data_utils.format_obs import (
+    CONTROL_KEY,
+    EPISODE_FILE,
+    TIMESTAMP_KEY,
+)
+
+# observations that are written to the trajectory file chunk by chunk, the
+# others are small and collected until the end
+IMAGE_KEYS = ("rgb", "depth")
+
+# every worker holds a chunk of raw frames and its preprocessing buffers, so
+# the default number of workers is capped to bound the memory use
+MAX_DEFAULT_WORKERS = 4
+
+
+def count_demo_frames(source_dir: str) -> int:
+    """Number of frames of a demo, without reading them."""
+    episode_file = os.path.join(source_dir, EPISODE_FILE)
+    if os.path.exists(episode_file):
+        with h5py.File(episode_file, "r") as f:
+            num_frames = f.attrs.get("num_frames", None)
+            if num_frames is None:
+                num_frames = len(f[CONTROL_KEY])
+            return int(num_frames)
+    return len(glob.glob(os.path.join(source_dir, "**/*.pkl"), recursive=True))
+
+
+def iter_demo_chunks(
+    source_dir: str, start: int = 0, chunk_frames: int = 32
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Read the frames of a demo from ``start`` on, ``chunk_frames`` at a time.
+
+    Every chunk is a dictionary with the frames stacked along the first axis.
+    Only one chunk of raw frames is in memory at a time. Reads the episode
+    file written by ``EpisodeWriter``, or the per-frame pkl files of older
+    recordings.
+    """
+    episode_file = os.path.join(source_dir, EPISODE_FILE)
+    if os.path.exists(episode_file):
+        num_frames = count_demo_frames(source_dir)
+        with h5py.File(episode_file, "r") as f:
+            datasets = {key: f[key] for key in f.keys() if key != TIMESTAMP_KEY}
+            for t in range(start, num_frames, chunk_frames):
+                end = min(t + chunk_frames, num_frames)
+                yield {key: dataset[t:end] for key, dataset in datasets.items()}
+        return
+
+    pkls = natsorted(glob.glob(os.path.join(source_dir, "**/*.pkl"), recursive=True))
+    for t in range(start, len(pkls), chunk_frames):
+        frames = []
+        for pkl in pkls[t : t + chunk_frames]:
+            with open(pkl, "rb") as f:
+                frames.append(pickle.load(f))
+        yield {key: np.stack([frame[key] for frame in frames]) for key in frames[0]}
+
 
 # def get_act_bounds(source_dir: str) -> np.ndarray:
 #     pkls = natsorted(
@@ -50,103 +130,144 @@ from gello.data_utils.conversion_utils import preproc_obs
 #     return scale_factor
 
 
-def get_act_min_max(source_dir: str) -> Tuple[np.ndarray, np.ndarray]:
-    pkls = natsorted(
-        glob.glob(os.path.join(source_dir, "**/*.pkl"), recursive=True), reverse=True
-    )
-    if len(pkls) <= 30:
-        print(f"Skipping {source_dir} because it has less than 30 frames.")
-        raise RuntimeError("Too few frames")
-    pkls = pkls[:-5]
+def traj_path(traj_output_dir: str, i: int) -> str:
+    return os.path.join(traj_output_dir, f"traj_{i}.h5")
 
-    scale_min = None
-    scale_max = None
-    for pkl in pkls:
-        try:
-            with open(pkl, "rb") as f:
-                demo = pickle.load(f)
-        except Exception as e:
-            print(f"Skipping {pkl} because it is corrupted.")
-            print(f"Error: {e}")
-            raise Exception("Corrupted pkl")
-
-        requested_control = demo.pop("control")
-        curr_scale_factor = requested_control
-        if scale_min is None:
-            assert scale_max is None
-            scale_min = curr_scale_factor
-            scale_max = curr_scale_factor
-        else:
-            assert scale_max is not None
-            scale_min = np.minimum(scale_min, curr_scale_factor)
-            scale_max = np.maximum(scale_min, curr_scale_factor)
-
-    assert scale_min is not None
-    assert scale_max is not None
-    return scale_min, scale_max
-
-
-def convert_single_demo(
-    source_dir,
-    i,
-    traj_output_dir,
-    rgb_output_dir,
-    depth_output_dir,
-    state_output_dir,
-    action_output_dir,
-    scale_factor,
-    bias_factor,
-):
-    """
-    1. converts the demo into a gdict
-    2. visualizes the RGB of the demo
-    3. visualizes the state + action space of the demo
-    4. returns these to be collated by the caller.
-    """
 
-    pkls = natsorted(
-        glob.glob(os.path.join(source_dir, "**/*.pkl"), recursive=True), reverse=True
-    )
-    demo_stack = []
+def actions_key(i: int) -> str:
+    """Path of the actions in a trajectory file written by ``GDict.to_hdf5``."""
+    return f"dict_str_traj_{i}/dict_str_actions"
 
-    if len(pkls) <= 30:
-        return 0
 
-    # go through the demo in reverse order.
-    # remove the first few frames because they are not useful.
-    pkls = pkls[:-5]
+def obs_key(i: int, key: str) -> str:
+    """Path of an observation in a trajectory file, see ``actions_key``."""
+    return f"dict_str_traj_{i}/dict_str_obs/dict_str_{key}"
 
-    for pkl in pkls:
-        curr_ts = {}
-        try:
-            with open(pkl, "rb") as f:
-                demo = pickle.load(f)
-        except:
-            print(f"Skipping {pkl} because it is corrupted.")
-            return 0
 
-        obs = preproc_obs(demo)
-        action = demo.pop("control")
-        action = (action - bias_factor) / scale_factor  # normalize between -1 and 1
+def convert_demo(
+    source_dir: str,
+    i: int,
+    traj_output_dir: str,
+    compression: Optional[str] = "lzf",
+    chunk_frames: int = 32,
+) -> Optional[Tuple[str, np.ndarray, np.ndarray]]:
+    """Convert a demo into a gdict trajectory with unnormalized actions.
 
-        curr_ts["obs"] = obs
-        curr_ts["actions"] = action
-        curr_ts["dones"] = np.zeros(1)  # random fill
-        curr_ts["episode_dones"] = np.zeros(1)  # random fill
+    The demo is read and preprocessed ``chunk_frames`` frames at a time, and
+    the images of each chunk are written straight into the trajectory file,
+    so a worker never holds a whole demo. The images are chunked per frame
+    and compressed with ``compression`` (None, "lzf", "gzip" or "blosc"), so
+    reading a few frames only decompresses those. The file has the layout
+    ``dump_hdf5`` writes.
 
-        curr_ts_wrapped = dict()
-        curr_ts_wrapped[f"traj_{i}"] = curr_ts
-        demo_stack = [curr_ts_wrapped] + demo_stack
+    Returns:
+        The trajectory file and the min and max of the demo's actions, or
+        None if the demo was skipped.
+    """
+    try:
+        num_frames = count_demo_frames(source_dir)
+    except Exception as e:
+        print(f"Skipping {source_dir} because it is corrupted.")
+        print(f"Error: {e}")
+        return None
+    if num_frames <= 30:
+        print(f"Skipping {source_dir} because it has less than 30 frames.")
+        return None
 
-    demo_dict = DictArray.stack(demo_stack)
-    GDict.to_hdf5(demo_dict, os.path.join(traj_output_dir + "", f"traj_{i}.h5"))
+    # remove the first few frames because they are not useful.
+    skip_frames = 5
+    num_frames -= skip_frames
+
+    filter_kwargs = get_compression_kwargs(compression)
+    path = traj_path(traj_output_dir, i)
+    actions = []
+    small_obs: Dict[str, list] = {}
+    try:
+        with h5py.File(path, "w") as f:
+            datasets: Dict[str, h5py.Dataset] = {}
+            t = 0
+            for chunk in iter_demo_chunks(source_dir, skip_frames, chunk_frames):
+                actions.append(chunk.pop(CONTROL_KEY))
+                obs = preproc_obs_batch(chunk)
+                for key, value in obs.items():
+                    if key not in IMAGE_KEYS:
+                        small_obs.setdefault(key, []).append(value)
+                if not datasets:
+                    for key in IMAGE_KEYS:
+                        frame = obs[key][0]
+                        datasets[key] = f.create_dataset(
+                            obs_key(i, key),
+                            shape=(num_frames, *frame.shape),
+                            dtype=frame.dtype,
+                            # like dump_hdf5, chunked only when compressed
+                            chunks=(1, *frame.shape) if filter_kwargs else None,
+                            **filter_kwargs,
+                        )
+                for key in IMAGE_KEYS:
+                    datasets[key][t : t + len(obs[key])] = obs[key]
+                t += len(actions[-1])
+            if t != num_frames:
+                raise ValueError(f"Expected {num_frames} frames, read {t}")
+
+            actions = np.concatenate(actions)
+            traj = {
+                "obs": {
+                    key: np.concatenate(values) for key, values in small_obs.items()
+                },
+                "actions": actions,
+                "dones": np.zeros((num_frames, 1)),  # random fill
+                "episode_dones": np.zeros((num_frames, 1)),  # random fill
+            }
+            dump_hdf5({f"traj_{i}": traj}, f)
+    except Exception as e:
+        print(f"Skipping {source_dir} because it is corrupted.")
+        print(f"Error: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    return path, actions.min(axis=0), actions.max(axis=0)
+
+
+def normalize_actions(
+    path: str, i: int, scale_factor: np.ndarray, bias_factor: np.ndarray
+) -> None:
+    """Normalize the actions of a converted trajectory in place.
+
+    The scale and bias are kept as attributes of the actions, so a trajectory
+    can be normalized again with new factors.
+    """
+    with h5py.File(path, "r+") as f:
+        dataset = f[actions_key(i)]
+        old_scale = dataset.attrs.get("scale_factor", 1.0)
+        old_bias = dataset.attrs.get("bias_factor", 0.0)
+        actions = dataset[()] * old_scale + old_bias
+        # normalize between -1 and 1
+        dataset[...] = (actions - bias_factor) / scale_factor
+        dataset.attrs["scale_factor"] = scale_factor
+        dataset.attrs["bias_factor"] = bias_factor
+
+
+def visualize_demo(
+    path: str,
+    i: int,
+    rgb_output_dir: str,
+    depth_output_dir: str,
+    state_output_dir: str,
+    action_output_dir: str,
+):
+    """
+    1. visualizes the RGB and depth of a converted demo
+    2. visualizes the state + action space of the demo
+    3. returns these to be collated by the caller.
+    """
+    traj = load_hdf5(path)[f"traj_{i}"]
 
     ## save the base videos
     # save the base rgb and depth videos
-    all_rgbs = demo_dict[f"traj_{i}"]["obs"]["rgb"][:, 1].transpose([0, 2, 3, 1])
+    all_rgbs = traj["obs"]["rgb"][:, 1].transpose([0, 2, 3, 1])
     all_rgbs = all_rgbs.astype(np.uint8)
     _, H, W, _ = all_rgbs.shape
-    all_depths = demo_dict[f"traj_{i}"]["obs"]["depth"][:, 1].reshape([-1, H, W])
+    all_depths = traj["obs"]["depth"][:, 1].reshape([-1, H, W])
     all_depths = all_depths / 5.0  # scale to 0-1
 
     mp.write_video(
@@ -160,10 +281,10 @@ def convert_single_demo(
 
     ## save the wrist videos
     # save the rgb and depth videos
-    all_rgbs = demo_dict[f"traj_{i}"]["obs"]["rgb"][:, 0].transpose([0, 2, 3, 1])
+    all_rgbs = traj["obs"]["rgb"][:, 0].transpose([0, 2, 3, 1])
     all_rgbs = all_rgbs.astype(np.uint8)
     _, H, W, _ = all_rgbs.shape
-    all_depths = demo_dict[f"traj_{i}"]["obs"]["depth"][:, 0].reshape([-1, H, W])
+    all_depths = traj["obs"]["depth"][:, 0].reshape([-1, H, W])
     all_depths = all_depths / 2.0  # scale to 0-1
 
     mp.write_video(
@@ -179,8 +300,8 @@ def convert_single_demo(
     all_depths = np.tile(all_depths[..., None], [1, 1, 1, 3])
 
     # save the state and action plots
-    all_actions = demo_dict[f"traj_{i}"]["actions"]
-    all_states = demo_dict[f"traj_{i}"]["obs"]["state"]
+    all_actions = traj["actions"]
+    all_states = traj["obs"]["state"]
 
     curr_actions = all_actions.reshape([1, *all_actions.shape])
     curr_states = all_states.reshape([-1, *all_states.shape])
@@ -195,65 +316,126 @@ def convert_single_demo(
     return all_rgbs, all_depths, all_actions, all_states
 
 
+def _init_worker() -> None:
+    # the demos are converted in parallel already, OpenCV threads would only
+    # compete with the other workers
+    cv2.setNumThreads(1)
+
+
 @dataclass
 class Args:
     source_dir: str = '/home/ju/bc_data/gello'
     vis: bool = True
+    """Write videos and plots of all converted demos, also those of earlier
+    --incremental runs."""
+    num_workers: Optional[int] = None
+    """Processes that convert demos, defaults to the number of CPUs, at most 4."""
+    chunk_frames: int = 32
+    """Frames of a demo that a worker reads and preprocesses at a time."""
+    incremental: bool = False
+    """Only convert new or changed demos, keep the output of earlier runs."""
+    hash_contents: bool = False
+    """Detect changed demos by hashing their files, not by size and mtime."""
+    compression: Optional[str] = "lzf"
+    """Compression of the images: lzf, gzip, blosc (needs hdf5plugin) or None."""
+    traj_store: bool = False
+    """Export each split to a TrajStore too, for ReplayDataset(use_traj_store=True)."""
 
 
 def main(args):
     subdirs = natsorted(glob.glob(os.path.join(args.source_dir, "*/"), recursive=True))
+    # the output lives in the source directory, it is not a demo
+    subdirs = [d for d in subdirs if os.path.basename(os.path.normpath(d)) != "_conv"]
+    names = [os.path.basename(os.path.normpath(d)) for d in subdirs]
 
     output_dir = args.source_dir
     if output_dir[-1] == "/":
         output_dir = output_dir[:-1]
 
-    output_dir = os.path.join(output_dir, "_conv")
-
-    if not os.path.isdir(output_dir):
-        os.mkdir(output_dir)
-
-    output_dir = os.path.join(output_dir, "multiview")
-
-    if not os.path.isdir(output_dir):
-        os.mkdir(output_dir)
-    else:
+    output_dir = os.path.join(output_dir, "_conv", "multiview")
+    if os.path.isdir(output_dir) and not args.incremental:
         print(f"Output directory {output_dir} already exists, and will be deleted")
         shutil.rmtree(output_dir)
-        os.mkdir(output_dir)
-
-    train_dir = os.path.join(output_dir, "train")
-    val_dir = os.path.join(output_dir, "val")
-
-    if not os.path.isdir(train_dir):
-        os.mkdir(train_dir)
-    if not os.path.isdir(val_dir):
-        os.mkdir(val_dir)
-
-    val_size = int(min(0.1 * len(subdirs), 10))
-    val_indices = np.random.choice(len(subdirs), size=val_size, replace=False)
-    val_indices = set(val_indices)
-
-    print("Computing scale factors")
-    pbar = tqdm(range(len(subdirs)))
-    min_scale_factor = None
-    max_scale_factor = None
-    for i in pbar:
-        try:
-            curr_min, curr_max = get_act_min_max(subdirs[i])
-            if min_scale_factor is None:
-                assert max_scale_factor is None
-                min_scale_factor = curr_min
-                max_scale_factor = curr_max
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = ConversionManifest(os.path.join(output_dir, MANIFEST_FILE))
+    removed = manifest.remove_missing(names)
+    if removed:
+        print(f"Removed {len(removed)} demos that no longer exist")
+
+    num_workers = args.num_workers or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers, initializer=_init_worker
+    ) as executor:
+        fingerprints = list(
+            executor.map(
+                fingerprint_episode,
+                subdirs,
+                [args.hash_contents] * len(subdirs),
+                chunksize=16,
+            )
+        )
+        todo = [
+            i
+            for i, (name, (_, fingerprint)) in enumerate(zip(names, fingerprints))
+            if not manifest.is_up_to_date(name, fingerprint)
+        ]
+        print(
+            f"Converting {len(todo)} of {len(subdirs)} demos with {num_workers} workers"
+        )
+
+        futures = {}
+        for i in todo:
+            index, split = manifest.assign(names[i])
+            out_dir = os.path.join(output_dir, split, "none")
+            os.makedirs(out_dir, exist_ok=True)
+            future = executor.submit(
+                convert_demo,
+                subdirs[i],
+                index,
+                out_dir,
+                args.compression,
+                args.chunk_frames,
+            )
+            futures[future] = (i, index, split, manifest.output_path(names[i]))
+            # recorded as skipped until it is converted, so that later
+            # episodes do not get the same index
+            manifest.record(names[i], index, split, *fingerprints[i])
+
+        # index of the demo -> trajectory file, converted in this run
+        converted: Dict[int, str] = {}
+        for future in tqdm(
+            concurrent.futures.as_completed(futures), total=len(futures)
+        ):
+            i, index, split, old_output = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error: {e}")
+                print(f"Skipping {subdirs[i]}")
+                result = None
+            if result is None:
+                # do not train on the trajectory of an older version
+                if old_output is not None and os.path.exists(old_output):
+                    os.remove(old_output)
             else:
-                assert max_scale_factor is not None
-                min_scale_factor = np.minimum(min_scale_factor, curr_min)
-                max_scale_factor = np.maximum(max_scale_factor, curr_max)
-            pbar.set_description(f"t: {i}")
-        except Exception as e:
-            print(f"Error: {e}")
-            print(f"Skipping {subdirs[i]}")
-            continue
+                path, act_min, act_max = result
+                manifest.record(
+                    names[i], index, split, *fingerprints[i], path, act_min, act_max
+                )
+                converted[index] = path
+    moved = manifest.ensure_val()
+    if moved is not None:
+        print(f"Moved {moved} to the validation split, it had no episodes")
+        index = manifest.episodes[moved]["index"]
+        if index in converted:
+            converted[index] = manifest.output_path(moved)
+    converted = dict(sorted(converted.items()))
+    if not manifest.converted():
+        print("No demos converted")
+        exit(1)
+
+    min_scale_factor, max_scale_factor = manifest.action_min_max()
     bias_factor = (min_scale_factor + max_scale_factor) / 2.0
     scale_factor = (max_scale_factor - min_scale_factor) / 2.0
     scale_factor[scale_factor == 0] = 1.0
@@ -267,77 +449,92 @@ def main(args):
     print(f"bias_factor = np.array([{bias_factor_str}])")
     print("*" * 80)
 
-    tot = 0
-
-    all_rgbs = []
-    all_depths = []
-    all_actions = []
-    all_states = []
-
-    vis_dir = os.path.join(output_dir, "vis")
-    state_output_dir = os.path.join(vis_dir, "state")
-    action_output_dir = os.path.join(vis_dir, "action")
-    rgb_output_dir = os.path.join(vis_dir, "rgb")
-    depth_output_dir = os.path.join(vis_dir, "depth")
-
-    if not os.path.isdir(vis_dir):
-        os.mkdir(vis_dir)
-    if not os.path.isdir(state_output_dir):
-        os.mkdir(state_output_dir)
-    if not os.path.isdir(action_output_dir):
-        os.mkdir(action_output_dir)
-    if not os.path.isdir(rgb_output_dir):
-        os.mkdir(rgb_output_dir)
-    if not os.path.isdir(depth_output_dir):
-        os.mkdir(depth_output_dir)
-
-    pbar = tqdm(range(len(subdirs)))
-    for i in pbar:
-        out_dir = val_dir if i in val_indices else train_dir
-        out_dir = os.path.join(out_dir, "none")
-
-        if not os.path.isdir(out_dir):
-            os.mkdir(out_dir)
-
-        ret = convert_single_demo(
-            subdirs[i],
-            i,
-            out_dir,
-            rgb_output_dir,
-            depth_output_dir,
-            state_output_dir,
-            action_output_dir,
-            scale_factor=scale_factor,
-            bias_factor=bias_factor,
-        )
-
-        if ret != 0:
-            all_rgbs.append(ret[0])
-            all_depths.append(ret[1])
-            all_actions.append(ret[2])
-            all_states.append(ret[3])
-            tot += 1
-
-        pbar.set_description(f"t: {i}")
+    # earlier trajectories only need to be rewritten if the factors changed
+    to_normalize = converted
+    if (
+        manifest.scale_factor is None
+        or not np.array_equal(manifest.scale_factor, scale_factor)
+        or not np.array_equal(manifest.bias_factor, bias_factor)
+    ):
+        to_normalize = {
+            index: os.path.join(output_dir, episode["output"])
+            for index, episode in manifest.converted().items()
+        }
+    for i, path in tqdm(to_normalize.items(), desc="Normalizing actions"):
+        normalize_actions(path, i, scale_factor, bias_factor)
+    manifest.scale_factor = scale_factor
+    manifest.bias_factor = bias_factor
+    manifest.save()
+    tot = len(manifest.converted())
+
+    for split in (TRAIN, VAL):
+        root = os.path.join(output_dir, split, "none")
+        store_dir = os.path.join(root, TRAJ_STORE_DIR)
+        filenames = [
+            os.path.join(output_dir, episode["output"])
+            for episode in manifest.converted().values()
+            if episode["split"] == split
+        ]
+        if args.traj_store and filenames:
+            export_traj_store(filenames, root)
+        elif os.path.isdir(store_dir):
+            # it does not match the new trajectories, ReplayDataset would
+            # ignore it anyway
+            print(f"Removing the outdated trajectory store {store_dir}")
+            shutil.rmtree(store_dir)
 
     print(
         f"Finished converting all demos to {output_dir}! (num demos: {tot} / {len(subdirs)})"
     )
 
     if args.vis:
-        if len(all_rgbs) > 0:
-            print(f"Visualizing all demos...")
+        vis_dir = os.path.join(output_dir, "vis")
+        state_output_dir = os.path.join(vis_dir, "state")
+        action_output_dir = os.path.join(vis_dir, "action")
+        rgb_output_dir = os.path.join(vis_dir, "rgb")
+        depth_output_dir = os.path.join(vis_dir, "depth")
+        for vis_output_dir in (
+            state_output_dir,
+            action_output_dir,
+            rgb_output_dir,
+            depth_output_dir,
+        ):
+            os.makedirs(vis_output_dir, exist_ok=True)
+
+        print("Visualizing all demos...")
+        # the grids show every demo, not only the ones converted in this run
+        to_visualize = {
+            index: os.path.join(output_dir, episode["output"])
+            for index, episode in manifest.converted().items()
+        }
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers, initializer=_init_worker
+        ) as executor:
+            futures = [
+                executor.submit(
+                    visualize_demo,
+                    path,
+                    i,
+                    rgb_output_dir,
+                    depth_output_dir,
+                    state_output_dir,
+                    action_output_dir,
+                )
+                for i, path in to_visualize.items()
+            ]
+            results = [future.result() for future in tqdm(futures)]
+        all_rgbs, all_depths, all_actions, all_states = (
+            [result[k] for result in results] for k in range(4)
+        )
 
-            plot_in_grid(
-                all_actions, os.path.join(action_output_dir, "_all_actions.png")
-            )
-            plot_in_grid(all_states, os.path.join(state_output_dir, "_all_states.png"))
-            make_grid_video_from_numpy(
-                all_rgbs, 10, os.path.join(rgb_output_dir, "_all_rgb.mp4"), fps=30
-            )
-            make_grid_video_from_numpy(
-                all_depths, 10, os.path.join(depth_output_dir, "_all_depth.mp4"), fps=30
-            )
+        plot_in_grid(all_actions, os.path.join(action_output_dir, "_all_actions.png"))
+        plot_in_grid(all_states, os.path.join(state_output_dir, "_all_states.png"))
+        make_grid_video_from_numpy(
+            all_rgbs, 10, os.path.join(rgb_output_dir, "_all_rgb.mp4"), fps=30
+        )
+        make_grid_video_from_numpy(
+            all_depths, 10, os.path.join(depth_output_dir, "_all_depth.mp4"), fps=30
+        )
 
     exit(0)
 
@@ -1,10 +1,14 @@
 import datetime
 import pickle
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Optional
 
 import numpy as np
 
+EPISODE_FILE = "episode.h5"
+TIMESTAMP_KEY = "timestamp"
+CONTROL_KEY = "control"
+
 
 def save_frame(
     folder: Path,
@@ -20,3 +24,119 @@ def save_frame(
 
     with open(recorded_file, "wb") as f:
         pickle.dump(obs, f)
+
+
+class EpisodeWriter:
+    """Appends the frames of one episode to a single chunked HDF5 file.
+
+    Every observation key, the action (``control``) and the frame time
+    (``timestamp``, POSIX seconds) get a dataset whose first axis is the frame
+    index. Datasets are created from the first frame with room for
+    ``initial_capacity`` frames and double in size when they fill up, so
+    appending a frame is a copy into an already allocated chunk. ``close``
+    trims them to the number of frames written.
+
+    The layout is a flat group of datasets, which ``load_hdf5`` from
+    ``gdict.file`` reads back as a dictionary of arrays.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        initial_capacity: int = 1024,
+        chunk_bytes: int = 1 << 20,
+        compression: Optional[str] = None,
+    ):
+        """
+        Args:
+            path: File to create, its parent folder is created if needed.
+            initial_capacity: Number of frames to allocate up front.
+            chunk_bytes: Target size of a chunk, at least one frame per chunk.
+            compression: Optional h5py compression filter, e.g. "lzf".
+        """
+        import h5py
+
+        path = Path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        self.path = path
+        self._file: Optional[h5py.File] = h5py.File(path, "w")
+        self._capacity = initial_capacity
+        self._chunk_bytes = chunk_bytes
+        self._compression = compression
+        self._datasets: Dict[str, Any] = {}
+        self._num_frames = 0
+
+    def __len__(self) -> int:
+        return self._num_frames
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def _create_datasets(self, frame: Dict[str, np.ndarray]) -> None:
+        for key, value in frame.items():
+            chunk_rows = max(1, min(self._capacity, self._chunk_bytes // value.nbytes))
+            self._datasets[key] = self._file.create_dataset(
+                key,
+                shape=(self._capacity,) + value.shape,
+                maxshape=(None,) + value.shape,
+                chunks=(chunk_rows,) + value.shape,
+                dtype=value.dtype,
+                compression=self._compression,
+            )
+
+    def _resize(self, num_frames: int) -> None:
+        for dataset in self._datasets.values():
+            dataset.resize(num_frames, axis=0)
+
+    def append(
+        self,
+        timestamp: datetime.datetime,
+        obs: Dict[str, Any],
+        action: np.ndarray,
+    ) -> None:
+        """Write one frame. ``obs`` is not modified."""
+        if self._file is None:
+            raise RuntimeError(f"Episode writer for {self.path} is closed")
+        frame = {key: np.asarray(value) for key, value in obs.items()}
+        frame[CONTROL_KEY] = np.asarray(action)
+        frame[TIMESTAMP_KEY] = np.asarray(timestamp.timestamp())
+
+        if not self._datasets:
+            self._create_datasets(frame)
+        elif frame.keys() != self._datasets.keys():
+            raise ValueError(
+                f"Frame keys {sorted(frame)} do not match the episode keys "
+                f"{sorted(self._datasets)}"
+            )
+        if self._num_frames == self._capacity:
+            self._capacity *= 2
+            self._resize(self._capacity)
+
+        for key, value in frame.items():
+            self._datasets[key][self._num_frames] = value
+        self._num_frames += 1
+
+    def flush(self) -> None:
+        """Push buffered data to disk, the file stays open."""
+        if self._file is not None:
+            self._file.attrs["num_frames"] = self._num_frames
+            self._file.flush()
+
+    def close(self) -> None:
+        """Trim the datasets to the frames written and close the file."""
+        if self._file is None:
+            return
+        self._resize(self._num_frames)
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+def load_episode(path: Path) -> Dict[str, np.ndarray]:
+    """Read an episode written by :class:`EpisodeWriter`."""
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        num_frames = f.attrs.get("num_frames", None)
+        return {key: dataset[:num_frames] for key, dataset in f.items()}
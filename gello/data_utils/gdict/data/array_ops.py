@@ -138,8 +138,33 @@ def tile(item, rep):
         return item
 
 
+def read_h5_dataset(dataset, indices, axis=0):
+    # Only read the requested items of a h5py dataset. h5py needs a list of indices to be increasing and unique, so
+    # every index is read once and the result is gathered in the requested order. On chunked datasets, h5py is much
+    # slower with a list of indices than with one read per index.
+    if isinstance(indices, (slice, int, np.integer)):
+        return dataset[(slice(None),) * axis + (indices,)]
+    indices = np.asarray(indices)
+    if indices.dtype == bool:
+        indices = np.nonzero(indices)[0]
+    indices = np.where(indices < 0, indices + dataset.shape[axis], indices)
+    unique, inverse = np.unique(indices, return_inverse=True)
+    if axis == 0 and dataset.chunks is not None:
+        ret = np.empty((len(unique),) + dataset.shape[1:], dtype=dataset.dtype)
+        for i, index in enumerate(unique):
+            dataset.read_direct(ret, np.s_[index], np.s_[i])
+    else:
+        ret = dataset[(slice(None),) * axis + (unique,)]
+    if len(unique) == len(indices) and (unique == indices).all():
+        return ret
+    return ret.take(inverse, axis=axis)
+
+
 def slice_item(item, slice, axis=0):
     # Avoid copying the data for numpy array and torch tensor
+    if is_h5(item):
+        # A dataset from load_hdf5(lazy=True)
+        return read_h5_dataset(item, slice, axis)
     if is_arr(item) or is_torch(item):
         if axis == 0:
             ret = item[slice]
@@ -665,6 +690,8 @@ def pad_clip(item, num, axis=1, pad_value=None):
 
 
 def to_two_dims(item):
+    if is_h5(item) and item.ndim == 1:
+        item = item[()]
     if (is_np_arr(item) or is_torch(item)) and item.ndim == 1:
         return item[..., None]
     return item
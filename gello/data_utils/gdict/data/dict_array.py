@@ -313,16 +313,16 @@ class GDict:
     def to_numpy(self, use_copy=False, dtype=None, wrapper=True):
         return self._recursive_do(self.memory, to_np, use_copy=use_copy, dtype=dtype, wrapper=wrapper)
 
-    def to_hdf5(self, file):
+    def to_hdf5(self, file, **kwargs):
         from gdict.file import dump_hdf5
 
-        dump_hdf5(self.memory, file)
+        dump_hdf5(self.memory, file, **kwargs)
 
     @classmethod
-    def from_hdf5(cls, file, wrapper=True):
+    def from_hdf5(cls, file, wrapper=True, lazy=False):
         from gdict.file import load_hdf5
 
-        ret = load_hdf5(file)
+        ret = load_hdf5(file, lazy=lazy)
         if wrapper:
             ret = cls(ret)
         return ret
@@ -368,7 +368,7 @@ class GDict:
     @property
     def is_np_all(self):
         ret = self._flatten(self._recursive_do_on_memory(self.memory, is_np))
-        return np.alltrue([v for k, v in ret.items()]) if isinstance(ret, dict) else ret
+        return np.all([v for k, v in ret.items()]) if isinstance(ret, dict) else ret
 
     @property
     def nbytes_all(self):
@@ -1,2 +1,2 @@
 from .serialization import *
-from .hdf5_utils import load_hdf5, dump_hdf5
+from .hdf5_utils import load_hdf5, dump_hdf5, get_compression_kwargs
@@ -1,12 +1,17 @@
+import warnings
+
 from h5py import File, Group, Dataset
 import numpy as np
 
 from ..data import is_h5, is_list_of, is_dict, is_arr, to_np, is_str, is_not_null
 
 
-def load_hdf5(file, keys=None):
+def load_hdf5(file, keys=None, lazy=False):
     """
     Load all elements in HDF5
+
+    With lazy=True, arrays are returned as h5py datasets instead of being read, so that indexing them later only
+    reads the chunks that are needed. The file is then left open for as long as the datasets are used.
     """
 
     def _load_hdf5(file, load_keys, only_one):
@@ -61,6 +66,8 @@ def load_hdf5(file, keys=None):
             return ret
         elif isinstance(file, Dataset):
             assert load_keys is None or len(load_keys) == 0, f"{load_keys}"
+            if lazy and file.shape != () and file.dtype.kind != "V":
+                return file
             ret = file[()]
             if isinstance(ret, np.void):
                 from .serialization import load
@@ -80,13 +87,50 @@ def load_hdf5(file, keys=None):
     if not is_h5(file):
         file = File(file, "r")
         ret = _load_hdf5(file, keys, only_one)
-        file.close()
+        if not lazy:
+            file.close()
     else:
         ret = _load_hdf5(file, keys, only_one)
     return ret
 
 
-def dump_hdf5(obj, file):
+def get_compression_kwargs(compression=None, compression_opts=None):
+    """
+    Keyword arguments of h5py's create_dataset for a compression filter: None, "lzf", "gzip" or "blosc".
+    Blosc needs hdf5plugin, without it lzf is used instead.
+    """
+    if compression is None:
+        return {}
+    if compression == "blosc":
+        try:
+            import hdf5plugin
+        except ImportError:
+            warnings.warn("hdf5plugin is not installed, using lzf instead of blosc compression.")
+            return {"compression": "lzf"}
+        opts = {"cname": "lz4", "clevel": 5, "shuffle": hdf5plugin.Blosc.SHUFFLE}
+        opts.update(compression_opts or {})
+        return dict(hdf5plugin.Blosc(**opts))
+    if compression not in ["lzf", "gzip"]:
+        raise ValueError(f"Unknown compression {compression}, use lzf, gzip or blosc.")
+    if compression_opts is None:
+        return {"compression": compression}
+    return {"compression": compression, "compression_opts": compression_opts}
+
+
+def dump_hdf5(obj, file, compression=None, compression_opts=None, chunk_steps=None, min_chunk_bytes=4096):
+    """
+    Dump a nested dict / list of arrays to HDF5.
+
+    By default every array is written as one contiguous dataset. Arrays whose items along the first (time) axis
+    have at least min_chunk_bytes, e.g. images, can be chunked by chunk_steps items and compressed:
+    compression is None, "lzf", "gzip" or "blosc" (needs hdf5plugin). Setting a compression without chunk_steps
+    chunks by one item, so that reading a few timesteps only decompresses those. Smaller arrays are always
+    contiguous and uncompressed.
+    """
+    filter_kwargs = get_compression_kwargs(compression, compression_opts)
+    if filter_kwargs and chunk_steps is None:
+        chunk_steps = 1
+
     def _dump_hdf5(memory, file, root_key=""):
         if isinstance(memory, (list, dict)):
             keys = range(len(memory)) if is_list_of(memory) else memory.keys()
@@ -96,7 +140,12 @@ def dump_hdf5(obj, file):
             root_key = root_key.replace("//", "/") if root_key != "" else "GDict"
             if is_arr(memory):
                 memory = to_np(memory)
-                file[root_key] = memory
+                if chunk_steps is not None and memory.ndim > 0 and memory.shape[0] > 0 and \
+                        memory[:1].nbytes >= min_chunk_bytes:
+                    chunks = (min(chunk_steps, memory.shape[0]),) + memory.shape[1:]
+                    file.create_dataset(root_key, data=memory, chunks=chunks, **filter_kwargs)
+                else:
+                    file[root_key] = memory
             else:
                 from .serialization import dump
 
@@ -0,0 +1,203 @@
+"""Episode recording off the control thread.
+
+``EpisodeRecorder`` puts frames on a bounded queue and a writer thread does the
+serialization and disk I/O, so a slow disk no longer stretches control ticks.
+When the queue is full the recorder either blocks (no frames are lost, the
+control loop waits) or drops the frame and counts it.
+"""
+
+import datetime
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from gello.data_utils.format_obs import EPISODE_FILE, EpisodeWriter, save_frame
+
+BACKPRESSURE_BLOCK = "block"
+BACKPRESSURE_DROP = "drop"
+
+_START = "start"
+_FRAME = "frame"
+_END = "end"
+_STOP = "stop"
+
+
+class EpisodeRecorder:
+    """Writes episodes on a background thread fed by a bounded queue."""
+
+    def __init__(
+        self,
+        file_format: str = "hdf5",
+        queue_size: int = 256,
+        backpressure: str = BACKPRESSURE_BLOCK,
+        copy: bool = True,
+        num_latency_samples: int = 4096,
+    ):
+        """
+        Args:
+            file_format: "hdf5" for one file per episode, "pkl" for one pickle
+                file per frame.
+            queue_size: Frames that can wait for the writer. 0 writes on the
+                calling thread, like the recorder did before.
+            backpressure: What ``record`` does when the queue is full, "block"
+                or "drop".
+            copy: Copy arrays when a frame is queued. Needed when the caller
+                reuses its buffers, e.g. camera frames from a ring buffer.
+            num_latency_samples: Size of the window of enqueue latencies.
+        """
+        if file_format not in ("hdf5", "pkl"):
+            raise ValueError(f"Invalid file format {file_format}")
+        if backpressure not in (BACKPRESSURE_BLOCK, BACKPRESSURE_DROP):
+            raise ValueError(f"Invalid backpressure {backpressure}")
+        self.file_format = file_format
+        self.backpressure = backpressure
+        self._copy = copy
+
+        self._folder: Optional[Path] = None
+        self._writer: Optional[EpisodeWriter] = None
+        self._error: Optional[BaseException] = None
+
+        self._latencies = np.zeros(num_latency_samples, dtype=np.int64)
+        self._num_enqueued = 0
+        self._num_dropped = 0
+        self._num_written = 0
+        self._max_queue_size = 0
+
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        if queue_size > 0:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._thread.start()
+
+    def start_episode(self, folder: Path) -> None:
+        """Start a new episode in ``folder``, ending the current one."""
+        self._put((_START, Path(folder)))
+
+    def record(
+        self, timestamp: datetime.datetime, obs: Dict[str, Any], action: np.ndarray
+    ) -> bool:
+        """Queue a frame of the current episode.
+
+        Returns:
+            False if the frame was dropped because the queue was full.
+        """
+        if self._error is not None:
+            raise RuntimeError("Episode writer failed") from self._error
+        start = time.perf_counter_ns()
+        if self._copy and self._queue is not None:
+            obs = {
+                k: v.copy() if isinstance(v, np.ndarray) else v for k, v in obs.items()
+            }
+            action = np.array(action)
+        item = (_FRAME, timestamp, obs, action)
+
+        if self._queue is None:
+            self._handle(item)
+            queued = True
+        elif self.backpressure == BACKPRESSURE_DROP:
+            try:
+                self._queue.put_nowait(item)
+                queued = True
+            except queue.Full:
+                queued = False
+        else:
+            self._queue.put(item)
+            queued = True
+
+        self._latencies[self._num_enqueued % len(self._latencies)] = (
+            time.perf_counter_ns() - start
+        )
+        self._num_enqueued += 1
+        if queued:
+            self._max_queue_size = max(self._max_queue_size, self.queue_size)
+        else:
+            self._num_dropped += 1
+        return queued
+
+    def end_episode(self) -> None:
+        """Close the current episode once its queued frames are written."""
+        self._put((_END,))
+
+    def close(self) -> None:
+        """End the current episode, write every queued frame and stop."""
+        self.end_episode()
+        if self._thread is not None:
+            self._put((_STOP,))
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+
+    @property
+    def queue_size(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def stats(self) -> Dict[str, float]:
+        """Counters and the enqueue latency (us) over the recent frames."""
+        num_samples = min(self._num_enqueued, len(self._latencies))
+        latencies = self._latencies[:num_samples] / 1e3
+        stats = {
+            "enqueued": self._num_enqueued,
+            "dropped": self._num_dropped,
+            "written": self._num_written,
+            "max_queue_size": self._max_queue_size,
+        }
+        if num_samples:
+            p50, p99 = np.percentile(latencies, [50, 99])
+            stats.update(
+                enqueue_p50_us=p50, enqueue_p99_us=p99, enqueue_max_us=latencies.max()
+            )
+        return stats
+
+    def _put(self, item: tuple) -> None:
+        if self._queue is None:
+            self._handle(item)
+        else:
+            self._queue.put(item)
+
+    def _write_loop(self) -> None:
+        assert self._queue is not None
+        while True:
+            item = self._queue.get()
+            if item[0] == _STOP:
+                return
+            if self._error is not None:
+                # keep draining so that the control loop never blocks on a
+                # queue nobody reads
+                continue
+            try:
+                self._handle(item)
+            except Exception as e:
+                print(f"\nEpisode writer failed: {e}")
+                self._error = e
+
+    def _handle(self, item: tuple) -> None:
+        kind = item[0]
+        if kind == _START:
+            self._end()
+            self._folder = item[1]
+            self._folder.mkdir(parents=True, exist_ok=True)
+            if self.file_format == "hdf5":
+                self._writer = EpisodeWriter(self._folder / EPISODE_FILE)
+        elif kind == _FRAME:
+            _, timestamp, obs, action = item
+            if self._writer is not None:
+                self._writer.append(timestamp, obs, action)
+            elif self._folder is not None:
+                save_frame(self._folder, timestamp, obs, action)
+            else:
+                return
+            self._num_written += 1
+        elif kind == _END:
+            self._end()
+
+    def _end(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            print(f"\nSaved {len(self._writer)} frames to {self._writer.path}")
+            self._writer = None
+        self._folder = None
@@ -1,10 +1,12 @@
 import copy
+import os
 import numpy as np
 import torch
 import torchvision.transforms as T
 from torch.utils.data import IterableDataset
 from torchvision.transforms.functional import InterpolationMode
 
+from simple_bc.dataset.traj_store import TRAJ_STORE_DIR, TrajStore, is_traj_store
 from simple_bc.utils.data_utils import load_traj_from_memory, load_traj_files
 from simple_bc.utils.torch_utils import pack_one, unpack_one
 
@@ -20,15 +22,21 @@ class CachedTrajLoader(object):
         stack_idx,
         stack_window,
         all_traj_cache=dict(),  # note that this is shared between all CachedTrajLoader instances
+        lazy_load=False,
+        traj_store=None,
     ):
         """
         shuffle: If False, the trajectories are loaded in order. If True, the trajectories are shuffled.
+        lazy_load: If True, only the sampled timesteps are read from the trajectory files.
+        traj_store: If given, the trajectories are loaded from this TrajStore by name instead of from files.
         """
         self.shuffle = shuffle
         self.stack_idx = np.array(stack_idx)
         self.stack_window = stack_window
         self.num_cached_traj = 4
         self.all_traj_cache = all_traj_cache
+        self.lazy_load = lazy_load
+        self.traj_store = traj_store
 
         self.worker_filenames, self.unload_filenames = None, None
         self.cached_trajs, self.cached_trajs_starts, self.cached_trajs_shuffled_idx = (
@@ -63,10 +71,12 @@ class CachedTrajLoader(object):
             and len(self.unload_filenames) > 0
         ):
             traj_filename = self.unload_filenames.pop()
-            if traj_filename in self.all_traj_cache:
+            if self.traj_store is not None:
+                traj = self.traj_store.load(traj_filename)
+            elif traj_filename in self.all_traj_cache:
                 traj = self.all_traj_cache[traj_filename]
             else:
-                traj = load_traj_from_memory(traj_filename)
+                traj = load_traj_from_memory(traj_filename, lazy=self.lazy_load)
             self.cached_trajs.append(traj)
             self.cached_trajs_starts.append(0)
 
@@ -122,6 +132,8 @@ class ReplayDataset(IterableDataset):
         action_horizon=1,
         stride=1,
         cache_all_traj=False,
+        lazy_load=False,
+        use_traj_store=False,
         **kwargs,
     ):
         self.dataset_dir = dataset_dir
@@ -131,6 +143,7 @@ class ReplayDataset(IterableDataset):
         self.aug_cfg = aug_cfg
         self.shuffle = shuffle
         self.cache_all_traj = cache_all_traj
+        self.lazy_load = lazy_load
 
         self.stride = stride
 
@@ -171,11 +184,30 @@ class ReplayDataset(IterableDataset):
                 print("ReplayDataset: not using depth.")
         else:
             self.use_depth = True
-        self.buffer_filenames = load_traj_files(
-            self.dataset_dir, self.token_name, stride=self.stride
+        # a TrajStore exported next to the trajectory files, see traj_store.py
+        self.traj_store = (
+            self._open_traj_store(dataset_dir, token_name) if use_traj_store else None
         )
+        if self.traj_store is not None:
+            self.buffer_filenames = self.traj_store.names[:: self.stride]
+            print(
+                f"ReplayDataset: loading {len(self.buffer_filenames)} trajectories from {self.traj_store.store_dir}"
+            )
+        else:
+            self.buffer_filenames = load_traj_files(
+                self.dataset_dir, self.token_name, stride=self.stride
+            )
         self.all_trajs = {}
-        if self.cache_all_traj:
+        if self.cache_all_traj and self.traj_store is not None:
+            # the store is shared by all workers through the page cache
+            print(
+                "ReplayDataset: using the trajectory store, not caching the trajectories."
+            )
+        elif self.cache_all_traj and self.lazy_load:
+            # open files can not be sent to the workers, and lazy loading
+            # keeps little in memory anyway
+            print("ReplayDataset: loading lazily, not caching the trajectories.")
+        elif self.cache_all_traj:
             for traj_filename in self.buffer_filenames:
                 self.all_trajs[traj_filename] = load_traj_from_memory(traj_filename)
             print(f"ReplayDataset: cached all trajectories.")
@@ -199,8 +231,33 @@ class ReplayDataset(IterableDataset):
             stack_idx=self.stack_idx,
             stack_window=self.stack_window,
             all_traj_cache=self.all_trajs,
+            lazy_load=self.lazy_load,
+            traj_store=self.traj_store,
         )
 
+    @staticmethod
+    def _open_traj_store(dataset_dir, token_name):
+        """
+        The TrajStore of the dataset, or None if there is none or it does not match
+        the trajectory files anymore.
+        """
+        root = os.path.join(dataset_dir, token_name)
+        store_dir = os.path.join(root, TRAJ_STORE_DIR)
+        if not is_traj_store(store_dir):
+            print(f"ReplayDataset: no trajectory store in {store_dir}.")
+            return None
+        try:
+            traj_store = TrajStore(store_dir)
+            reason = traj_store.check(load_traj_files(dataset_dir, token_name), root)
+        except ValueError as e:
+            reason = str(e)
+        if reason is not None:
+            print(
+                f"ReplayDataset: not using the outdated trajectory store {store_dir}, {reason}. Export it again."
+            )
+            return None
+        return traj_store
+
     def __iter__(self):
         self.reset_buffer()
 
@@ -0,0 +1,245 @@
+"""
+A store of all trajectories of a dataset as memory-mapped arrays.
+
+Reading a trajectory from its .h5 file decodes all of it into the memory of
+every DataLoader worker. The store flattens the trajectories into one .npy
+file per key, e.g. obs.rgb.npy holds the rgb frames of every episode one after
+the other, and an index.json with the offset and length of every episode.
+TrajStore opens the .npy files with np.memmap, so opening a dataset reads no
+data, all workers share the OS page cache, and sampling frames only reads
+those frames.
+
+Build a store next to the .h5 files with
+    python -m simple_bc.dataset.traj_store <dataset_dir> [--token_name none]
+ReplayDataset uses it with use_traj_store=True. The index records the size
+and mtime of every .h5 file, and a store that no longer matches the files is
+not used until it is exported again.
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+import gdict as gd
+from gdict.file import load_hdf5
+from natsort import natsorted
+
+TRAJ_STORE_DIR = "traj_store"
+INDEX_FILE = "index.json"
+STORE_VERSION = 2
+
+# the keys of the trajectories that are used for training
+STORE_KEYS = ["obs", "actions"]
+
+
+def _flatten(memory, prefix=""):
+    """Nested dict of arrays -> {"obs/rgb": array, ...}"""
+    ret = {}
+    for key, value in memory.items():
+        if isinstance(value, dict):
+            ret.update(_flatten(value, f"{prefix}{key}/"))
+        else:
+            ret[f"{prefix}{key}"] = value
+    return ret
+
+
+def _unflatten(flat):
+    ret = {}
+    for key, value in flat.items():
+        *parents, name = key.split("/")
+        memory = ret
+        for parent in parents:
+            memory = memory.setdefault(parent, {})
+        memory[name] = value
+    return ret
+
+
+def _open_traj(filename):
+    """The stored keys of the trajectory in a file, as h5py datasets."""
+    trajs = load_hdf5(filename, lazy=True)
+    # only one traj per file, see load_traj_from_memory
+    traj = trajs[natsorted(trajs.keys())[0]]
+    return _flatten({key: traj[key] for key in STORE_KEYS})
+
+
+def is_traj_store(store_dir):
+    return os.path.exists(os.path.join(store_dir, INDEX_FILE))
+
+
+def _source_stat(filename):
+    """Size and mtime of a trajectory file, to tell whether it changed."""
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def export_traj_store(filenames, root, store_dir=None):
+    """
+    Copy the trajectories in filenames into a store.
+    filenames: The .h5 files of the trajectories, in the order of the store.
+    root: Directory that the episode names in the store are relative to.
+    store_dir: Defaults to root/TRAJ_STORE_DIR.
+    """
+    if store_dir is None:
+        store_dir = os.path.join(root, TRAJ_STORE_DIR)
+
+    # first pass: the length of every episode and the layout of every key
+    lengths = []
+    layout = None
+    for filename in filenames:
+        traj = _open_traj(filename)
+        traj_layout = {
+            # 1-D keys are stored as (T, 1), like DictArray.to_two_dims
+            key: (value.shape[1:] or (1,), value.dtype)
+            for key, value in traj.items()
+        }
+        if layout is None:
+            layout = traj_layout
+        elif traj_layout != layout:
+            raise ValueError(
+                f"{filename} has keys {traj_layout}, the first trajectory has {layout}"
+            )
+        lengths.append(len(traj["actions"]))
+        next(iter(traj.values())).file.close()
+    if layout is None:
+        raise ValueError("No trajectories to export.")
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int)
+
+    # second pass: copy the data, into a new directory that replaces the old
+    # store at the end so that readers never see a half written one
+    tmp_dir = store_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    key_files = {key: key.replace("/", ".") + ".npy" for key in layout}
+    arrays = {
+        key: np.lib.format.open_memmap(
+            os.path.join(tmp_dir, key_files[key]),
+            mode="w+",
+            dtype=dtype,
+            shape=(sum(lengths), *shape),
+        )
+        for key, (shape, dtype) in layout.items()
+    }
+    for filename, start, length in zip(filenames, starts, lengths):
+        traj = _open_traj(filename)
+        for key, value in traj.items():
+            arrays[key][start : start + length] = value[()].reshape(
+                length, *layout[key][0]
+            )
+        next(iter(traj.values())).file.close()
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    index = {
+        "version": STORE_VERSION,
+        "keys": key_files,
+        "episodes": [
+            {
+                "name": os.path.relpath(filename, root),
+                "start": int(start),
+                "length": int(length),
+                "source": _source_stat(filename),
+            }
+            for filename, start, length in zip(filenames, starts, lengths)
+        ],
+    }
+    with open(os.path.join(tmp_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f, indent=1)
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+    print(f"TrajStore: exported {len(filenames)} trajectories to {store_dir}")
+    return store_dir
+
+
+class TrajStore(object):
+    def __init__(self, store_dir):
+        """
+        store_dir: A directory written by export_traj_store.
+        """
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(
+                f"Unsupported store version {index.get('version')} in {store_dir}"
+            )
+        self.key_files = index["keys"]
+        self.names = [episode["name"] for episode in index["episodes"]]
+        self.episodes = {
+            episode["name"]: (episode["start"], episode["length"])
+            for episode in index["episodes"]
+        }
+        self.sources = {
+            episode["name"]: episode["source"] for episode in index["episodes"]
+        }
+        # opened on first use, so that every DataLoader worker maps the files
+        # itself instead of getting a pickled copy of the data
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def check(self, filenames, root):
+        """
+        Why the store does not match the trajectory files, None if it does.
+        filenames: The .h5 files of the dataset.
+        root: Directory that the episode names are relative to.
+        """
+        names = {os.path.relpath(filename, root): filename for filename in filenames}
+        missing = set(self.names) - set(names)
+        if missing:
+            return f"{len(missing)} trajectories were removed, e.g. {min(missing)}"
+        added = set(names) - set(self.names)
+        if added:
+            return f"{len(added)} trajectories were added, e.g. {min(added)}"
+        for name in self.names:
+            if _source_stat(names[name]) != self.sources[name]:
+                return f"{name} changed after the export"
+        return None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    @property
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = {
+                key: np.load(os.path.join(self.store_dir, filename), mmap_mode="r")
+                for key, filename in self.key_files.items()
+            }
+        return self._arrays
+
+    def load(self, name):
+        """
+        The episode as a DictArray of memory-mapped views, like the one returned
+        by load_traj_from_memory. Nothing is read until it is indexed.
+        """
+        start, length = self.episodes[name]
+        traj = {
+            key: array[start : start + length] for key, array in self.arrays.items()
+        }
+        return gd.DictArray(_unflatten(traj), capacity=length, faster=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the trajectories of a dataset to a TrajStore."
+    )
+    parser.add_argument("dataset_dir")
+    parser.add_argument("--token_name", default="none")
+    args = parser.parse_args()
+
+    root = os.path.join(args.dataset_dir, args.token_name)
+    filenames = natsorted(glob.glob(os.path.join(root, "**/*.h5"), recursive=True))
+    export_traj_store(filenames, root)
+
+
+if __name__ == "__main__":
+    main()
@@ -47,8 +47,12 @@ def normalize_quat(quats, dim):
     return quats * signs[:, None]
 
 
-def load_traj_from_memory(filename):
-    trajs = gd.GDict.from_hdf5(filename)
+def load_traj_from_memory(filename, lazy=False):
+    """
+    Load the trajectory in a file. With lazy=True the arrays stay in the file
+    as h5py datasets and slicing the trajectory only reads those timesteps.
+    """
+    trajs = gd.GDict.from_hdf5(filename, lazy=lazy)
     key = natsorted(trajs.keys())[
         0
     ]  # Take the first key, assuming there is only one traj per file
@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+
+from gello.data_utils.conversion_manifest import (
+    TRAIN,
+    VAL,
+    ConversionManifest,
+    fingerprint_episode,
+)
+
+
+def _write(path, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_fingerprint_changes_with_files(tmp_path):
+    episode = tmp_path / "ep0"
+    _write(str(episode / "0.pkl"), b"frame0")
+    files, fingerprint = fingerprint_episode(str(episode))
+    assert files == {"0.pkl": [6, os.stat(episode / "0.pkl").st_mtime_ns]}
+    assert fingerprint_episode(str(episode))[1] == fingerprint
+
+    _write(str(episode / "1.pkl"), b"frame1")
+    assert fingerprint_episode(str(episode))[1] != fingerprint
+
+    content_fingerprint = fingerprint_episode(str(episode), hash_contents=True)[1]
+    # same size and mtime, different contents
+    stat = os.stat(episode / "1.pkl")
+    _write(str(episode / "1.pkl"), b"frameX")
+    os.utime(episode / "1.pkl", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert fingerprint_episode(str(episode), hash_contents=True)[1] != (
+        content_fingerprint
+    )
+
+
+def test_manifest_round_trip_and_stable_assignment(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = ConversionManifest(path)
+    assignments = {}
+    for k in range(200):
+        name = f"episode_{k}"
+        index, split = manifest.assign(name)
+        assignments[name] = (index, split)
+        output = str(tmp_path / split / f"traj_{index}.h5")
+        _write(output, b"")
+        manifest.record(
+            name, index, split, {}, f"fp{k}", output, np.full(2, -k), np.full(2, k)
+        )
+    splits = [split for _, split in assignments.values()]
+    assert splits.count(VAL) == 10
+    assert sorted(index for index, _ in assignments.values()) == list(range(200))
+    manifest.scale_factor = np.ones(2)
+    manifest.bias_factor = np.zeros(2)
+    manifest.save()
+
+    manifest = ConversionManifest(path)
+    assert manifest.is_up_to_date("episode_3", "fp3")
+    assert not manifest.is_up_to_date("episode_3", "changed")
+    assert not manifest.is_up_to_date("new_episode", "fp")
+    assert manifest.assign("episode_7") == assignments["episode_7"]
+    assert manifest.assign("new_episode") == (200, TRAIN)
+    assert np.array_equal(manifest.scale_factor, np.ones(2))
+    act_min, act_max = manifest.action_min_max()
+    assert np.array_equal(act_min, [-199, -199])
+    assert np.array_equal(act_max, [199, 199])
+
+
+def test_manifest_skipped_and_removed_episodes(tmp_path):
+    manifest = ConversionManifest(str(tmp_path / "manifest.json"))
+    output = str(tmp_path / "train" / "traj_0.h5")
+    _write(output, b"")
+    manifest.record("kept", 0, TRAIN, {}, "a", output, np.zeros(1), np.ones(1))
+    manifest.record("short", 1, TRAIN, {}, "b")
+    assert manifest.is_up_to_date("short", "b")
+    assert list(manifest.converted()) == [0]
+
+    os.remove(output)
+    # the trajectory is gone, convert again
+    assert not manifest.is_up_to_date("kept", "a")
+
+    assert manifest.remove_missing(["kept"]) == ["short"]
+    assert list(manifest.episodes) == ["kept"]
+
+
+def test_manifest_ensures_a_val_episode(tmp_path):
+    manifest = ConversionManifest(str(tmp_path / "manifest.json"))
+    output = str(tmp_path / TRAIN / "none" / "traj_0.h5")
+    _write(output, b"traj")
+    manifest.record("only", 0, TRAIN, {}, "a", output, np.zeros(1), np.ones(1))
+    manifest.record("short", 1, TRAIN, {}, "b")
+    # one trajectory stays in train
+    assert manifest.ensure_val() is None
+
+    for k in (2, 3):
+        output = str(tmp_path / TRAIN / "none" / f"traj_{k}.h5")
+        _write(output, b"traj")
+        manifest.record(f"ep{k}", k, TRAIN, {}, "c", output, np.zeros(1), np.ones(1))
+    moved = manifest.ensure_val()
+    assert moved in ("only", "ep2", "ep3")
+    episode = manifest.episodes[moved]
+    assert episode["split"] == VAL
+    assert episode["output"] == os.path.join(VAL, "none", f"traj_{episode['index']}.h5")
+    assert manifest.is_up_to_date(moved, episode["fingerprint"])
+    assert not os.path.exists(tmp_path / TRAIN / "none" / f"traj_{episode['index']}.h5")
+    # stable once there is a val episode
+    assert manifest.ensure_val() is None
+    assert sum(e["split"] == VAL for e in manifest.episodes.values()) == 1
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+# conversion_utils also holds the torch and pose helpers
+pytest.importorskip("torch")
+pytest.importorskip("transforms3d")
+
+from gello.data_utils.conversion_utils import (  # noqa: E402
+    center_crop,
+    center_crop_slices,
+    filter_depth,
+    preproc_images,
+    preproc_obs,
+    preproc_obs_batch,
+    resize,
+)
+
+
+def _demo(num_frames: int = 4, height: int = 48, width: int = 64):
+    rng = np.random.default_rng(0)
+    depth = rng.uniform(-0.5, 3.0, (num_frames, height, width, 1))
+    depth[:, 0, 0] = np.nan
+    depth[:, 1, 1] = np.inf
+    return {
+        "wrist_rgb": rng.integers(0, 256, (num_frames, height, width, 3), np.uint8),
+        "wrist_depth": depth,
+        "base_rgb": rng.integers(0, 256, (num_frames, height, width, 3), np.uint8),
+        "base_depth": depth[:, ::-1].copy(),
+        "joint_positions": rng.normal(size=(num_frames, 7)),
+        "joint_velocities": rng.normal(size=(num_frames, 7)),
+        "ee_pos_quat": rng.normal(size=(num_frames, 7)),
+        "gripper_position": rng.uniform(size=num_frames),
+    }
+
+
+def _reference_frame(rgb: np.ndarray, depth: np.ndarray):
+    """Preprocess one frame in float64 with the per-frame helpers."""
+    rgb, depth = center_crop(rgb.transpose([2, 0, 1]) * 1.0, depth.transpose([2, 0, 1]))
+    rgb, depth = resize(rgb, depth)
+    return rgb, filter_depth(depth)
+
+
+@pytest.mark.parametrize("height, width", [(48, 64), (64, 48)])
+def test_batch_matches_per_frame(height, width):
+    demo = _demo(height=height, width=width)
+    batch = preproc_obs_batch(demo, joint_only=False)
+    assert batch["rgb"].shape == (4, 2, 3, 224, 224)
+    assert batch["rgb"].dtype == np.uint8
+    assert batch["depth"].shape == (4, 2, 1, 224, 224)
+    assert batch["depth"].dtype == np.float32
+
+    for t in range(4):
+        frame = {key: value[t] for key, value in demo.items()}
+        single = preproc_obs(frame, joint_only=False)
+        for key, value in single.items():
+            np.testing.assert_array_equal(batch[key][t], value)
+
+        for cam, camera in enumerate(["wrist", "base"]):
+            rgb, depth = _reference_frame(
+                frame[f"{camera}_rgb"], frame[f"{camera}_depth"]
+            )
+            # uint8 resize rounds where the float reference does not
+            diff = np.abs(batch["rgb"][t, cam].astype(np.float64) - rgb)
+            assert diff.max() <= 1.0
+            np.testing.assert_allclose(batch["depth"][t, cam], depth, atol=1e-5)
+            assert np.isfinite(batch["depth"][t, cam]).all()
+            assert batch["depth"][t, cam].min() >= 0.0
+            assert batch["depth"][t, cam].max() <= 2.0
+
+
+def test_center_crop_bounds():
+    assert center_crop_slices(480, 640) == (slice(0, 480), slice(80, 560))
+    assert center_crop_slices(640, 480) == (slice(80, 560), slice(0, 480))
+    assert center_crop_slices(5, 8) == (slice(0, 5), slice(1, 6))
+    assert center_crop_slices(32, 32) == (slice(0, 32), slice(0, 32))
+
+
+@pytest.mark.parametrize("height, width", [(40, 64), (64, 40)])
+def test_crop_drops_only_the_borders(height, width):
+    # the center square is black, everything outside of it is white
+    rgb = np.full((1, height, width, 3), 255, dtype=np.uint8)
+    depth = np.full((1, height, width), 1.5)
+    rows, cols = center_crop_slices(height, width)
+    assert rows.stop - rows.start == cols.stop - cols.start == 40
+    rgb[:, rows, cols] = 0
+    depth[:, rows, cols] = 0.5
+
+    rgb_out, depth_out = preproc_images(rgb, depth, size=20)
+    assert rgb_out.shape == (1, 3, 20, 20)
+    assert not rgb_out.any()
+    np.testing.assert_allclose(depth_out, 0.5)
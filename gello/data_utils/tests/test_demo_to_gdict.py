@@ -0,0 +1,55 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+for module in ("natsort", "mediapy", "matplotlib", "moviepy", "torch", "transforms3d"):
+    pytest.importorskip(module)
+
+# gdict and simple_bc are imported as top level packages, like in training
+DATA_UTILS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DATA_UTILS not in sys.path:
+    sys.path.insert(0, DATA_UTILS)
+
+from gello.data_utils.conversion_manifest import MANIFEST_FILE  # noqa: E402
+from gello.data_utils.demo_to_gdict import Args, main  # noqa: E402
+
+
+def _write_demo(path, num_frames=40, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(path)
+    for t in range(num_frames):
+        frame = {
+            "wrist_rgb": rng.integers(0, 255, (48, 64, 3), dtype=np.uint8),
+            "wrist_depth": rng.integers(0, 2000, (48, 64, 1), dtype=np.uint16),
+            "base_rgb": rng.integers(0, 255, (48, 64, 3), dtype=np.uint8),
+            "base_depth": rng.integers(0, 2000, (48, 64, 1), dtype=np.uint16),
+            "joint_positions": rng.normal(size=7),
+            "joint_velocities": rng.normal(size=7),
+            "ee_pos_quat": rng.normal(size=7),
+            "gripper_position": np.array(rng.uniform()),
+            "control": rng.normal(size=7),
+        }
+        with open(os.path.join(path, f"{t:03d}.pkl"), "wb") as f:
+            pickle.dump(frame, f)
+
+
+def _run(source_dir):
+    with pytest.raises(SystemExit) as exit_info:
+        main(Args(source_dir=source_dir, num_workers=1, incremental=True))
+    assert exit_info.value.code == 0
+
+
+def test_incremental_run_without_new_demos(tmp_path):
+    for k in range(3):
+        _write_demo(str(tmp_path / f"episode_{k}"), seed=k)
+    output_dir = tmp_path / "_conv" / "multiview"
+
+    _run(str(tmp_path))
+    manifest = (output_dir / MANIFEST_FILE).read_bytes()
+    # nothing to convert, the visualization still covers every demo
+    _run(str(tmp_path))
+    assert (output_dir / MANIFEST_FILE).read_bytes() == manifest
+    assert (output_dir / "vis" / "action" / "_all_actions.png").exists()
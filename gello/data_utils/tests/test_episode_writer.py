@@ -0,0 +1,54 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from gello.data_utils.format_obs import EpisodeWriter, load_episode
+from gello.data_utils.gdict.file import load_hdf5
+
+
+def _frame(t: int):
+    obs = {
+        "joint_positions": np.full(7, t, dtype=np.float64),
+        "rgb": np.full((4, 6, 3), t, dtype=np.uint8),
+        "gripper_position": np.float64(t),
+    }
+    return obs, np.full(7, -t, dtype=np.float64)
+
+
+def test_episode_writer_grows_and_trims(tmp_path):
+    path = tmp_path / "ep" / "episode.h5"
+    writer = EpisodeWriter(path, initial_capacity=4)
+    start = datetime.datetime(2024, 1, 1)
+    for t in range(10):
+        obs, action = _frame(t)
+        writer.append(start + datetime.timedelta(seconds=t), obs, action)
+        assert "control" not in obs
+    writer.flush()
+    assert len(load_episode(path)["control"]) == 10
+    writer.close()
+    assert writer.closed
+
+    episode = load_episode(path)
+    assert episode["rgb"].shape == (10, 4, 6, 3)
+    assert episode["rgb"].dtype == np.uint8
+    np.testing.assert_array_equal(episode["joint_positions"][:, 0], np.arange(10))
+    np.testing.assert_array_equal(episode["control"][:, 0], -np.arange(10))
+    np.testing.assert_array_equal(episode["gripper_position"], np.arange(10))
+    np.testing.assert_allclose(
+        np.diff(episode["timestamp"]), np.ones(9), rtol=0, atol=1e-6
+    )
+
+    loaded = load_hdf5(str(path))
+    assert set(loaded) == set(episode)
+    assert loaded["control"].shape == (10, 7)
+
+
+def test_episode_writer_rejects_changed_keys(tmp_path):
+    writer = EpisodeWriter(tmp_path / "episode.h5")
+    obs, action = _frame(0)
+    writer.append(datetime.datetime.now(), obs, action)
+    obs.pop("rgb")
+    with pytest.raises(ValueError):
+        writer.append(datetime.datetime.now(), obs, action)
+    writer.close()
@@ -0,0 +1,62 @@
+import h5py
+import numpy as np
+import pytest
+
+from gello.data_utils.gdict.data.array_ops import slice_item
+from gello.data_utils.gdict.file import dump_hdf5, load_hdf5
+
+
+def _traj(num_steps: int = 12):
+    rng = np.random.default_rng(0)
+    return {
+        "traj_0": {
+            "obs": {
+                "rgb": rng.integers(0, 255, (num_steps, 3, 64, 64), dtype=np.uint8),
+                "state": rng.normal(size=(num_steps, 7)),
+            },
+            "actions": rng.normal(size=(num_steps, 7)),
+        }
+    }
+
+
+@pytest.mark.parametrize("compression", ["lzf", "gzip"])
+def test_dump_chunks_and_compresses_images_only(tmp_path, compression):
+    path = tmp_path / "traj.h5"
+    traj = _traj()
+    dump_hdf5(traj, str(path), compression=compression)
+
+    with h5py.File(path, "r") as f:
+        rgb = f["dict_str_traj_0/dict_str_obs/dict_str_rgb"]
+        assert rgb.chunks == (1, 3, 64, 64)
+        assert rgb.compression == compression
+        state = f["dict_str_traj_0/dict_str_obs/dict_str_state"]
+        assert state.chunks is None and state.compression is None
+
+    loaded = load_hdf5(str(path))
+    np.testing.assert_array_equal(
+        loaded["traj_0"]["obs"]["rgb"], traj["traj_0"]["obs"]["rgb"]
+    )
+
+
+def test_dump_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        dump_hdf5(_traj(), str(tmp_path / "traj.h5"), compression="zstd")
+
+
+def test_lazy_load_reads_requested_steps(tmp_path):
+    path = tmp_path / "traj.h5"
+    traj = _traj()
+    dump_hdf5(traj, str(path), compression="lzf")
+
+    lazy = load_hdf5(str(path), lazy=True)["traj_0"]
+    assert isinstance(lazy["obs"]["rgb"], h5py.Dataset)
+    # frame stacking pads with repeated, unsorted timesteps
+    ts = np.array([0, 0, 5, 3, -1])
+    for key in ["rgb", "state"]:
+        np.testing.assert_array_equal(
+            slice_item(lazy["obs"][key], ts), traj["traj_0"]["obs"][key][ts]
+        )
+    np.testing.assert_array_equal(
+        slice_item(lazy["actions"], slice(2, 6)), traj["traj_0"]["actions"][2:6]
+    )
+    lazy["actions"].file.close()
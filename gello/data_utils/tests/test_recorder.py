@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from gello.data_utils.format_obs import load_episode
+from gello.data_utils.recorder import EpisodeRecorder
+
+
+def _record(recorder: EpisodeRecorder, num_frames: int) -> None:
+    obs = {"joint_positions": np.zeros(7), "rgb": np.zeros((8, 8, 3), np.uint8)}
+    for t in range(num_frames):
+        # the caller reuses its buffers, queued frames must not change
+        obs["joint_positions"][:] = t
+        recorder.record(datetime.datetime.now(), obs, np.full(7, t))
+
+
+@pytest.mark.parametrize("queue_size", [0, 4])
+def test_recorder_writes_every_frame_when_blocking(tmp_path, queue_size):
+    recorder = EpisodeRecorder(queue_size=queue_size)
+    recorder.start_episode(tmp_path / "ep0")
+    _record(recorder, 50)
+    recorder.end_episode()
+    recorder.start_episode(tmp_path / "ep1")
+    _record(recorder, 3)
+    recorder.close()
+
+    episode = load_episode(tmp_path / "ep0" / "episode.h5")
+    np.testing.assert_array_equal(episode["joint_positions"][:, 0], np.arange(50))
+    np.testing.assert_array_equal(episode["control"][:, 0], np.arange(50))
+    assert len(load_episode(tmp_path / "ep1" / "episode.h5")["control"]) == 3
+
+    stats = recorder.stats()
+    assert stats["enqueued"] == stats["written"] == 53
+    assert stats["dropped"] == 0
+    assert stats["enqueue_p50_us"] <= stats["enqueue_max_us"]
+
+
+def test_recorder_drops_and_counts(tmp_path):
+    recorder = EpisodeRecorder(queue_size=1, backpressure="drop")
+    recorder.start_episode(tmp_path / "ep")
+    _record(recorder, 200)
+    recorder.close()
+
+    stats = recorder.stats()
+    assert stats["written"] + stats["dropped"] == 200
+    episode = load_episode(tmp_path / "ep" / "episode.h5")
+    assert len(episode.get("control", ())) == stats["written"]
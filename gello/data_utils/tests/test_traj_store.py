@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("natsort")
+
+# simple_bc and gdict are imported as top level packages, like in training
+DATA_UTILS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DATA_UTILS not in sys.path:
+    sys.path.insert(0, DATA_UTILS)
+
+from gdict.file import dump_hdf5  # noqa: E402
+from simple_bc.dataset.traj_store import (  # noqa: E402
+    TRAJ_STORE_DIR,
+    TrajStore,
+    export_traj_store,
+)
+
+
+def _trajs(lengths=(6, 9, 4)):
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "obs": {
+                "rgb": rng.integers(0, 255, (n, 2, 3, 8, 8), dtype=np.uint8),
+                "state": rng.normal(size=(n, 7)),
+                "gripper": rng.normal(size=n),
+            },
+            "actions": rng.normal(size=(n, 7)),
+            "dones": np.zeros((n, 1)),
+        }
+        for n in lengths
+    ]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Trajectory files laid out like demo_to_gdict's output, and their data."""
+    root = tmp_path / "train" / "none"
+    root.mkdir(parents=True)
+    filenames = []
+    trajs = _trajs()
+    for i, traj in enumerate(trajs):
+        filename = str(root / f"traj_{i}.h5")
+        dump_hdf5({f"traj_{i}": traj}, filename, compression="lzf")
+        filenames.append(filename)
+    return str(root), filenames, trajs
+
+
+def _sum_rgb(store, name):
+    # runs in a worker process, like a DataLoader worker
+    return int(store.load(name)["obs"]["rgb"].sum())
+
+
+def test_export_load_round_trip(dataset):
+    root, filenames, trajs = dataset
+    store_dir = export_traj_store(filenames, root)
+    assert store_dir == os.path.join(root, TRAJ_STORE_DIR)
+    assert not os.path.exists(store_dir + ".tmp")
+
+    store = TrajStore(store_dir)
+    assert store.names == [f"traj_{i}.h5" for i in range(3)]
+    for name, traj in zip(store.names, trajs):
+        loaded = store.load(name)
+        assert len(loaded) == len(traj["actions"])
+        # only the keys used for training are stored
+        assert set(loaded.memory) == {"obs", "actions"}
+        np.testing.assert_array_equal(loaded["obs"]["rgb"], traj["obs"]["rgb"])
+        np.testing.assert_array_equal(loaded["obs"]["state"], traj["obs"]["state"])
+        # 1-D keys are stored as (T, 1), like DictArray.to_two_dims
+        np.testing.assert_array_equal(
+            loaded["obs"]["gripper"], traj["obs"]["gripper"][:, None]
+        )
+        np.testing.assert_array_equal(loaded["actions"], traj["actions"])
+        assert isinstance(loaded["obs"]["rgb"], np.memmap)
+
+
+def test_slice_reads_requested_steps(dataset):
+    root, filenames, trajs = dataset
+    store = TrajStore(export_traj_store(filenames, root))
+    # frame stacking pads with repeated, unsorted timesteps
+    ts = np.array([0, 0, 5, 3, 8])
+    sliced = store.load("traj_1.h5").slice(ts)
+    np.testing.assert_array_equal(sliced["obs"]["rgb"], trajs[1]["obs"]["rgb"][ts])
+    np.testing.assert_array_equal(sliced["actions"], trajs[1]["actions"][ts])
+    # the last episode ends at the end of the arrays
+    last = store.load("traj_2.h5")
+    np.testing.assert_array_equal(last["actions"][-1], trajs[2]["actions"][-1])
+
+
+def test_pickle_across_workers(dataset):
+    root, filenames, trajs = dataset
+    store = TrajStore(export_traj_store(filenames, root))
+    store.load("traj_0.h5")
+    # the mapped arrays are not pickled, every worker maps the files itself
+    assert len(pickle.dumps(store)) < 4096
+    context = multiprocessing.get_context("forkserver")
+    with context.Pool(2) as pool:
+        sums = pool.starmap(_sum_rgb, [(store, name) for name in store.names])
+    assert sums == [int(traj["obs"]["rgb"].sum()) for traj in trajs]
+
+
+def test_check_detects_outdated_store(dataset):
+    root, filenames, trajs = dataset
+    store = TrajStore(export_traj_store(filenames, root))
+    assert store.check(filenames, root) is None
+    assert "removed" in store.check(filenames[:2], root)
+
+    extra = os.path.join(root, "traj_3.h5")
+    dump_hdf5({"traj_3": trajs[0]}, extra)
+    assert "added" in store.check(filenames + [extra], root)
+
+    dump_hdf5({"traj_1": trajs[0]}, filenames[1])
+    assert "traj_1.h5 changed" in store.check(filenames, root)
+
+
+def test_replay_dataset_swaps_in_store(dataset):
+    pytest.importorskip("torch")
+    pytest.importorskip("torchvision")
+    from simple_bc.dataset.replay_dataset import ReplayDataset
+
+    class AugConfig(dict):
+        __getattr__ = dict.__getitem__
+
+    root, filenames, trajs = dataset
+    dataset_dir = os.path.dirname(root)
+    aug_cfg = AugConfig(stack_idx=[0], aug_prob=0.0, use_proprio=True)
+
+    def make(**kwargs):
+        return ReplayDataset(dataset_dir, aug_cfg, "none", **kwargs)
+
+    # no store yet
+    assert make(use_traj_store=True).traj_store is None
+    export_traj_store(filenames, root)
+    # opt-in
+    assert make().traj_store is None
+    replay = make(use_traj_store=True)
+    assert replay.traj_store is not None
+    assert replay.buffer_filenames == replay.traj_store.names
+
+    # a store that does not match the files is not used
+    dump_hdf5({"traj_1": trajs[0]}, filenames[1])
+    replay = make(use_traj_store=True)
+    assert replay.traj_store is None
+    assert replay.buffer_filenames == filenames
@@ -0,0 +1,482 @@
+"""Forward and inverse kinematics of the arm models.
+
+Only runs ``mj_kinematics`` (and ``mj_comPos`` for Jacobians) on a private
+``MjData``, never a physics step, so a pose costs a few microseconds and can be
+computed for every observation. Building a model from the composer entity is
+slow, so models are compiled once per arm and shared.
+
+``InverseKinematics`` is a damped least squares solver for teleoperation: it
+starts from the previous solution, stops at a tolerance a robot can actually
+track, and has a bounded number of iterations. The UR5e also has an analytic
+solver, used to seed the numerical one when it does not converge.
+"""
+
+import functools
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import mujoco
+import numpy as np
+from dm_control import mjcf
+
+from gello.dm_control_tasks.arms.franka import Franka
+from gello.dm_control_tasks.arms.manipulator import Manipulator
+from gello.dm_control_tasks.arms.ur5e import UR5e
+from gello.dm_control_tasks.arms.utils import IKResult
+from gello.dm_control_tasks.arms.yam import YAM
+
+ARMS: Dict[str, Type[Manipulator]] = {
+    "ur5e": UR5e,
+    "franka": Franka,
+    "yam": YAM,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def load_arm(name: str) -> Tuple[mujoco.MjModel, int, Tuple[int, ...]]:
+    """Compile the model of arm ``name`` once.
+
+    Returns:
+        The model, the id of the flange site and the ids of the joints of the
+        arm, in order.
+    """
+    arm = ARMS[name]()
+    physics = mjcf.Physics.from_mjcf_model(arm.mjcf_model)
+    site_id = int(physics.bind(arm.flange).element_id)
+    joint_ids = tuple(int(i) for i in physics.bind(arm.joints).element_id)
+    return physics.model.ptr, site_id, joint_ids
+
+
+class ForwardKinematics:
+    """End effector pose and velocity of an arm from its joint positions.
+
+    Each instance owns its ``MjData``, use one instance per thread.
+    """
+
+    def __init__(self, model: mujoco.MjModel, site_id: int, joint_ids: Sequence[int]):
+        self.model = model
+        self.site_id = site_id
+        self.qpos_ids = model.jnt_qposadr[list(joint_ids)]
+        self.dof_ids = model.jnt_dofadr[list(joint_ids)]
+        self._data = mujoco.MjData(model)
+        self._jacobian = np.zeros((6, model.nv))
+
+    @classmethod
+    def for_arm(cls, name: str, **kwargs) -> "ForwardKinematics":
+        """Kinematics of one of ``ARMS``, to its flange site."""
+        return cls(*load_arm(name), **kwargs)
+
+    @classmethod
+    def try_for_arm(cls, name: str) -> Optional["ForwardKinematics"]:
+        """Like ``for_arm``, but only warns if the model can not be loaded.
+
+        Used by the robot drivers, which should still run (with a zero end
+        effector pose) when e.g. the Menagerie submodule is not checked out.
+        """
+        try:
+            return cls.for_arm(name)
+        except Exception as e:
+            print(f"Warning: no end effector pose, could not load {name}: {e}")
+            return None
+
+    @classmethod
+    def from_xml_string(
+        cls, xml: str, site: str, joints: Sequence[str], **kwargs
+    ) -> "ForwardKinematics":
+        model = mujoco.MjModel.from_xml_string(xml)
+        site_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_SITE, site)
+        if site_id < 0:
+            raise ValueError(f"No site {site} in the model")
+        joint_ids = [
+            mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_JOINT, joint)
+            for joint in joints
+        ]
+        if min(joint_ids) < 0:
+            raise ValueError(f"Not all of the joints {joints} are in the model")
+        return cls(model, site_id, joint_ids, **kwargs)
+
+    @property
+    def num_joints(self) -> int:
+        return len(self.qpos_ids)
+
+    def _set_joints(self, joints: np.ndarray) -> None:
+        # joints past the ones given (e.g. the fingers) stay at 0
+        self._data.qpos[self.qpos_ids[: len(joints)]] = joints
+        mujoco.mj_kinematics(self.model, self._data)
+
+    def ee_pos_quat(self, joints: np.ndarray) -> np.ndarray:
+        """Position and (w, x, y, z) quaternion of the flange, in the base frame.
+
+        Args:
+            joints: Positions of the first ``len(joints)`` arm joints.
+        """
+        self._set_joints(joints)
+        pos_quat = np.empty(7)
+        pos_quat[:3] = self._data.site_xpos[self.site_id]
+        mujoco.mju_mat2Quat(pos_quat[3:], self._data.site_xmat[self.site_id])
+        return pos_quat
+
+    def ee_pose(self, joints: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Position and 3x3 rotation matrix of the flange, in the base frame."""
+        self._set_joints(joints)
+        return (
+            self._data.site_xpos[self.site_id].copy(),
+            self._data.site_xmat[self.site_id].reshape(3, 3).copy(),
+        )
+
+    def ee_velocity(self, joints: np.ndarray, velocities: np.ndarray) -> np.ndarray:
+        """Linear and angular velocity of the flange, in the base frame."""
+        self._set_joints(joints)
+        mujoco.mj_comPos(self.model, self._data)
+        mujoco.mj_jacSite(
+            self.model,
+            self._data,
+            self._jacobian[:3],
+            self._jacobian[3:],
+            self.site_id,
+        )
+        return self._jacobian[:, self.dof_ids[: len(velocities)]] @ velocities
+
+    def ee_pos_quat_batch(self, joints: np.ndarray) -> np.ndarray:
+        """``ee_pos_quat`` of every row of ``joints``, shape (N, 7)."""
+        joints = np.asarray(joints, dtype=np.float64)
+        num_rows, num_joints = joints.shape
+        positions = np.empty((num_rows, 3))
+        rotations = np.empty((num_rows, 9))
+        qpos = self._data.qpos
+        qpos_ids = self.qpos_ids[:num_joints]
+        site_xpos = self._data.site_xpos[self.site_id]
+        site_xmat = self._data.site_xmat[self.site_id]
+        for i in range(num_rows):
+            qpos[qpos_ids] = joints[i]
+            mujoco.mj_kinematics(self.model, self._data)
+            positions[i] = site_xpos
+            rotations[i] = site_xmat
+        return np.concatenate([positions, mat_to_quat(rotations)], axis=1)
+
+
+# Returns extra initial joint positions to try for a target position and
+# (w, x, y, z) quaternion, given the current joint positions.
+SeedFunction = Callable[[np.ndarray, np.ndarray, np.ndarray], Sequence[np.ndarray]]
+
+
+class InverseKinematics(ForwardKinematics):
+    """Damped least squares IK of the flange site.
+
+    Solving tries, in order: the previous solution (if it is close to the
+    current joints), the current joints, then the starts from ``seeds``. Each
+    start gets at most ``max_steps`` iterations. Buffers are allocated once, so
+    a solve does not allocate beyond a few small arrays per iteration.
+    """
+
+    def __init__(
+        self,
+        model: mujoco.MjModel,
+        site_id: int,
+        joint_ids: Sequence[int],
+        tol_pos: float = 1e-4,
+        tol_rot: float = 1e-3,
+        max_steps: int = 50,
+        damping: float = 1e-4,
+        max_update_norm: float = 0.5,
+        warm_start_radius: float = 0.5,
+        seeds: Optional[SeedFunction] = None,
+    ):
+        """
+        Args:
+            tol_pos: Position error (m) at which a solve succeeds.
+            tol_rot: Orientation error (rad) at which a solve succeeds.
+            max_steps: Iterations per start.
+            damping: Squared damping of the least squares step.
+            max_update_norm: Largest joint update of one iteration (rad).
+            warm_start_radius: The previous solution is only used as a start
+                when every joint is within this of the current joints (rad).
+            seeds: Extra starts to try when the first ones do not converge.
+        """
+        super().__init__(model, site_id, joint_ids)
+        self.tol_pos = tol_pos
+        self.tol_rot = tol_rot
+        self.max_steps = max_steps
+        self.damping = damping
+        self.max_update_norm = max_update_norm
+        self.warm_start_radius = warm_start_radius
+        self.seeds = seeds
+
+        limited = model.jnt_limited[list(joint_ids)].astype(bool)
+        ranges = model.jnt_range[list(joint_ids)]
+        self._lower = np.where(limited, ranges[:, 0], -np.inf)
+        self._upper = np.where(limited, ranges[:, 1], np.inf)
+        self._last_solution: Optional[np.ndarray] = None
+        self._error = np.zeros(6)
+        self._site_quat = np.zeros(4)
+        self._error_quat = np.zeros(4)
+        self._damping_eye = damping * np.eye(6)
+
+    def reset(self) -> None:
+        """Forget the previous solution."""
+        self._last_solution = None
+
+    def solve(
+        self, target_pos: np.ndarray, target_quat: np.ndarray, qpos: np.ndarray
+    ) -> IKResult:
+        """Joint positions that put the flange at the target pose.
+
+        Args:
+            target_pos: Position in the base frame of the model.
+            target_quat: (w, x, y, z) orientation in the base frame.
+            qpos: Current positions of the joints to solve for.
+
+        Returns:
+            The best solution found. ``steps`` counts iterations over every
+            start that was tried.
+        """
+        qpos = np.asarray(qpos, dtype=np.float64)
+        target_quat = np.asarray(target_quat, dtype=np.float64)
+        starts: List[np.ndarray] = []
+        last = self._last_solution
+        if (
+            last is not None
+            and len(last) == len(qpos)
+            and np.abs(last - qpos).max() < self.warm_start_radius
+        ):
+            starts.append(last)
+        starts.append(qpos)
+
+        total_steps = 0
+        best = None
+        tried_seeds = self.seeds is None
+        while starts:
+            result = self._solve_from(starts.pop(0), target_pos, target_quat)
+            total_steps += result.steps
+            if result.success:
+                self._last_solution = result.qpos
+                return result._replace(steps=total_steps)
+            if best is None or result.err_norm < best.err_norm:
+                best = result
+            if not starts and not tried_seeds:
+                starts.extend(self.seeds(target_pos, target_quat, qpos))
+                tried_seeds = True
+        self._last_solution = None
+        assert best is not None
+        return best._replace(steps=total_steps)
+
+    def _pose_error(self, target_pos: np.ndarray, target_quat: np.ndarray) -> None:
+        """Error of the current flange pose, position then rotation vector."""
+        self._error[:3] = target_pos - self._data.site_xpos[self.site_id]
+        mujoco.mju_mat2Quat(self._site_quat, self._data.site_xmat[self.site_id])
+        mujoco.mju_negQuat(self._site_quat, self._site_quat)
+        mujoco.mju_mulQuat(self._error_quat, target_quat, self._site_quat)
+        mujoco.mju_quat2Vel(self._error[3:], self._error_quat, 1)
+
+    def _solve_from(
+        self, start: np.ndarray, target_pos: np.ndarray, target_quat: np.ndarray
+    ) -> IKResult:
+        num_joints = len(start)
+        dof_ids = self.dof_ids[:num_joints]
+        lower, upper = self._lower[:num_joints], self._upper[:num_joints]
+        qpos = np.array(start, dtype=np.float64)
+        steps = 0
+        while True:
+            self._set_joints(qpos)
+            self._pose_error(target_pos, target_quat)
+            success = (
+                np.linalg.norm(self._error[:3]) < self.tol_pos
+                and np.linalg.norm(self._error[3:]) < self.tol_rot
+            )
+            if success or steps == self.max_steps:
+                break
+            mujoco.mj_comPos(self.model, self._data)
+            mujoco.mj_jacSite(
+                self.model,
+                self._data,
+                self._jacobian[:3],
+                self._jacobian[3:],
+                self.site_id,
+            )
+            jacobian = self._jacobian[:, dof_ids]
+            update = jacobian.T @ np.linalg.solve(
+                jacobian @ jacobian.T + self._damping_eye, self._error
+            )
+            update_norm = np.linalg.norm(update)
+            if update_norm > self.max_update_norm:
+                update *= self.max_update_norm / update_norm
+            qpos += update
+            np.clip(qpos, lower, upper, out=qpos)
+            steps += 1
+        return IKResult(
+            qpos=qpos,
+            err_norm=float(np.linalg.norm(self._error)),
+            steps=steps,
+            success=bool(success),
+        )
+
+
+# Denavit-Hartenberg parameters of the UR5e, from Universal Robots
+UR5E_DH = {
+    "d": (0.1625, 0.0, 0.0, 0.1333, 0.0997, 0.0996),
+    "a": (0.0, -0.425, -0.3922, 0.0, 0.0, 0.0),
+    "alpha": (np.pi / 2, 0.0, 0.0, np.pi / 2, -np.pi / 2, 0.0),
+}
+
+
+def _dh_transform(theta: float, d: float, a: float, alpha: float) -> np.ndarray:
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    return np.array(
+        [
+            [ct, -st * ca, st * sa, a * ct],
+            [st, ct * ca, -ct * sa, a * st],
+            [0.0, sa, ca, d],
+            [0.0, 0.0, 0.0, 1.0],
+        ]
+    )
+
+
+def ur_forward(joints: np.ndarray, dh: Dict = UR5E_DH) -> np.ndarray:
+    """4x4 pose of the tool flange in the UR base frame (the control box's)."""
+    pose = np.eye(4)
+    for i in range(6):
+        pose = pose @ _dh_transform(joints[i], dh["d"][i], dh["a"][i], dh["alpha"][i])
+    return pose
+
+
+def dh_arm_xml(dh: Dict = UR5E_DH, site: str = "attachment_site") -> str:
+    """MJCF of a bare arm whose joint frames follow DH parameters.
+
+    The flange site is the last DH frame, so the model matches ``ur_forward``.
+    Used to test and benchmark the solvers without the Menagerie models.
+    """
+    bodies = f'<site name="{site}"/>'
+    for i in reversed(range(len(dh["d"]))):
+        d, a, alpha = dh["d"][i], dh["a"][i], dh["alpha"][i]
+        quat = f"{np.cos(alpha / 2)} {np.sin(alpha / 2)} 0 0"
+        bodies = (
+            f'<joint name="joint{i + 1}" axis="0 0 1"/>'
+            '<geom type="sphere" size="0.03"/>'
+            f'<body pos="{a} 0 {d}" quat="{quat}">{bodies}</body>'
+        )
+    return f"<mujoco><worldbody><body>{bodies}</body></worldbody></mujoco>"
+
+
+def ur_inverse(pose: np.ndarray, dh: Dict = UR5E_DH) -> np.ndarray:
+    """All (up to 8) analytic IK solutions of a UR arm, shape (N, 6).
+
+    ``pose`` is the tool flange in the UR base frame, like ``ur_forward``.
+    Angles are wrapped to [-pi, pi).
+    """
+    d1, _, _, d4, d5, d6 = dh["d"]
+    a2, a3 = dh["a"][1], dh["a"][2]
+    solutions = []
+    # wrist center: the origin of frame 5
+    wrist = pose @ np.array([0.0, 0.0, -d6, 1.0])
+    radius = np.hypot(wrist[0], wrist[1])
+    if radius < abs(d4):
+        return np.zeros((0, 6))
+    psi = np.arctan2(wrist[1], wrist[0])
+    phi = np.arccos(d4 / radius)
+    for theta1 in (psi + phi + np.pi / 2, psi - phi + np.pi / 2):
+        s1, c1 = np.sin(theta1), np.cos(theta1)
+        c5 = (pose[0, 3] * s1 - pose[1, 3] * c1 - d4) / d6
+        if abs(c5) > 1 + 1e-9:
+            continue
+        c5 = np.clip(c5, -1.0, 1.0)
+        for theta5 in (np.arccos(c5), -np.arccos(c5)):
+            s5 = np.sin(theta5)
+            if abs(s5) < 1e-9:
+                # wrist singularity, joint 6 is free
+                theta6 = 0.0
+            else:
+                theta6 = np.arctan2(
+                    (-pose[0, 1] * s1 + pose[1, 1] * c1) / s5,
+                    (pose[0, 0] * s1 - pose[1, 0] * c1) / s5,
+                )
+            base_to_1 = _dh_transform(theta1, d1, 0.0, np.pi / 2)
+            wrist_to_flange = _dh_transform(theta5, d5, 0.0, -np.pi / 2) @ (
+                _dh_transform(theta6, d6, 0.0, 0.0)
+            )
+            pose_1_to_4 = (
+                np.linalg.inv(base_to_1) @ pose @ np.linalg.inv(wrist_to_flange)
+            )
+            x, y = pose_1_to_4[0, 3], pose_1_to_4[1, 3]
+            c3 = (x**2 + y**2 - a2**2 - a3**2) / (2 * a2 * a3)
+            if abs(c3) > 1 + 1e-9:
+                continue
+            c3 = np.clip(c3, -1.0, 1.0)
+            for theta3 in (np.arccos(c3), -np.arccos(c3)):
+                theta2 = np.arctan2(y, x) - np.arctan2(
+                    a3 * np.sin(theta3), a2 + a3 * np.cos(theta3)
+                )
+                pose_1_to_3 = _dh_transform(theta2, 0.0, a2, 0.0) @ _dh_transform(
+                    theta3, 0.0, a3, 0.0
+                )
+                pose_3_to_4 = np.linalg.inv(pose_1_to_3) @ pose_1_to_4
+                theta4 = np.arctan2(pose_3_to_4[1, 0], pose_3_to_4[0, 0])
+                solutions.append([theta1, theta2, theta3, theta4, theta5, theta6])
+    solutions = np.array(solutions).reshape(-1, 6)
+    return (solutions + np.pi) % (2 * np.pi) - np.pi
+
+
+def closest_solutions(solutions: np.ndarray, joints: np.ndarray) -> np.ndarray:
+    """Solutions unwrapped to the nearest turn of ``joints``, closest first."""
+    deltas = (solutions - joints + np.pi) % (2 * np.pi) - np.pi
+    order = np.argsort(np.abs(deltas).max(axis=1))
+    return joints + deltas[order]
+
+
+def make_ur_seeds(model_to_ur: np.ndarray, dh: Dict = UR5E_DH) -> SeedFunction:
+    """IK starts from the analytic solutions of a UR arm.
+
+    Args:
+        model_to_ur: 4x4 transform from the model's base frame to the UR base
+            frame.
+    """
+
+    def seeds(
+        target_pos: np.ndarray, target_quat: np.ndarray, qpos: np.ndarray
+    ) -> np.ndarray:
+        rot = np.zeros(9)
+        mujoco.mju_quat2Mat(rot, target_quat)
+        pose = np.eye(4)
+        pose[:3, :3] = rot.reshape(3, 3)
+        pose[:3, 3] = target_pos
+        return closest_solutions(ur_inverse(model_to_ur @ pose, dh), qpos)
+
+    return seeds
+
+
+def mat_to_quat(mats: np.ndarray) -> np.ndarray:
+    """(w, x, y, z) quaternions of row-major rotation matrices, shape (N, 9).
+
+    Vectorized version of ``mju_mat2Quat``, with the same sign convention.
+    """
+    m = mats.reshape(-1, 3, 3)
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    quats = np.empty((len(m), 4))
+    # pick the numerically stable branch per matrix, like mju_mat2Quat
+    use_trace = trace > 0
+    diag = np.argmax(np.stack([m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1), axis=1)
+
+    t = m[use_trace]
+    s = 0.5 / np.sqrt(trace[use_trace] + 1.0)
+    quats[use_trace] = np.stack(
+        [
+            0.25 / s,
+            (t[:, 2, 1] - t[:, 1, 2]) * s,
+            (t[:, 0, 2] - t[:, 2, 0]) * s,
+            (t[:, 1, 0] - t[:, 0, 1]) * s,
+        ],
+        axis=1,
+    )
+    for axis in range(3):
+        rows = ~use_trace & (diag == axis)
+        if not rows.any():
+            continue
+        t = m[rows]
+        j, k = (axis + 1) % 3, (axis + 2) % 3
+        s = 2.0 * np.sqrt(1.0 + t[:, axis, axis] - t[:, j, j] - t[:, k, k])
+        quat = np.empty((len(t), 4))
+        quat[:, 0] = (t[:, k, j] - t[:, j, k]) / s
+        quat[:, 1 + axis] = 0.25 * s
+        quat[:, 1 + j] = (t[:, j, axis] + t[:, axis, j]) / s
+        quat[:, 1 + k] = (t[:, k, axis] + t[:, axis, k]) / s
+        quats[rows] = quat
+    return quats / np.linalg.norm(quats, axis=1, keepdims=True)
@@ -0,0 +1,127 @@
+"""Tests for kinematics.py."""
+
+import numpy as np
+from absl.testing import absltest
+
+from gello.dm_control_tasks.arms import kinematics
+
+# planar arm: two 0.5 m links rotating about z, then a wrist about x
+_XML = """
+<mujoco>
+  <worldbody>
+    <body name="link1">
+      <joint name="joint1" type="hinge" axis="0 0 1"/>
+      <geom type="capsule" fromto="0 0 0 0.5 0 0" size="0.02"/>
+      <body name="link2" pos="0.5 0 0">
+        <joint name="joint2" type="hinge" axis="0 0 1"/>
+        <geom type="capsule" fromto="0 0 0 0.5 0 0" size="0.02"/>
+        <body name="wrist" pos="0.5 0 0">
+          <joint name="joint3" type="hinge" axis="1 0 0"/>
+          <geom type="sphere" size="0.02"/>
+          <site name="attachment_site" pos="0 0 0.1"/>
+        </body>
+      </body>
+    </body>
+  </worldbody>
+</mujoco>
+"""
+
+
+class ForwardKinematicsTest(absltest.TestCase):
+    def setUp(self) -> None:
+        self.fk = kinematics.ForwardKinematics.from_xml_string(
+            _XML, "attachment_site", ["joint1", "joint2", "joint3"]
+        )
+
+    def test_pose(self) -> None:
+        pos_quat = self.fk.ee_pos_quat(np.array([np.pi / 2, -np.pi / 2, 0.0]))
+        np.testing.assert_allclose(pos_quat[:3], [0.5, 0.5, 0.1], atol=1e-9)
+        np.testing.assert_allclose(pos_quat[3:], [1, 0, 0, 0], atol=1e-9)
+
+    def test_batch_matches_single(self) -> None:
+        joints = np.random.RandomState(0).uniform(-np.pi, np.pi, (50, 3))
+        batch = self.fk.ee_pos_quat_batch(joints)
+        for row, pos_quat in zip(joints, batch):
+            np.testing.assert_allclose(pos_quat, self.fk.ee_pos_quat(row), atol=1e-9)
+
+    def test_velocity_matches_finite_difference(self) -> None:
+        joints = np.array([0.3, -0.7, 0.4])
+        velocities = np.array([0.5, 1.0, -2.0])
+        dt = 1e-6
+        before = self.fk.ee_pos_quat(joints)[:3]
+        after = self.fk.ee_pos_quat(joints + velocities * dt)[:3]
+        linear = self.fk.ee_velocity(joints, velocities)[:3]
+        np.testing.assert_allclose(linear, (after - before) / dt, atol=1e-4)
+
+    def test_mat_to_quat_handles_all_branches(self) -> None:
+        # identity (trace branch) and 180 degree turns about each axis
+        mats = np.stack(
+            [
+                np.eye(3),
+                np.diag([1, -1, -1]),
+                np.diag([-1, 1, -1]),
+                np.diag([-1, -1, 1]),
+            ]
+        ).reshape(-1, 9)
+        quats = kinematics.mat_to_quat(mats.astype(float))
+        np.testing.assert_allclose(np.abs(quats), np.eye(4), atol=1e-9)
+
+
+class InverseKinematicsTest(absltest.TestCase):
+    def setUp(self) -> None:
+        self.ik = kinematics.InverseKinematics.from_xml_string(
+            kinematics.dh_arm_xml(kinematics.UR5E_DH),
+            "attachment_site",
+            [f"joint{i}" for i in range(1, 7)],
+        )
+        self.random = np.random.RandomState(0)
+
+    def test_model_matches_analytic_forward(self) -> None:
+        for _ in range(10):
+            joints = self.random.uniform(-np.pi, np.pi, 6)
+            pos, rot = self.ik.ee_pose(joints)
+            pose = kinematics.ur_forward(joints)
+            np.testing.assert_allclose(pos, pose[:3, 3], atol=1e-9)
+            np.testing.assert_allclose(rot, pose[:3, :3], atol=1e-9)
+
+    def test_analytic_inverse_round_trips(self) -> None:
+        for _ in range(100):
+            joints = self.random.uniform(-np.pi, np.pi, 6)
+            pose = kinematics.ur_forward(joints)
+            solutions = kinematics.ur_inverse(pose)
+            self.assertNotEmpty(solutions)
+            for solution in solutions:
+                np.testing.assert_allclose(
+                    kinematics.ur_forward(solution), pose, atol=1e-9
+                )
+            closest = kinematics.closest_solutions(solutions, joints)[0]
+            np.testing.assert_allclose(closest, joints, atol=1e-6)
+
+    def test_tracks_a_trajectory_with_warm_starts(self) -> None:
+        start = np.array([0.0, -1.2, 1.5, -1.9, -1.57, 0.3])
+        qpos = start
+        for t in np.linspace(0, 1, 50):
+            target = start + 0.3 * np.sin(2 * np.pi * t)
+            pos_quat = self.ik.ee_pos_quat(target)
+            result = self.ik.solve(pos_quat[:3], pos_quat[3:], qpos)
+            self.assertTrue(result.success)
+            np.testing.assert_allclose(result.qpos, target, atol=1e-3)
+            # small steps from the previous solution converge quickly
+            self.assertLessEqual(result.steps, 10)
+            qpos = result.qpos
+
+    def test_seeds_rescue_far_targets(self) -> None:
+        self.ik.seeds = kinematics.make_ur_seeds(np.eye(4))
+        self.ik.max_steps = 5
+        current = np.zeros(6)
+        target = np.array([2.0, -1.0, 2.0, 1.0, -1.5, 2.5])
+        pos_quat = self.ik.ee_pos_quat(target)
+        result = self.ik.solve(pos_quat[:3], pos_quat[3:], current)
+        self.assertTrue(result.success)
+        np.testing.assert_allclose(
+            self.ik.ee_pos_quat(result.qpos)[:3], pos_quat[:3], atol=1e-4
+        )
+
+
+if __name__ == "__main__":
+    absltest.main()
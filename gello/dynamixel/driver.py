@@ -2,20 +2,13 @@ import os
 import subprocess
 import time
 from threading import Event, Lock, Thread
-from typing import Optional, Protocol, Sequence, Tuple
+from typing import Iterable, Optional, Protocol, Sequence, Tuple
 
 import numpy as np
 from dynamixel_sdk.group_sync_read import GroupSyncRead
-from dynamixel_sdk.group_sync_write import GroupSyncWrite
 from dynamixel_sdk.packet_handler import PacketHandler
 from dynamixel_sdk.port_handler import PortHandler
-from dynamixel_sdk.robotis_def import (
-    COMM_SUCCESS,
-    DXL_HIBYTE,
-    DXL_HIWORD,
-    DXL_LOBYTE,
-    DXL_LOWORD,
-)
+from dynamixel_sdk.robotis_def import COMM_SUCCESS
 
 # Constants
 ADDR_TORQUE_ENABLE = 64
@@ -34,6 +27,20 @@ ADDR_OPERATING_MODE = 11
 CURRENT_CONTROL_MODE = 0
 POSITION_CONTROL_MODE = 3
 
+# Unit conversions of the position and velocity registers
+POSITION_TO_RAD = np.pi / 2048.0
+VELOCITY_TO_RAD_S = 0.229 * 2 * np.pi / 60
+
+# Block returned by each servo for the sync read of present velocity and
+# present position. Decoding it as little-endian int32 also does the two's
+# complement sign correction.
+STATE_DTYPE = np.dtype([("velocity", "<i4"), ("position", "<i4")])
+assert ADDR_PRESENT_POSITION == ADDR_PRESENT_VELOCITY + LEN_PRESENT_VELOCITY
+assert STATE_DTYPE.itemsize == LEN_PRESENT_VELOCITY + LEN_PRESENT_POSITION
+# Per-servo parameters of the goal position and goal current sync writes
+GOAL_POSITION_DTYPE = np.dtype([("id", "u1"), ("value", "<i4")])
+GOAL_CURRENT_DTYPE = np.dtype([("id", "u1"), ("value", "<i2")])
+
 # Servo-specific mappings and limits
 TORQUE_TO_CURRENT_MAPPING = {
     "XC330_T288_T": 1158.73,
@@ -47,6 +54,40 @@ SERVO_CURRENT_LIMITS = {
 }
 
 
+def decode_sync_read(blocks: Iterable[Sequence[int]], out: np.ndarray) -> np.ndarray:
+    """Decode the per-servo data blocks of a sync read into ``out``.
+
+    Args:
+        blocks: Data bytes returned by each servo, in the order of ``out``.
+        out: Preallocated ``STATE_DTYPE`` array with one entry per servo.
+
+    Returns:
+        ``out``.
+    """
+    data = b"".join(map(bytes, blocks))
+    if len(data) != out.nbytes:
+        raise RuntimeError(
+            f"Sync read returned {len(data)} bytes, expected {out.nbytes}"
+        )
+    out[:] = np.frombuffer(data, dtype=STATE_DTYPE)
+    return out
+
+
+def pack_sync_write(params: np.ndarray, values: np.ndarray) -> bytes:
+    """Fill the values of preallocated sync write parameters and serialize them.
+
+    Args:
+        params: ``GOAL_POSITION_DTYPE`` or ``GOAL_CURRENT_DTYPE`` array with
+            the servo ids already set.
+        values: Register values, truncated towards zero like ``int()``.
+
+    Returns:
+        The parameter bytes of the sync write packet.
+    """
+    params["value"] = values
+    return params.tobytes()
+
+
 class DynamixelDriverProtocol(Protocol):
     def set_joints(self, joint_angles: Sequence[float]):
         """Set the joint angles for the Dynamixel servos.
@@ -178,8 +219,8 @@ class DynamixelDriver(DynamixelDriverProtocol):
             use_fake_fallback (bool): Whether to fallback to FakeDynamixelDriver on failure.
         """
         self._ids = ids
-        self._joint_angles = None
-        self._velocities = None
+        # Latest sync read, published by the reading thread
+        self._state: Optional[np.ndarray] = None
         self._lock = Lock()
         self._port = port
         self._baudrate = baudrate
@@ -256,19 +297,6 @@ class DynamixelDriver(DynamixelDriverProtocol):
             ADDR_PRESENT_VELOCITY,
             LEN_PRESENT_VELOCITY + LEN_PRESENT_POSITION,
         )
-        # Separate writers for position and current
-        self._groupSyncWrite = GroupSyncWrite(
-            self._portHandler,
-            self._packetHandler,
-            ADDR_GOAL_POSITION,
-            LEN_GOAL_POSITION,
-        )
-        self._groupSyncWriteCurrent = GroupSyncWrite(
-            self._portHandler,
-            self._packetHandler,
-            ADDR_GOAL_CURRENT,
-            LEN_GOAL_CURRENT,
-        )
 
         # Open the port and set the baudrate
         if not self._portHandler.openPort():
@@ -277,6 +305,15 @@ class DynamixelDriver(DynamixelDriverProtocol):
         if not self._portHandler.setBaudRate(self._baudrate):
             raise RuntimeError(f"Failed to change the baudrate, {self._baudrate}")
 
+        # Decode buffer of the reading thread, readers get copies of it
+        self._state_buffer = np.zeros(len(self._ids), STATE_DTYPE)
+        # Sync write parameters, written with syncWriteTxOnly instead of
+        # GroupSyncWrite so that no byte lists are built per servo
+        self._goal_positions = np.zeros(len(self._ids), GOAL_POSITION_DTYPE)
+        self._goal_positions["id"] = self._ids
+        self._goal_currents = np.zeros(len(self._ids), GOAL_CURRENT_DTYPE)
+        self._goal_currents["id"] = self._ids
+
         # Add parameters for each Dynamixel servo to the group sync read
         for dxl_id in self._ids:
             if not self._groupSyncRead.addParam(dxl_id):
@@ -311,35 +348,21 @@ class DynamixelDriver(DynamixelDriverProtocol):
             self._fake_joint_angles = np.array(joint_angles)
             return
 
-        for dxl_id, angle in zip(self._ids, joint_angles):
-            # Convert the angle to the appropriate value for the servo
-            position_value = int(angle * 2048 / np.pi)
-
-            # Allocate goal position value into byte array
-            param_goal_position = [
-                DXL_LOBYTE(DXL_LOWORD(position_value)),
-                DXL_HIBYTE(DXL_LOWORD(position_value)),
-                DXL_LOBYTE(DXL_HIWORD(position_value)),
-                DXL_HIBYTE(DXL_HIWORD(position_value)),
-            ]
-
-            # Add goal position value to the Syncwrite parameter storage
-            dxl_addparam_result = self._groupSyncWrite.addParam(
-                dxl_id, param_goal_position
+        # Convert the angles to servo values and pack the sync write payload
+        param = pack_sync_write(
+            self._goal_positions, np.asarray(joint_angles) / POSITION_TO_RAD
+        )
+        with self._lock:
+            dxl_comm_result = self._packetHandler.syncWriteTxOnly(
+                self._portHandler,
+                ADDR_GOAL_POSITION,
+                LEN_GOAL_POSITION,
+                param,
+                len(param),
             )
-            if not dxl_addparam_result:
-                raise RuntimeError(
-                    f"Failed to set joint angle for Dynamixel with ID {dxl_id}"
-                )
-
-        # Syncwrite goal position
-        dxl_comm_result = self._groupSyncWrite.txPacket()
         if dxl_comm_result != COMM_SUCCESS:
             raise RuntimeError("Failed to syncwrite goal position")
 
-        # Clear syncwrite parameter storage
-        self._groupSyncWrite.clearParam()
-
     def set_current(self, currents: Sequence[float]):
         if self._is_fake:
             if len(currents) != len(self._ids):
@@ -363,21 +386,17 @@ class DynamixelDriver(DynamixelDriverProtocol):
                 currents_array, -self.current_limits, self.current_limits
             )
 
+        param = pack_sync_write(self._goal_currents, currents_array)
         with self._lock:
-            for dxl_id, current in zip(self._ids, currents_array.tolist()):
-                current_value = int(current)
-                param_goal_current = [
-                    DXL_LOBYTE(current_value),
-                    DXL_HIBYTE(current_value),
-                ]
-                if not self._groupSyncWriteCurrent.addParam(dxl_id, param_goal_current):
-                    raise RuntimeError(
-                        f"Failed to set current for Dynamixel with ID {dxl_id}"
-                    )
-            dxl_comm_result = self._groupSyncWriteCurrent.txPacket()
-            if dxl_comm_result != COMM_SUCCESS:
-                raise RuntimeError("Failed to syncwrite goal current")
-            self._groupSyncWriteCurrent.clearParam()
+            dxl_comm_result = self._packetHandler.syncWriteTxOnly(
+                self._portHandler,
+                ADDR_GOAL_CURRENT,
+                LEN_GOAL_CURRENT,
+                param,
+                len(param),
+            )
+        if dxl_comm_result != COMM_SUCCESS:
+            raise RuntimeError("Failed to syncwrite goal current")
 
     def set_torque(self, torques: Sequence[float]):
         if self.torque_to_current_map is None:
@@ -451,65 +470,35 @@ class DynamixelDriver(DynamixelDriverProtocol):
         while not self._stop_thread.is_set():
             time.sleep(0.001)
             with self._lock:
-                _joint_angles = np.zeros(len(self._ids), dtype=int)
-                _velocities = np.zeros(len(self._ids), dtype=int)
                 dxl_comm_result = self._groupSyncRead.txRxPacket()
                 if dxl_comm_result != COMM_SUCCESS:
                     print(f"warning, comm failed: {dxl_comm_result}")
                     continue
-                for i, dxl_id in enumerate(self._ids):
-                    # velocity
-                    if self._groupSyncRead.isAvailable(
-                        dxl_id, ADDR_PRESENT_VELOCITY, LEN_PRESENT_VELOCITY
-                    ):
-                        velocity = self._groupSyncRead.getData(
-                            dxl_id, ADDR_PRESENT_VELOCITY, LEN_PRESENT_VELOCITY
-                        )
-                        # sign correction for 32-bit two's complement
-                        if velocity > 0x7FFFFFFF:
-                            velocity -= 0x100000000
-                        _velocities[i] = velocity
-                    else:
-                        raise RuntimeError(
-                            f"Failed to get velocity for Dynamixel with ID {dxl_id}"
-                        )
-                    # position
-                    if self._groupSyncRead.isAvailable(
-                        dxl_id, ADDR_PRESENT_POSITION, LEN_PRESENT_POSITION
-                    ):
-                        angle = self._groupSyncRead.getData(
-                            dxl_id, ADDR_PRESENT_POSITION, LEN_PRESENT_POSITION
-                        )
-                        # sign correction for 32-bit two's complement
-                        if angle > 0x7FFFFFFF:
-                            angle -= 0x100000000
-                        _joint_angles[i] = angle
-                    else:
-                        raise RuntimeError(
-                            f"Failed to get joint angles for Dynamixel with ID {dxl_id}"
-                        )
-                self._joint_angles = _joint_angles
-                self._velocities = _velocities
-            # self._groupSyncRead.clearParam()
+                state = decode_sync_read(
+                    self._groupSyncRead.data_dict.values(), self._state_buffer
+                )
+                # a published state is never written again, so readers see
+                # positions and velocities from the same sync read
+                self._state = state.copy()
+
+    def _wait_for_state(self) -> np.ndarray:
+        while self._state is None:
+            time.sleep(0.1)
+        return self._state
 
     def get_positions_and_velocities(self) -> Tuple[np.ndarray, np.ndarray]:
         if self._is_fake:
             return self._fake_joint_angles.copy(), self._fake_velocities.copy()
-        while self._joint_angles is None or self._velocities is None:
-            time.sleep(0.1)
-        positions_in_radians = self._joint_angles.copy() / 2048.0 * np.pi
-        velocities_in_units = self._velocities.copy() * 0.229 * 2 * np.pi / 60
-        return positions_in_radians, velocities_in_units
+        state = self._wait_for_state()
+        return (
+            state["position"] * POSITION_TO_RAD,
+            state["velocity"] * VELOCITY_TO_RAD_S,
+        )
 
     def get_joints(self) -> np.ndarray:
         if self._is_fake:
             return self._fake_joint_angles.copy()
-
-        # Return a copy of the joint_angles array to avoid race conditions
-        while self._joint_angles is None:
-            time.sleep(0.1)
-        _j = self._joint_angles.copy()
-        return _j / 2048.0 * np.pi
+        return self._wait_for_state()["position"] * POSITION_TO_RAD
 
     def get_positions(self) -> np.ndarray:
         return self.get_joints()
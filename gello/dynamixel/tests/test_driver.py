@@ -1,7 +1,18 @@
+from threading import Event, Lock
+
 import numpy as np
 import pytest
+from dynamixel_sdk.robotis_def import COMM_SUCCESS
 
-from gello.dynamixel.driver import FakeDynamixelDriver
+from gello.dynamixel.driver import (
+    GOAL_CURRENT_DTYPE,
+    GOAL_POSITION_DTYPE,
+    STATE_DTYPE,
+    DynamixelDriver,
+    FakeDynamixelDriver,
+    decode_sync_read,
+    pack_sync_write,
+)
 
 
 @pytest.fixture
@@ -33,3 +44,73 @@ def test_torque_enabled(fake_driver):
 
 def test_get_joints(fake_driver):
     assert np.allclose(fake_driver.get_joints(), [0, 0])
+
+
+def test_decode_sync_read_sign_corrects():
+    velocities = [5, -3, 0x7FFFFFFF]
+    positions = [2048, -4096, -1]
+    blocks = [
+        list(
+            (v & 0xFFFFFFFF).to_bytes(4, "little")
+            + (p & 0xFFFFFFFF).to_bytes(4, "little")
+        )
+        for v, p in zip(velocities, positions)
+    ]
+    out = np.zeros(3, STATE_DTYPE)
+    decode_sync_read(blocks, out)
+    assert out["velocity"].tolist() == velocities
+    assert out["position"].tolist() == positions
+
+    with pytest.raises(RuntimeError):
+        decode_sync_read(blocks[:2], out)
+
+
+class ScriptedSyncRead:
+    """Returns one scripted sync read per call and records the published state."""
+
+    def __init__(self, driver, reads):
+        self._driver = driver
+        self._reads = list(reads)
+        self.published = []
+        self.data_dict = {}
+
+    def txRxPacket(self):
+        self.published.append(self._driver._state)
+        if not self._reads:
+            self._driver._stop_thread.set()
+            return -1
+        value = self._reads.pop(0)
+        block = list(value.to_bytes(4, "little") * 2)
+        self.data_dict = {1: block, 2: block}
+        return COMM_SUCCESS
+
+
+def test_read_thread_does_not_overwrite_published_states():
+    driver = DynamixelDriver.__new__(DynamixelDriver)
+    driver._lock = Lock()
+    driver._stop_thread = Event()
+    driver._state = None
+    driver._state_buffer = np.zeros(2, STATE_DTYPE)
+    driver._groupSyncRead = ScriptedSyncRead(driver, [1, 2, 3])
+    driver._read_joint_states()
+
+    published = driver._groupSyncRead.published[1:]
+    assert [state["position"].tolist() for state in published] == [
+        [1, 1],
+        [2, 2],
+        [3, 3],
+    ]
+    assert all((state["velocity"] == state["position"]).all() for state in published)
+
+
+def test_pack_sync_write_matches_byte_layout():
+    params = np.zeros(2, GOAL_POSITION_DTYPE)
+    params["id"] = [1, 7]
+    packed = pack_sync_write(params, np.array([2048.9, -1.5]))
+    assert packed == bytes([1]) + (2048).to_bytes(4, "little") + bytes([7]) + (
+        -1
+    ).to_bytes(4, "little", signed=True)
+
+    currents = np.zeros(1, GOAL_CURRENT_DTYPE)
+    currents["id"] = 3
+    assert pack_sync_write(currents, np.array([-5.0])) == bytes([3, 251, 255])
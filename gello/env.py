@@ -1,21 +1,11 @@
-import time
 from typing import Any, Dict, Optional
 
 import numpy as np
 
 from gello.cameras.camera import CameraDriver
 from gello.robots.robot import Robot
-
-
-class Rate:
-    def __init__(self, rate: float):
-        self.last = time.time()
-        self.rate = rate
-
-    def sleep(self) -> None:
-        while self.last + 1.0 / self.rate > time.time():
-            time.sleep(0.0001)
-        self.last = time.time()
+from gello.utils.rate import Rate
+from gello.utils.tracing import LoopTracer
 
 
 class RobotEnv:
@@ -24,10 +14,14 @@ class RobotEnv:
         robot: Robot,
         control_rate_hz: float = 100.0,
         camera_dict: Optional[Dict[str, CameraDriver]] = None,
+        rate: Optional[Rate] = None,
+        tracer: Optional[LoopTracer] = None,
     ) -> None:
         self._robot = robot
-        self._rate = Rate(control_rate_hz)
+        self._rate = Rate(control_rate_hz) if rate is None else rate
         self._camera_dict = {} if camera_dict is None else camera_dict
+        # Optional per-phase timing, see gello.utils.tracing
+        self.tracer = tracer
 
     def robot(self) -> Robot:
         """Get the robot object.
@@ -37,12 +31,23 @@ class RobotEnv:
         """
         return self._robot
 
+    @property
+    def rate(self) -> Rate:
+        """The scheduler that paces ``step``."""
+        return self._rate
+
     def __len__(self):
         return 0
 
     def step(self, joints: np.ndarray) -> Dict[str, Any]:
         """Step the environment forward.
 
+        The command is sent before the rate sleep. Robots that provide
+        ``step_async`` (e.g. the ZMQ clients) get the command and the
+        observation request in a single round trip that overlaps the sleep;
+        their observation is the one taken right after the command. Other
+        robots are observed after the sleep.
+
         Args:
             joints: joint angles command to step the environment with.
 
@@ -52,9 +57,24 @@ class RobotEnv:
         assert len(joints) == (
             self._robot.num_dofs()
         ), f"input:{len(joints)}, robot:{self._robot.num_dofs()}"
-        assert self._robot.num_dofs() == len(joints)
+        tracer = self.tracer
+        if hasattr(self._robot, "step_async"):
+            self._robot.step_async(joints)
+            if tracer is not None:
+                tracer.lap("robot.step_async")
+            self._rate.sleep()
+            if tracer is not None:
+                tracer.lap("rate.sleep")
+            robot_obs = self._robot.step_result()
+            if tracer is not None:
+                tracer.lap("robot.step_result")
+            return self._build_obs(robot_obs)
         self._robot.command_joint_state(joints)
+        if tracer is not None:
+            tracer.lap("robot.command_joint_state")
         self._rate.sleep()
+        if tracer is not None:
+            tracer.lap("rate.sleep")
         return self.get_obs()
 
     def get_obs(self) -> Dict[str, Any]:
@@ -63,13 +83,20 @@ class RobotEnv:
         Returns:
             obs: observation from the environment.
         """
+        robot_obs = self._robot.get_observations()
+        if self.tracer is not None:
+            self.tracer.lap("robot.get_observations")
+        return self._build_obs(robot_obs)
+
+    def _build_obs(self, robot_obs: Dict[str, Any]) -> Dict[str, Any]:
         observations = {}
         for name, camera in self._camera_dict.items():
             image, depth = camera.read()
             observations[f"{name}_rgb"] = image
             observations[f"{name}_depth"] = depth
+        if self._camera_dict and self.tracer is not None:
+            self.tracer.lap("camera.read")
 
-        robot_obs = self._robot.get_observations()
         assert "joint_positions" in robot_obs
         assert "joint_velocities" in robot_obs
         assert "ee_pos_quat" in robot_obs
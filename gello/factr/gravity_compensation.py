@@ -22,6 +22,7 @@ import pinocchio as pin
 import yaml
 
 from gello.dynamixel.driver import DynamixelDriver
+from gello.utils.rate import Rate
 
 import threading
 from importlib import import_module
@@ -97,6 +98,7 @@ class FACTRGravityCompensation:
         self.teleop_env = None
         self.teleop_client = None
         self.teleop_rate_hz: float = 30.0
+        self.teleop_rate: Optional[Rate] = None
         self.teleop_thread: Optional[threading.Thread] = None
         self.teleop_robot_server = None
         self.teleop_threads: list[threading.Thread] = []
@@ -137,6 +139,9 @@ class FACTRGravityCompensation:
         """Initialize parameters from config."""
         self.name = self.config["name"]
         self.dt = 1 / self.config["controller"]["frequency"]
+        # Optional CPU pinning and SCHED_FIFO priority for the control loop
+        self.control_cpu = self.config["controller"].get("cpu")
+        self.control_priority = self.config["controller"].get("priority")
 
         # Leader arm parameters
         self.num_arm_joints = self.config["arm_teleop"]["num_arm_joints"]
@@ -393,10 +398,9 @@ class FACTRGravityCompensation:
                     )
                 time.sleep(0.1)
 
-        # Create env for follower
-        self.teleop_env = RobotEnv(
-            self.teleop_client, control_rate_hz=self.teleop_rate_hz
-        )
+        # Create env for follower, its rate also paces the teleop loop
+        self.teleop_rate = Rate(max(self.teleop_rate_hz, 1e-3))
+        self.teleop_env = RobotEnv(self.teleop_client, rate=self.teleop_rate)
 
         # Determine follower DOFs and build mapping defaults
         try:
@@ -578,11 +582,10 @@ class FACTRGravityCompensation:
         return padded
 
     def _teleop_loop(self) -> None:
-        assert self.teleop_env is not None
-        rate_dt = 1.0 / max(self.teleop_rate_hz, 1e-3)
+        assert self.teleop_env is not None and self.teleop_rate is not None
         print("Starting teleop loop (follower control)")
+        self.teleop_rate.reset()
         while self.running:
-            t0 = time.time()
             try:
                 # Use the same leader state access used by GC, which already applies offsets/signs
                 (
@@ -603,14 +606,12 @@ class FACTRGravityCompensation:
                         + action * self.teleop_smoothing_alpha
                     )
                     self._teleop_last_action = action
+                # sleeps on self.teleop_rate
                 self.teleop_env.step(action)
             except Exception as e:
                 print(f"Teleop loop warning: {e}")
-            # Timing
-            elapsed = time.time() - t0
-            sleep_t = rate_dt - elapsed
-            if sleep_t > 0:
-                time.sleep(sleep_t)
+                self.teleop_rate.sleep()
+        print(f"Teleop loop: {self.teleop_rate.format_stats()}")
 
     def _get_dynamixel_offsets(self, verbose: bool = True) -> None:
         """Calibrate Dynamixel servos to match expected joint positions."""
@@ -824,23 +825,18 @@ class FACTRGravityCompensation:
             self.teleop_thread = threading.Thread(target=self._teleop_loop, daemon=True)
             self.teleop_thread.start()
             print("Teleop started.")
+        rate = Rate(1 / self.dt, cpu=self.control_cpu, priority=self.control_priority)
         try:
             while self.running:
-                start_time = time.time()
-
                 self.control_loop_step()
 
-                # Maintain loop timing
-                elapsed = time.time() - start_time
-                sleep_time = max(0, self.dt - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                else:
-                    print(f"Warning: Control loop overrun by {elapsed - self.dt:.4f}s")
+                if not rate.sleep():
+                    print(f"Warning: Control loop overrun by {rate.lateness:.4f}s")
 
         except KeyboardInterrupt:
             print("\nShutting down...")
         finally:
+            print(f"Control loop: {rate.format_stats()}")
             self.shutdown()
 
     def shutdown(self) -> None:
@@ -16,6 +16,7 @@ import time
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from gello.dynamixel.driver import DynamixelDriver
+from gello.utils.rate import Rate
 
 
 def calibrate_joint_offsets(
@@ -223,9 +224,8 @@ def main():
         # Null space target (comfortable middle position)
         null_space_target = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0])
 
+        rate = Rate(1 / dt)
         while running:
-            start_time = time.time()
-
             try:
                 # Get current joint states
                 joint_pos_raw, joint_vel_raw = driver.get_positions_and_velocities()
@@ -314,12 +314,8 @@ def main():
                     print(f"\n⚠️  Warning: Failed to set torque: {e}, continuing...")
 
                 # Maintain loop timing
-                elapsed = time.time() - start_time
-                sleep_time = max(0, dt - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                else:
-                    print(f"\n⚠️  Loop overrun: {elapsed - dt:.4f}s")
+                if not rate.sleep():
+                    print(f"\n⚠️  Loop overrun: {rate.lateness:.4f}s")
 
             except KeyboardInterrupt:
                 running = False
@@ -1,19 +1,19 @@
 import time
 
-import minimalmodbus
 import serial
-import threading
+
+from gello.robots.modbus import ModbusRTU
 # from pynput import keyboard
 
 class chingtekGripper():
     def __init__(self,PORT='/dev/ttyCH343USB0'):
-        self.lock = threading.Lock()
         # 寄存器地址
         self.POSITION_HIGH_8 = 0x0102  # 位置寄存器高八位
         self.POSITION_LOW_8 = 0x0103  # 位置寄存器低八位
         self.SPEED = 0x0104
         self.FORCE = 0x0105
         self.MOTION_TRIGGER = 0x0108
+        self.FEEDBACK_POSITION = 0x0609  # 实时反馈位置 high, 0x060A low
         self.BAUD = 115200
         self.isOpen = False
         self.connect(PORT)  
@@ -21,51 +21,58 @@ class chingtekGripper():
 
     # 写入位置
     def write_position(self, value):
-        with self.lock:
-            self.instrument.write_long(self.POSITION_HIGH_8, value)
+        self.instrument.write_registers(
+            self.POSITION_HIGH_8, [(value >> 16) & 0xFFFF, value & 0xFFFF]
+        )
 
     # 写入速度
     def write_speed(self, speed):
-        with self.lock:
-            self.instrument.write_register(self.SPEED, speed, functioncode=6)
+        self.instrument.write_register(self.SPEED, speed)
 
     # 写入力
     def write_force(self, force):
-        with self.lock:
-            self.instrument.write_register(self.FORCE, force, functioncode=6)
+        self.instrument.write_register(self.FORCE, force)
 
     # 触发运动
     def trigger_motion(self):
-        with self.lock:
-            self.instrument.write_register(self.MOTION_TRIGGER, 1, functioncode=6)
+        self.instrument.write_register(self.MOTION_TRIGGER, 1)
 
     def read_position(self):
-        with self.lock:
-            # 读取实时反馈位置信息 high（0x0609）和 low（0x060A）
-            high_part = self.instrument.read_register(0x0609, functioncode=3)
-            low_part = self.instrument.read_register(0x060A, functioncode=3)
-            # 计算执行器实时位置
-            return (high_part << 16) + low_part
-    
+        # 一次读取实时反馈位置信息 high（0x0609）和 low（0x060A）
+        high_part, low_part = self.instrument.read_registers(
+            self.FEEDBACK_POSITION, 2
+        )
+        # 计算执行器实时位置
+        return (high_part << 16) + low_part
+
+    def write_motion(self, value, speed=100, force=100):
+        """Write position, speed and force in one transaction, then trigger.
+
+        The trigger is a separate write so that registers 0x0106 and 0x0107,
+        which sit between force and the trigger, are never touched.
+        """
+        self.instrument.write_registers(
+            self.POSITION_HIGH_8,
+            [(value >> 16) & 0xFFFF, value & 0xFFFF, speed, force],
+        )
+        self.trigger_motion()
+
     def connect(self, PORT = 'COM5'):
         self.PORT = PORT
-        self.instrument = minimalmodbus.Instrument(self.PORT, 1)
-        self.instrument.serial.baudrate = self.BAUD
-        self.instrument.serial.timeout = 1     
+        port = serial.Serial(self.PORT, self.BAUD, timeout=1)
+        self.instrument = ModbusRTU(port, slave=1)
 
     def close(self):
         print("-----")
         actual_position = self.joint_states_to_actual_position(0)
-        self.write_position(actual_position)
-        self.trigger_motion()
+        self.write_motion(actual_position)
         self.isOpen = False
 
 
     def open(self):
         print("-----")
         actual_position = self.joint_states_to_actual_position(1)
-        self.write_position(actual_position)
-        self.trigger_motion()
+        self.write_motion(actual_position)
         self.isOpen = True
 
 
@@ -139,8 +146,7 @@ class chingtekGripper():
         assert 0<=position<=1
         actual_position = self.joint_states_to_actual_position(position)
         # print("actual_position: ",actual_position)
-        self.write_position(actual_position)
-        self.trigger_motion()
+        self.write_motion(actual_position, speed, force)
 
 
 if __name__ == '__main__':
@@ -3,6 +3,8 @@ import serial
 # from pynput import keyboard
 from time import sleep
 
+from gello.robots.modbus import ModbusError, ModbusRTU, crc16
+
 class dh_device(object) :
     def __init__(self):
         self.serialPort = serial.Serial()
@@ -15,6 +17,8 @@ class dh_device(object) :
         self.serialPort.bytesize = 8
         self.serialPort.parity = 'N'
         self.serialPort.stopbits = 1
+        # bounds every Modbus response, a missing reply must not hang
+        self.serialPort.timeout = 1
         self.serialPort.set_output_flow_control = 'N'
         self.serialPort.set_input_flow_control = 'N'
 
@@ -27,7 +31,7 @@ class dh_device(object) :
             ret = -1
         return ret
 
-    def disconnect_device() :
+    def disconnect_device(self) :
         if(self.serialPort.isOpen()) :
             self.serialPort.close()
         else :
@@ -61,22 +65,10 @@ class dh_modbus_gripper(object):
     gripper_ID = 0x01
     def __init__(self):
         self.m_device = dh_device()
+        self.modbus = None
 
     def CRC16(self,nData, wLength) :
-        if nData==0x00:
-            return 0x0000
-        wCRCWord=0xFFFF
-        poly=0xA001
-        for num in range(wLength):
-            date = nData[num]
-            wCRCWord = (date & 0xFF)^ wCRCWord
-            for bit in range(8) : 
-                if(wCRCWord&0x01)!=0:
-                    wCRCWord>>=1
-                    wCRCWord^= poly
-                else:
-                    wCRCWord>>=1
-        return wCRCWord
+        return crc16(bytes(nData[:wLength]))
 
     def open(self,PortName,BaudRate) :
         ret = 0
@@ -86,80 +78,33 @@ class dh_modbus_gripper(object):
             return ret
         else :
             print('open successful')
+            self.modbus = ModbusRTU(self.m_device.serialPort, self.gripper_ID, retries=3)
             return ret
 
     def close(self) :
         self.m_device.disconnect_device()
 
     def WriteRegisterFunc(self,index, value) :
-        send_buf = [0,0,0,0,0,0,0,0]
-        send_buf[0] = self.gripper_ID
-        send_buf[1] = 0x06
-        send_buf[2] = (index >> 8) & 0xFF
-        send_buf[3] = index & 0xFF
-        send_buf[4] = (value >> 8) & 0xFF
-        send_buf[5] = value & 0xFF
-
-        crc = self.CRC16(send_buf,len(send_buf)-2)
-        send_buf[6] = crc & 0xFF
-        send_buf[7] = (crc >> 8) & 0xFF
-
-        send_temp = send_buf
-        ret = False
-        retrycount = 3
-
-        while ( ret == False ):
-            ret = False
-
-            if(retrycount < 0) :
-                break
-            retrycount = retrycount - 1
-
-            wdlen = self.m_device.device_wrire(send_temp)
-            if(len(send_temp) != wdlen) :
-                print('write error ! write : ', send_temp)
-                continue
-
-            rev_buf = self.m_device.device_read(8)
-            if(len(rev_buf) == wdlen) :
-                ret = True
-        return ret
+        try:
+            self.modbus.write_register(index, value)
+        except ModbusError as e:
+            print('write error ! register : ', hex(index), e)
+            return False
+        return True
+
+    def WriteRegistersFunc(self,index, values) :
+        try:
+            self.modbus.write_registers(index, values)
+        except ModbusError as e:
+            print('write error ! registers : ', hex(index), e)
+            return False
+        return True
 
     def ReadRegisterFunc(self,index) :
-        send_buf = [0,0,0,0,0,0,0,0]
-        send_buf[0] = self.gripper_ID
-        send_buf[1] = 0x03
-        send_buf[2] = (index >> 8) & 0xFF
-        send_buf[3] = index & 0xFF
-        send_buf[4] = 0x00
-        send_buf[5] = 0x01
-
-        crc = self.CRC16(send_buf,len(send_buf)-2)
-        send_buf[6] = crc & 0xFF
-        send_buf[7] = (crc >> 8) & 0xFF
-
-        send_temp = send_buf
-        ret = False
-        retrycount = 3
-
-        while ( ret == False ):
-            ret = False
-
-            if(retrycount < 0) :
-                break
-            retrycount = retrycount - 1
-
-            wdlen = self.m_device.device_wrire(send_temp)
-            if(len(send_temp) != wdlen) :
-                print('write error ! write : ', send_temp)
-                continue
-
-            rev_buf = self.m_device.device_read(7)
-            if(len(rev_buf) == 7) :
-                value = ((rev_buf[4]&0xFF)|(rev_buf[3] << 8))
-                ret = True
-            #('read value : ', value)
-        return value
+        return self.modbus.read_registers(index, 1)[0]
+
+    def ReadRegistersFunc(self,index, count) :
+        return self.modbus.read_registers(index, count)
 
     def Initialization(self) :
         self.WriteRegisterFunc(0x0100,0xA5)
@@ -188,6 +133,16 @@ class dh_modbus_gripper(object):
     def GetGripState(self) :
         return self.ReadRegisterFunc(0x0201);
 
+    def SetTargetPositionAndSpeed(self,refpos,speed) :
+        # 0x0103 位置, 0x0104 速度, 一次写入
+        return self.WriteRegistersFunc(0x0103,[refpos,speed])
+
+    def GetStatus(self) :
+        '''
+        一次读取初始化状态(0x0200), 夹持状态(0x0201)和当前位置(0x0202)
+        '''
+        return self.ReadRegistersFunc(0x0200,3)
+
     """description of class"""
 
 class dh_gripper():
@@ -230,7 +185,7 @@ class dh_gripper():
         self.g_state = 0
         self.m_gripper.SetTargetPosition(position)
         while(self.g_state == 0) :
-            self.g_state = self.m_gripper.GetGripState()
+            self.get_status()
             sleep(0.2)
         
     def write_position_without_wait(self,position):
@@ -261,7 +216,9 @@ class dh_gripper():
         # self.write_force(force)
         # self.write_speed(speed)
         actual_position = int(position*1000)
-        self.write_position_without_wait(actual_position)
+        # position and speed in one transaction
+        self.g_state = 0
+        self.m_gripper.SetTargetPositionAndSpeed(actual_position, speed)
 
 
     def disable_gripper(self):
@@ -270,8 +227,16 @@ class dh_gripper():
         '''
         self.m_gripper.close()
        
+    def get_status(self):
+        '''
+        一次读取初始化状态, 夹持状态和当前位置(0-1)
+        '''
+        initstate, self.g_state, position = self.m_gripper.GetStatus()
+        return initstate, self.g_state, position/1000
+
     def get_current_position(self):
-        return self.m_gripper.GetCurrentPosition()/1000
+        # the grip state comes with the position in the same transaction
+        return self.get_status()[2]
 
     def on_keyboard_pressed(self, key):    
         try:
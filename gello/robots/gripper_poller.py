@@ -0,0 +1,231 @@
+"""Gripper I/O on a background thread.
+
+The serial grippers (``chingtekGripper``, ``dh_gripper``) take several
+milliseconds per Modbus transaction, too long to do inside a control tick.
+``GripperPoller`` owns all I/O with one gripper: it reads the position at a
+fixed rate into a latest-value cache and runs move commands in between reads.
+The control loop only reads the cache and hands over commands, so it never
+waits on the serial port.
+
+There are two ways to command the gripper. ``move`` queues discrete moves
+that all run in order, e.g. open/close toggles. ``set_target`` is for
+continuous control: only the newest setpoint is kept, it is sent only when it
+is more than ``deadband`` away from the last sent position, and no more often
+than ``max_command_rate``, so a stream of setpoints from a 100 Hz teleop loop
+does not saturate the bus.
+"""
+
+import collections
+import threading
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class GripperPoller:
+    """Polls a gripper's position and sends it move commands on one thread.
+
+    The gripper only needs ``get_current_position()`` and ``move(position)``.
+    """
+
+    def __init__(
+        self,
+        gripper: Any,
+        poll_rate: float = 50.0,
+        queue_size: int = 4,
+        deadband: float = 0.01,
+        max_command_rate: float = 20.0,
+        num_latency_samples: int = 1000,
+    ):
+        """
+        Args:
+            gripper: The gripper driver, only used from the poller thread.
+            poll_rate: Position reads per second.
+            queue_size: Moves that can wait for the gripper. When the queue is
+                full the oldest move is dropped, the newest always runs.
+            deadband: ``set_target`` setpoints closer than this to the last
+                sent position are not sent.
+            max_command_rate: Maximum ``set_target`` moves per second.
+            num_latency_samples: Size of the window of read latencies.
+        """
+        self.gripper = gripper
+        self.deadband = deadband
+        self._period = 1.0 / poll_rate
+        self._command_period = 1.0 / max_command_rate
+        self._moves: Deque[float] = collections.deque(maxlen=queue_size)
+        self._target: Optional[float] = None
+        self._last_sent: Optional[float] = None
+        # wakes the poller thread when a command arrives
+        self._wake = threading.Condition()
+
+        # (position, time.monotonic() when the read finished); replaced as a
+        # whole so that readers need no lock
+        self._latest: Tuple[float, float] = (0.0, 0.0)
+        self._has_value = threading.Event()
+        self._stop_event = threading.Event()
+
+        self._latencies = np.zeros(num_latency_samples, dtype=np.float64)
+        self._num_reads = 0
+        self._num_read_errors = 0
+        self._num_moves = 0
+        self._num_dropped_moves = 0
+        self._num_move_errors = 0
+        self._num_coalesced_targets = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def latest(self, timeout: Optional[float] = 5.0) -> Tuple[float, float]:
+        """Get the newest position and when it was read.
+
+        Only blocks until the first read has finished.
+
+        Args:
+            timeout: Seconds to wait for the first read, None waits forever.
+
+        Returns:
+            Tuple of the position and the ``time.monotonic()`` of the read.
+        """
+        if not self._has_value.wait(timeout):
+            raise RuntimeError("No position read from the gripper")
+        return self._latest
+
+    @property
+    def position(self) -> float:
+        return self.latest()[0]
+
+    @property
+    def staleness(self) -> float:
+        """Seconds since the cached position was read."""
+        return time.monotonic() - self.latest()[1]
+
+    def move(self, position: float) -> None:
+        """Queue a move to ``position``, without waiting for the gripper."""
+        with self._wake:
+            if len(self._moves) == self._moves.maxlen:
+                self._num_dropped_moves += 1
+            self._moves.append(position)
+            self._wake.notify()
+
+    def set_target(self, position: float) -> None:
+        """Set the setpoint of continuous control, replacing an unsent one."""
+        with self._wake:
+            if self._target is not None:
+                self._num_coalesced_targets += 1
+            self._target = position
+            self._wake.notify()
+
+    def stats(self) -> Dict[str, float]:
+        """Counters, read latency (ms) and staleness (ms) of the cache."""
+        num_samples = min(self._num_reads, len(self._latencies))
+        stats = {
+            "reads": self._num_reads,
+            "read_errors": self._num_read_errors,
+            "moves": self._num_moves,
+            "dropped_moves": self._num_dropped_moves,
+            "move_errors": self._num_move_errors,
+            "coalesced_targets": self._num_coalesced_targets,
+        }
+        if num_samples:
+            latencies = self._latencies[:num_samples] * 1e3
+            p50, p99 = np.percentile(latencies, [50, 99])
+            stats.update(
+                read_p50_ms=p50,
+                read_p99_ms=p99,
+                read_max_ms=latencies.max(),
+                staleness_ms=self.staleness * 1e3,
+            )
+        return stats
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        message = (
+            f"gripper: {stats['reads']} reads ({stats['read_errors']} failed), "
+            f"{stats['moves']} moves ({stats['dropped_moves']} dropped, "
+            f"{stats['move_errors']} failed, "
+            f"{stats['coalesced_targets']} targets coalesced)"
+        )
+        if "read_p50_ms" in stats:
+            message += (
+                f", read p50 {stats['read_p50_ms']:.2f} ms "
+                f"p99 {stats['read_p99_ms']:.2f} ms, "
+                f"staleness {stats['staleness_ms']:.2f} ms"
+            )
+        return message
+
+    def close(self) -> None:
+        with self._wake:
+            self._stop_event.set()
+            self._wake.notify()
+        self._thread.join()
+
+    def _next_command(
+        self, next_read: float, next_target: float
+    ) -> Tuple[Optional[str], Optional[float]]:
+        """Wait until something is due: a queued move, the target or a read."""
+        with self._wake:
+            while not self._stop_event.is_set():
+                # queued moves go out right away, the target and reads when
+                # they are due
+                if self._moves:
+                    return "move", self._moves.popleft()
+                now = time.monotonic()
+                if self._target is not None and now >= next_target:
+                    target, self._target = self._target, None
+                    return "target", target
+                if now >= next_read:
+                    return "read", None
+                deadline = next_read
+                if self._target is not None:
+                    deadline = min(deadline, next_target)
+                self._wake.wait(deadline - now)
+        return None, None
+
+    def _run(self) -> None:
+        next_read = next_target = time.monotonic()
+        while True:
+            kind, position = self._next_command(next_read, next_target)
+            if kind is None:
+                return
+            if kind == "move":
+                self._move(position)
+            elif kind == "target":
+                if (
+                    self._last_sent is None
+                    or abs(position - self._last_sent) > self.deadband
+                ):
+                    self._move(position)
+                    next_target = time.monotonic() + self._command_period
+            else:
+                self._read()
+                next_read += self._period
+                now = time.monotonic()
+                if next_read < now:
+                    # the read overran, do not catch up with back to back reads
+                    next_read = now + self._period
+
+    def _move(self, position: float) -> None:
+        try:
+            self.gripper.move(position)
+            self._num_moves += 1
+            self._last_sent = position
+        except Exception as e:
+            self._num_move_errors += 1
+            print(f"Gripper move to {position} failed: {e}")
+
+    def _read(self) -> None:
+        start = time.monotonic()
+        try:
+            position = float(self.gripper.get_current_position())
+        except Exception as e:
+            # keep serving the last good value, its staleness shows the gap
+            if self._num_read_errors == 0:
+                print(f"Gripper read failed: {e}")
+            self._num_read_errors += 1
+            return
+        end = time.monotonic()
+        self._latest = (position, end)
+        self._latencies[self._num_reads % len(self._latencies)] = end - start
+        self._num_reads += 1
+        self._has_value.set()
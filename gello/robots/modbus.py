@@ -0,0 +1,239 @@
+"""Minimal Modbus RTU master shared by the serial grippers.
+
+Each transaction is a full round trip on the serial port (a few milliseconds at
+115200 baud), so the grippers combine registers that sit next to each other
+into one multi-register read (function 0x03) or write (function 0x10) instead
+of one transaction per register. The CRC16 uses a 256-entry table, and request
+frames are cached since the grippers send the same few frames over and over.
+
+``FakeModbusDevice`` serves a register map on a pseudo terminal, so the
+gripper drivers can be tested without hardware.
+"""
+
+import functools
+import os
+import select
+import struct
+import threading
+import tty
+from typing import Dict, List, Optional, Sequence
+
+import serial
+
+READ_HOLDING_REGISTERS = 0x03
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+_EXCEPTION_FLAG = 0x80
+# maximum number of registers in one request, from the Modbus spec
+_MAX_READ_COUNT = 125
+_MAX_WRITE_COUNT = 123
+
+
+class ModbusError(IOError):
+    """A transaction failed: timeout, bad CRC or an exception response."""
+
+
+def _make_crc_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc16(data: bytes) -> int:
+    """Modbus CRC16 (polynomial 0xA001, initial value 0xFFFF)."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _with_crc(body: bytes) -> bytes:
+    return body + struct.pack("<H", crc16(body))
+
+
+@functools.lru_cache(maxsize=256)
+def read_registers_frame(slave: int, address: int, count: int) -> bytes:
+    if not 1 <= count <= _MAX_READ_COUNT:
+        raise ValueError(f"Can not read {count} registers in one request")
+    return _with_crc(
+        struct.pack(">BBHH", slave, READ_HOLDING_REGISTERS, address, count)
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def write_register_frame(slave: int, address: int, value: int) -> bytes:
+    return _with_crc(struct.pack(">BBHH", slave, WRITE_SINGLE_REGISTER, address, value))
+
+
+@functools.lru_cache(maxsize=256)
+def write_registers_frame(slave: int, address: int, values: Sequence[int]) -> bytes:
+    """Frame of a 0x10 write, ``values`` must be hashable (a tuple)."""
+    count = len(values)
+    if not 1 <= count <= _MAX_WRITE_COUNT:
+        raise ValueError(f"Can not write {count} registers in one request")
+    header = struct.pack(
+        ">BBHHB", slave, WRITE_MULTIPLE_REGISTERS, address, count, 2 * count
+    )
+    return _with_crc(header + struct.pack(f">{count}H", *values))
+
+
+class ModbusRTU:
+    """Modbus RTU transactions with one slave over a serial port."""
+
+    def __init__(self, port: serial.Serial, slave: int = 1, retries: int = 0):
+        """
+        Args:
+            port: An open serial port. Its timeout bounds every response.
+            slave: Address of the device.
+            retries: Extra attempts of a transaction that failed.
+        """
+        self.port = port
+        self.slave = slave
+        self.retries = retries
+        self._lock = threading.Lock()
+
+    def read_registers(self, address: int, count: int) -> List[int]:
+        """Read ``count`` consecutive holding registers in one transaction."""
+        frame = read_registers_frame(self.slave, address, count)
+        response = self._transact(frame, 5 + 2 * count)
+        return list(struct.unpack_from(f">{count}H", response, 3))
+
+    def write_register(self, address: int, value: int) -> None:
+        self._transact(write_register_frame(self.slave, address, value & 0xFFFF), 8)
+
+    def write_registers(self, address: int, values: Sequence[int]) -> None:
+        """Write consecutive holding registers in one transaction."""
+        values = tuple(value & 0xFFFF for value in values)
+        self._transact(write_registers_frame(self.slave, address, values), 8)
+
+    def _transact(self, frame: bytes, response_length: int) -> bytes:
+        with self._lock:
+            attempt = 0
+            while True:
+                try:
+                    return self._transact_once(frame, response_length)
+                except ModbusError:
+                    if attempt == self.retries:
+                        raise
+                    attempt += 1
+                    # drop what is left of a bad response before retrying
+                    self.port.reset_input_buffer()
+
+    def _transact_once(self, frame: bytes, response_length: int) -> bytes:
+        self.port.write(frame)
+        # an exception response is shorter, so read the header first and do
+        # not wait for the timeout
+        response = self.port.read(2)
+        if len(response) == 2 and response[1] & _EXCEPTION_FLAG:
+            response += self.port.read(3)
+            self._check_crc(response)
+            raise ModbusError(
+                f"Device {self.slave} returned exception {response[2]} "
+                f"for function {frame[1]:#04x}"
+            )
+        response += self.port.read(response_length - 2)
+        if len(response) != response_length:
+            raise ModbusError(
+                f"Timed out waiting for device {self.slave}, got "
+                f"{len(response)} of {response_length} bytes"
+            )
+        self._check_crc(response)
+        if response[0] != self.slave or response[1] != frame[1]:
+            raise ModbusError(f"Unexpected response {response.hex()}")
+        return response
+
+    @staticmethod
+    def _check_crc(response: bytes) -> None:
+        if (
+            len(response) < 4
+            or crc16(response[:-2]) != struct.unpack("<H", response[-2:])[0]
+        ):
+            raise ModbusError(f"Bad CRC in response {response.hex()}")
+
+
+class FakeModbusDevice:
+    """A Modbus RTU slave with a register map, served on a pseudo terminal.
+
+    Open ``port`` like the serial port of a real device. ``registers`` can be
+    read and changed while the device runs, ``num_requests`` counts the
+    transactions it answered.
+    """
+
+    def __init__(self, registers: Optional[Dict[int, int]] = None, slave: int = 1):
+        self.registers: Dict[int, int] = dict(registers or {})
+        self.slave = slave
+        self.num_requests = 0
+        self.requests: List[bytes] = []
+        self._master, self._slave_fd = os.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._buffer = b""
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave_fd)
+
+    def _serve(self) -> None:
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            self._buffer += os.read(self._master, 1024)
+            while True:
+                length = self._request_length(self._buffer)
+                if length is None or len(self._buffer) < length:
+                    break
+                request, self._buffer = self._buffer[:length], self._buffer[length:]
+                response = self._respond(request)
+                if response is not None:
+                    os.write(self._master, response)
+
+    @staticmethod
+    def _request_length(buffer: bytes) -> Optional[int]:
+        if len(buffer) < 2:
+            return None
+        if buffer[1] == WRITE_MULTIPLE_REGISTERS:
+            return None if len(buffer) < 7 else 9 + buffer[6]
+        return 8
+
+    def _respond(self, request: bytes) -> Optional[bytes]:
+        if (
+            request[0] != self.slave
+            or crc16(request[:-2]) != struct.unpack("<H", request[-2:])[0]
+        ):
+            # a real device stays silent
+            return None
+        self.num_requests += 1
+        self.requests.append(request)
+        function = request[1]
+        address, value = struct.unpack_from(">HH", request, 2)
+        if function == READ_HOLDING_REGISTERS:
+            values = [self.registers.get(address + i, 0) for i in range(value)]
+            body = struct.pack(
+                f">BBB{value}H", self.slave, function, 2 * value, *values
+            )
+        elif function == WRITE_SINGLE_REGISTER:
+            self.registers[address] = value
+            body = request[:6]
+        elif function == WRITE_MULTIPLE_REGISTERS:
+            values = struct.unpack_from(f">{value}H", request, 7)
+            for i, register in enumerate(values):
+                self.registers[address + i] = register
+            body = request[:6]
+        else:
+            # illegal function
+            body = bytes([self.slave, function | _EXCEPTION_FLAG, 0x01])
+        return _with_crc(body)
@@ -1,8 +1,11 @@
 from abc import abstractmethod
-from typing import Dict, Protocol
+from typing import Dict, Optional, Protocol
 
 import numpy as np
 
+from gello.agents.layout import BimanualLayout
+from gello.utils.arm_pool import ArmPool
+
 
 class Robot(Protocol):
     """Robot protocol.
@@ -86,30 +89,162 @@ class PrintRobot(Robot):
 
 
 class BimanualRobot(Robot):
-    def __init__(self, robot_l: Robot, robot_r: Robot):
+    """Two arms driven as one robot, the left arm's joints first.
+
+    With ``concurrent`` (the default) both arms are read and commanded at the
+    same time on an ``ArmPool``, so the two halves of an observation are
+    captured together and a call takes as long as the slower arm.
+
+    Actions are split between the arms by a ``BimanualLayout``. Without one it
+    is built from the arms' ``num_dofs`` on first use.
+    """
+
+    def __init__(
+        self,
+        robot_l: Robot,
+        robot_r: Robot,
+        concurrent: bool = True,
+        layout: Optional[BimanualLayout] = None,
+    ):
         self._robot_l = robot_l
         self._robot_r = robot_r
+        self._pool: Optional[ArmPool] = ArmPool() if concurrent else None
+        self._layout = layout
+
+    @property
+    def layout(self) -> BimanualLayout:
+        if self._layout is None:
+            self._layout = BimanualLayout(
+                self._robot_l.num_dofs(), self._robot_r.num_dofs()
+            )
+        return self._layout
 
     def num_dofs(self) -> int:
-        return self._robot_l.num_dofs() + self._robot_r.num_dofs()
+        return self.layout.num_dofs
 
     def get_joint_state(self) -> np.ndarray:
         return np.concatenate(
-            (self._robot_l.get_joint_state(), self._robot_r.get_joint_state())
+            self._run(self._robot_l.get_joint_state, self._robot_r.get_joint_state)
         )
 
     def command_joint_state(self, joint_state: np.ndarray) -> None:
-        self._robot_l.command_joint_state(joint_state[: self._robot_l.num_dofs()])
-        self._robot_r.command_joint_state(joint_state[self._robot_l.num_dofs() :])
+        command_l, command_r = self.layout.split_action(joint_state)
+        self._run(
+            lambda: self._robot_l.command_joint_state(command_l),
+            lambda: self._robot_r.command_joint_state(command_r),
+        )
+
+    def step(self, joint_state: np.ndarray) -> Dict[str, np.ndarray]:
+        """Command both arms and return the combined observations.
+
+        Arms that support ``step_async`` (the ZMQ clients) get their requests
+        sent before either reply is awaited, so two robot servers are stepped
+        in about one round trip instead of two. Other arms are stepped on the
+        ``ArmPool`` when it is enabled.
+        """
+        command_l, command_r = self.layout.split_action(joint_state)
+        commands = ((self._robot_l, command_l), (self._robot_r, command_r))
+        if self._pool is not None and not all(
+            hasattr(robot, "step_async") for robot, _ in commands
+        ):
+            return self._merge_observations(
+                *self._pool.run(
+                    lambda: self._step_arm(*commands[0]),
+                    lambda: self._step_arm(*commands[1]),
+                )
+            )
+
+        for robot, command in commands:
+            if hasattr(robot, "step_async"):
+                robot.step_async(command)
+
+        obs = []
+        for robot, command in commands:
+            if hasattr(robot, "step_async"):
+                obs.append(robot.step_result())
+            else:
+                obs.append(self._step_arm(robot, command))
+        return self._merge_observations(*obs)
+
+    def step_async(self, joint_state: np.ndarray) -> None:
+        """Command both arms without waiting for their observations.
+
+        Must be followed by ``step_result``. Arms with ``step_async`` get a
+        step request, the others are commanded and observed in
+        ``step_result``.
+        """
+        command_l, command_r = self.layout.split_action(joint_state)
+        self._run(
+            lambda: self._send_arm(self._robot_l, command_l),
+            lambda: self._send_arm(self._robot_r, command_r),
+        )
+
+    def step_result(self) -> Dict[str, np.ndarray]:
+        """Observations of both arms after a ``step_async``."""
+        return self._merge_observations(
+            *self._run(
+                lambda: self._arm_result(self._robot_l),
+                lambda: self._arm_result(self._robot_r),
+            )
+        )
+
+    @staticmethod
+    def _send_arm(robot: Robot, command: np.ndarray) -> None:
+        if hasattr(robot, "step_async"):
+            robot.step_async(command)
+        else:
+            robot.command_joint_state(command)
+
+    @staticmethod
+    def _arm_result(robot: Robot) -> Dict[str, np.ndarray]:
+        if hasattr(robot, "step_async"):
+            return robot.step_result()
+        return robot.get_observations()
+
+    @staticmethod
+    def _step_arm(robot: Robot, command: np.ndarray) -> Dict[str, np.ndarray]:
+        if hasattr(robot, "step"):
+            return robot.step(command)
+        robot.command_joint_state(command)
+        return robot.get_observations()
 
     def get_observations(self) -> Dict[str, np.ndarray]:
-        l_obs = self._robot_l.get_observations()
-        r_obs = self._robot_r.get_observations()
+        return self._merge_observations(
+            *self._run(self._robot_l.get_observations, self._robot_r.get_observations)
+        )
+
+    def _run(self, left, right):
+        if self._pool is None:
+            return left(), right()
+        return self._pool.run(left, right)
+
+    def stats(self) -> Dict[str, float]:
+        """Per-arm latency of the concurrent calls, see ``ArmPool.stats``."""
+        return {} if self._pool is None else self._pool.stats()
+
+    def format_stats(self) -> str:
+        if self._pool is None:
+            return "arms run sequentially"
+        return f"arms: {self._pool.format_stats()}"
+
+    def close(self) -> None:
+        for robot in (self._robot_l, self._robot_r):
+            if hasattr(robot, "close"):
+                robot.close()
+        if self._pool is not None:
+            self._pool.close()
+
+    def _merge_observations(
+        self, l_obs: Dict[str, np.ndarray], r_obs: Dict[str, np.ndarray]
+    ) -> Dict[str, np.ndarray]:
         assert l_obs.keys() == r_obs.keys()
         return_obs = {}
         for k in l_obs.keys():
             try:
-                return_obs[k] = np.concatenate((l_obs[k], r_obs[k]))
+                # scalars such as a gripper position become length 1 arrays
+                return_obs[k] = np.concatenate(
+                    (np.atleast_1d(l_obs[k]), np.atleast_1d(r_obs[k]))
+                )
             except Exception as e:
                 print(e)
                 print(k)
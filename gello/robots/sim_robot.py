@@ -1,15 +1,17 @@
-import pickle
+import concurrent.futures
+import os
 import threading
-import time
-from typing import Any, Dict, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import mujoco
 import mujoco.viewer
 import numpy as np
-import zmq
 from dm_control import mjcf
 
+from gello.dm_control_tasks.arms.kinematics import mat_to_quat
 from gello.robots.robot import Robot
+from gello.utils.rate import Rate
+from gello.zmq_core.robot_node import ZMQServerRobot
 
 assert mujoco.viewer is mujoco.viewer
 
@@ -69,6 +71,33 @@ def build_scene(robot_xml_path: str, gripper_xml_path: Optional[str] = None):
     return arena
 
 
+def compile_scene(
+    robot_xml_path: str,
+    gripper_xml_path: Optional[str] = None,
+    xml_dump_path: Optional[str] = None,
+) -> mujoco.MjModel:
+    """Build the scene of ``build_scene`` and compile it into a model.
+
+    Args:
+        robot_xml_path: MJCF of the arm.
+        gripper_xml_path: MJCF of a gripper to attach to the arm.
+        xml_dump_path: If set, the scene's XML is saved there for debugging.
+    """
+    arena = build_scene(robot_xml_path, gripper_xml_path)
+
+    assets: Dict[str, str] = {}
+    for asset in arena.asset.all_children():
+        if asset.tag == "mesh":
+            f = asset.file
+            assets[f.get_vfs_filename()] = asset.file.contents
+
+    xml_string = arena.to_xml_string()
+    if xml_dump_path is not None:
+        with open(xml_dump_path, "w") as f:
+            f.write(xml_string)
+    return mujoco.MjModel.from_xml_string(xml_string, assets)
+
+
 class ZMQServerThread(threading.Thread):
     def __init__(self, server):
         super().__init__()
@@ -79,58 +108,48 @@ class ZMQServerThread(threading.Thread):
 
     def terminate(self):
         self._server.stop()
+        self.join()
 
 
-class ZMQRobotServer:
-    """A class representing a ZMQ server for a robot."""
+class ZMQRobotServer(ZMQServerRobot):
+    """A ZMQ server for a robot that releases its socket when it stops."""
 
     def __init__(self, robot: Robot, host: str = "127.0.0.1", port: int = 5556):
-        self._robot = robot
-        self._context = zmq.Context()
-        self._socket = self._context.socket(zmq.REP)
-        addr = f"tcp://{host}:{port}"
-        self._socket.bind(addr)
-        self._stop_event = threading.Event()
+        super().__init__(robot=robot, port=port, host=host)
 
     def serve(self) -> None:
-        """Serve the robot state and commands over ZMQ."""
-        self._socket.setsockopt(zmq.RCVTIMEO, 1000)  # Set timeout to 1000 ms
-        while not self._stop_event.is_set():
-            try:
-                message = self._socket.recv()
-                request = pickle.loads(message)
-
-                # Call the appropriate method based on the request
-                method = request.get("method")
-                args = request.get("args", {})
-                result: Any
-                if method == "num_dofs":
-                    result = self._robot.num_dofs()
-                elif method == "get_joint_state":
-                    result = self._robot.get_joint_state()
-                elif method == "command_joint_state":
-                    result = self._robot.command_joint_state(**args)
-                elif method == "get_observations":
-                    result = self._robot.get_observations()
-                else:
-                    result = {"error": "Invalid method"}
-                    print(result)
-                    raise NotImplementedError(
-                        f"Invalid method: {method}, {args, result}"
-                    )
-
-                self._socket.send(pickle.dumps(result))
-            except zmq.error.Again:
-                print("Timeout in ZMQLeaderServer serve")
-                # Timeout occurred, check if the stop event is set
+        try:
+            super().serve()
+        finally:
+            # closed by the serving thread, closing it from another thread
+            # while it polls is not safe
+            self.close()
 
-    def stop(self) -> None:
-        self._stop_event.set()
-        self._socket.close()
-        self._context.term()
+    def close(self) -> None:
+        self._close_publisher()
+        if not self._socket.closed:
+            self._socket.close()
+            self._context.term()
 
 
 class MujocoRobotServer:
+    """Simulates an arm in MuJoCo and serves it like a real robot.
+
+    By default the physics runs at wall clock speed in the passive viewer.
+    ``headless`` runs without a viewer, so the server works without a display,
+    e.g. in CI. The physics then either free-runs at ``real_time_factor``
+    times real time (None for as fast as possible), or with ``lock_step``
+    advances only when a joint command arrives, by ``n_substeps`` physics
+    steps per command, so replays and policy evaluations are deterministic
+    and run as fast as the client sends commands.
+
+    ``cameras`` names MJCF cameras that are rendered offscreen into every
+    observation as ``<camera>_rgb``. Headless rendering needs an offscreen
+    OpenGL backend, e.g. ``MUJOCO_GL=egl``. A GL context can only be used on
+    the thread that made it current, so every thread that reads observations
+    gets its own renderer, created the first time it renders.
+    """
+
     def __init__(
         self,
         xml_path: str,
@@ -138,34 +157,69 @@ class MujocoRobotServer:
         host: str = "127.0.0.1",
         port: int = 5556,
         print_joints: bool = False,
+        headless: bool = False,
+        lock_step: bool = False,
+        n_substeps: int = 1,
+        real_time_factor: Optional[float] = 1.0,
+        cameras: Sequence[str] = (),
+        camera_size: Tuple[int, int] = (240, 320),
+        xml_dump_path: Optional[str] = None,
     ):
+        """
+        Args:
+            xml_path: MJCF of the arm.
+            gripper_xml_path: MJCF of a gripper to attach to the arm.
+            host: Host the ZMQ server binds to.
+            port: Port the ZMQ server binds to.
+            print_joints: Print the joint state after every physics step.
+            headless: Run without the viewer.
+            lock_step: Advance the physics only on joint commands.
+            n_substeps: Physics steps per command (lock step) or per tick of
+                the free-running loop.
+            real_time_factor: Speed of the free-running loop relative to the
+                wall clock, None for as fast as possible. The viewer always
+                runs in real time.
+            cameras: Names of the cameras to render into the observations.
+            camera_size: Height and width of the rendered images.
+            xml_dump_path: Save the XML of the scene there, for debugging.
+        """
+        if n_substeps < 1:
+            raise ValueError(f"n_substeps must be at least 1, got {n_substeps}")
         self._has_gripper = gripper_xml_path is not None
-        arena = build_scene(xml_path, gripper_xml_path)
-
-        assets: Dict[str, str] = {}
-        for asset in arena.asset.all_children():
-            if asset.tag == "mesh":
-                f = asset.file
-                assets[f.get_vfs_filename()] = asset.file.contents
-
-        xml_string = arena.to_xml_string()
-        # save xml_string to file
-        with open("arena.xml", "w") as f:
-            f.write(xml_string)
-
-        self._model = mujoco.MjModel.from_xml_string(xml_string, assets)
+        self._model = compile_scene(xml_path, gripper_xml_path, xml_dump_path)
         self._data = mujoco.MjData(self._model)
+        # held while the physics steps and while observations are read, the
+        # ZMQ server and the physics loop run on different threads
+        self._lock = threading.Lock()
 
         self._num_joints = self._model.nu
+        self._ee_site_id = mujoco.mj_name2id(
+            self._model, mujoco.mjtObj.mjOBJ_SITE, "attachment_site"
+        )
 
         self._joint_state = np.zeros(self._num_joints)
         self._joint_cmd = self._joint_state
 
+        self._headless = headless
+        self._lock_step = lock_step
+        self._n_substeps = n_substeps
+        self._real_time_factor = real_time_factor
+        self._stop_event = threading.Event()
+
+        self._cameras = tuple(cameras)
+        self._camera_size = camera_size
+        # by thread id, see _thread_renderer
+        self._renderers: Dict[int, mujoco.Renderer] = {}
+
         self._zmq_server = ZMQRobotServer(robot=self, host=host, port=port)
         self._zmq_server_thread = ZMQServerThread(self._zmq_server)
 
         self._print_joints = print_joints
 
+    @property
+    def sim_time(self) -> float:
+        return self._data.time
+
     def num_dofs(self) -> int:
         return self._num_joints
 
@@ -183,6 +237,9 @@ class MujocoRobotServer:
             self._joint_cmd = _joint_state
         else:
             self._joint_cmd = joint_state.copy()
+        if self._lock_step:
+            with self._lock:
+                self._step_physics()
 
     def freedrive_enabled(self) -> bool:
         return True
@@ -191,66 +248,279 @@ class MujocoRobotServer:
         pass
 
     def get_observations(self) -> Dict[str, np.ndarray]:
-        joint_positions = self._data.qpos.copy()[: self._num_joints]
-        joint_velocities = self._data.qvel.copy()[: self._num_joints]
-        ee_site = "attachment_site"
-        try:
-            ee_pos = self._data.site_xpos.copy()[
-                mujoco.mj_name2id(self._model, 6, ee_site)
-            ]
-            ee_mat = self._data.site_xmat.copy()[
-                mujoco.mj_name2id(self._model, 6, ee_site)
-            ]
-            ee_quat = np.zeros(4)
-            mujoco.mju_mat2Quat(ee_quat, ee_mat)
-        except Exception:
-            ee_pos = np.zeros(3)
-            ee_quat = np.zeros(4)
-            ee_quat[0] = 1
-        gripper_pos = self._data.qpos.copy()[self._num_joints - 1]
-        return {
-            "joint_positions": joint_positions,
-            "joint_velocities": joint_velocities,
-            "ee_pos_quat": np.concatenate([ee_pos, ee_quat]),
-            "gripper_position": gripper_pos,
-        }
+        with self._lock:
+            joint_positions = self._data.qpos[: self._num_joints].copy()
+            joint_velocities = self._data.qvel[: self._num_joints].copy()
+            if self._ee_site_id >= 0:
+                ee_pos = self._data.site_xpos[self._ee_site_id].copy()
+                ee_quat = np.zeros(4)
+                mujoco.mju_mat2Quat(ee_quat, self._data.site_xmat[self._ee_site_id])
+            else:
+                ee_pos = np.zeros(3)
+                ee_quat = np.array([1.0, 0.0, 0.0, 0.0])
+            obs = {
+                "joint_positions": joint_positions,
+                "joint_velocities": joint_velocities,
+                "ee_pos_quat": np.concatenate([ee_pos, ee_quat]),
+                "gripper_position": joint_positions[-1],
+            }
+            if self._cameras:
+                renderer = self._thread_renderer()
+                for camera in self._cameras:
+                    renderer.update_scene(self._data, camera=camera)
+                    obs[f"{camera}_rgb"] = renderer.render()
+        return obs
+
+    def _thread_renderer(self) -> mujoco.Renderer:
+        """The renderer of the calling thread, created on first use.
+
+        Creating it in the constructor would bind its context to the thread
+        that built the server, while observations are read on the ZMQ thread,
+        and EGL then fails with EGL_BAD_ACCESS.
+        """
+        thread_id = threading.get_ident()
+        renderer = self._renderers.get(thread_id)
+        if renderer is None:
+            height, width = self._camera_size
+            renderer = mujoco.Renderer(self._model, height, width)
+            self._renderers[thread_id] = renderer
+        return renderer
+
+    def _step_physics(self) -> None:
+        """Apply the last command and step the physics ``n_substeps`` times."""
+        self._data.ctrl[:] = self._joint_cmd
+        for _ in range(self._n_substeps):
+            mujoco.mj_step(self._model, self._data)
+        self._joint_state = self._data.qpos[: self._num_joints].copy()
+
+        if self._print_joints:
+            print(self._joint_state)
 
     def serve(self) -> None:
+        """Serve the robot until ``stop`` is called or the viewer is closed."""
         # start the zmq server
         self._zmq_server_thread.start()
+        try:
+            if self._headless:
+                self._serve_headless()
+            else:
+                self._serve_viewer()
+        finally:
+            self._zmq_server_thread.terminate()
+
+    def _serve_headless(self) -> None:
+        if self._lock_step:
+            # the ZMQ thread steps the physics
+            self._stop_event.wait()
+            return
+        rate = None
+        if self._real_time_factor is not None:
+            period = self._model.opt.timestep * self._n_substeps
+            rate = Rate(self._real_time_factor / period)
+        while not self._stop_event.is_set():
+            with self._lock:
+                self._step_physics()
+            if rate is not None:
+                rate.sleep()
+
+    def _serve_viewer(self) -> None:
+        rate = Rate(1 / (self._model.opt.timestep * self._n_substeps))
         with mujoco.viewer.launch_passive(self._model, self._data) as viewer:
-            while viewer.is_running():
-                step_start = time.time()
-
-                # mj_step can be replaced with code that also evaluates
-                # a policy and applies a control signal before stepping the physics.
-                self._data.ctrl[:] = self._joint_cmd
-                # self._data.qpos[:] = self._joint_cmd
-                mujoco.mj_step(self._model, self._data)
-                self._joint_state = self._data.qpos.copy()[: self._num_joints]
-
-                if self._print_joints:
-                    print(self._joint_state)
-
-                # Example modification of a viewer option: toggle contact points every two seconds.
-                with viewer.lock():
-                    # TODO remove?
-                    viewer.opt.flags[mujoco.mjtVisFlag.mjVIS_CONTACTPOINT] = int(
-                        self._data.time % 2
-                    )
-
-                # Pick up changes to the physics state, apply perturbations, update options from GUI.
-                viewer.sync()
-
-                # Rudimentary time keeping, will drift relative to wall clock.
-                time_until_next_step = self._model.opt.timestep - (
-                    time.time() - step_start
-                )
-                if time_until_next_step > 0:
-                    time.sleep(time_until_next_step)
+            while viewer.is_running() and not self._stop_event.is_set():
+                with self._lock:
+                    if not self._lock_step:
+                        self._step_physics()
+                    # pick up changes to the physics state, apply
+                    # perturbations, update options from the GUI
+                    viewer.sync()
+
+                # Keep simulation time in step with the wall clock.
+                rate.sleep()
 
     def stop(self) -> None:
-        self._zmq_server_thread.join()
+        """Make ``serve`` return."""
+        self._stop_event.set()
 
-    def __del__(self) -> None:
+    def close(self) -> None:
         self.stop()
+        if self._zmq_server_thread.is_alive():
+            self._zmq_server_thread.terminate()
+        else:
+            self._zmq_server.close()
+        for renderer in self._renderers.values():
+            renderer.close()
+        self._renderers.clear()
+
+
+class BatchedMujocoRobotServer:
+    """``num_envs`` copies of one simulated arm, stepped together.
+
+    All environments share one ``MjModel`` and each has its own ``MjData``.
+    Joint commands and observations are stacked arrays with the environment
+    as the first axis, so one ZMQ request steps every environment; the
+    server is a ``Robot`` whose joint state has shape (num_envs, num_dofs)
+    and can be used with ``ZMQClientRobot`` unchanged.
+
+    The physics advances only with commands, by ``n_substeps`` steps, like
+    ``MujocoRobotServer`` in lock step. The environments are split between
+    ``num_threads`` workers; ``mj_step`` releases the GIL, so they step in
+    parallel.
+    """
+
+    def __init__(
+        self,
+        xml_path: str,
+        gripper_xml_path: Optional[str] = None,
+        num_envs: int = 8,
+        n_substeps: int = 1,
+        num_threads: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 5556,
+    ):
+        """
+        Args:
+            xml_path: MJCF of the arm.
+            gripper_xml_path: MJCF of a gripper to attach to the arm.
+            num_envs: Number of environments.
+            n_substeps: Physics steps per command.
+            num_threads: Worker threads, defaults to the number of CPUs (at
+                most ``num_envs``).
+            host: Host the ZMQ server binds to.
+            port: Port the ZMQ server binds to.
+        """
+        if n_substeps < 1:
+            raise ValueError(f"n_substeps must be at least 1, got {n_substeps}")
+        self._has_gripper = gripper_xml_path is not None
+        self._model = compile_scene(xml_path, gripper_xml_path)
+        self._datas = [mujoco.MjData(self._model) for _ in range(num_envs)]
+        self._num_envs = num_envs
+        self._num_joints = self._model.nu
+        self._n_substeps = n_substeps
+        self._ee_site_id = mujoco.mj_name2id(
+            self._model, mujoco.mjtObj.mjOBJ_SITE, "attachment_site"
+        )
+
+        if num_threads is None:
+            num_threads = os.cpu_count() or 1
+        num_threads = max(1, min(num_threads, num_envs))
+        self._chunks: List[range] = [
+            range(chunk[0], chunk[-1] + 1)
+            for chunk in np.array_split(np.arange(num_envs), num_threads)
+            if len(chunk)
+        ]
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=num_threads, thread_name_prefix="sim"
+        )
+
+        # stacked state, rows are filled by the workers
+        self._joint_cmd = np.zeros((num_envs, self._num_joints))
+        self._qpos = np.zeros((num_envs, self._num_joints))
+        self._qvel = np.zeros((num_envs, self._num_joints))
+        self._ee_pos = np.zeros((num_envs, 3))
+        self._ee_mat = np.tile(np.eye(3).ravel(), (num_envs, 1))
+        self._time = np.zeros(num_envs)
+        self._run_chunks(self._read_state)
+
+        self._zmq_server = ZMQRobotServer(robot=self, host=host, port=port)
+
+    @property
+    def num_envs(self) -> int:
+        return self._num_envs
+
+    @property
+    def sim_time(self) -> np.ndarray:
+        return self._time.copy()
+
+    def num_dofs(self) -> int:
+        return self._num_joints
+
+    def reset(self, qpos: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Reset every environment, optionally to joint positions.
+
+        Args:
+            qpos: Joint positions of shape (num_envs, num_dofs), or (num_dofs,)
+                for all environments.
+        """
+        self._joint_cmd[:] = 0
+        if qpos is not None:
+            qpos = np.broadcast_to(qpos, (self._num_envs, self._num_joints))
+            self._joint_cmd[:] = qpos
+
+        def reset_chunk(envs: range) -> None:
+            for i in envs:
+                data = self._datas[i]
+                mujoco.mj_resetData(self._model, data)
+                if qpos is not None:
+                    data.qpos[: self._num_joints] = qpos[i]
+                mujoco.mj_forward(self._model, data)
+            self._read_state(envs)
+
+        self._run_chunks(reset_chunk)
+        return self.get_observations()
+
+    def get_joint_state(self) -> np.ndarray:
+        return self._qpos.copy()
+
+    def command_joint_state(self, joint_state: np.ndarray) -> None:
+        """Step every environment towards its row of ``joint_state``."""
+        joint_state = np.asarray(joint_state, dtype=np.float64)
+        assert joint_state.shape == (self._num_envs, self._num_joints), (
+            f"Expected joint states of shape {(self._num_envs, self._num_joints)}, "
+            f"got {joint_state.shape}."
+        )
+        self._joint_cmd[:] = joint_state
+        if self._has_gripper:
+            self._joint_cmd[:, -1] *= 255
+        self._run_chunks(self._step_chunk)
+
+    def step(self, joint_state: np.ndarray) -> Dict[str, np.ndarray]:
+        self.command_joint_state(joint_state)
+        return self.get_observations()
+
+    def get_observations(self) -> Dict[str, np.ndarray]:
+        if self._ee_site_id >= 0:
+            ee_quat = mat_to_quat(self._ee_mat)
+        else:
+            ee_quat = np.tile([1.0, 0.0, 0.0, 0.0], (self._num_envs, 1))
+        return {
+            "joint_positions": self._qpos.copy(),
+            "joint_velocities": self._qvel.copy(),
+            "ee_pos_quat": np.concatenate([self._ee_pos, ee_quat], axis=1),
+            "gripper_position": self._qpos[:, -1].copy(),
+        }
+
+    def _run_chunks(self, fn) -> None:
+        if len(self._chunks) == 1:
+            fn(self._chunks[0])
+            return
+        # list() waits for every chunk and raises the first error
+        list(self._executor.map(fn, self._chunks))
+
+    def _step_chunk(self, envs: range) -> None:
+        for i in envs:
+            data = self._datas[i]
+            data.ctrl[:] = self._joint_cmd[i]
+            for _ in range(self._n_substeps):
+                mujoco.mj_step(self._model, data)
+        self._read_state(envs)
+
+    def _read_state(self, envs: range) -> None:
+        for i in envs:
+            data = self._datas[i]
+            self._qpos[i] = data.qpos[: self._num_joints]
+            self._qvel[i] = data.qvel[: self._num_joints]
+            self._time[i] = data.time
+            if self._ee_site_id >= 0:
+                self._ee_pos[i] = data.site_xpos[self._ee_site_id]
+                self._ee_mat[i] = data.site_xmat[self._ee_site_id]
+
+    def serve(self) -> None:
+        """Serve the environments over ZMQ until ``stop`` is called."""
+        self._zmq_server.serve()
+
+    def stop(self) -> None:
+        self._zmq_server.stop()
+
+    def close(self) -> None:
+        self._zmq_server.close()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from gello.robots.gripper_poller import GripperPoller
+
+
+class SlowGripper:
+    """A gripper whose reads take as long as a serial transaction."""
+
+    def __init__(self, read_time: float = 0.005):
+        self.read_time = read_time
+        self.position = 0.0
+        self.moves = []
+        self.fail_reads = False
+        self._busy = threading.Lock()
+
+    def get_current_position(self) -> float:
+        # the poller must never talk to the gripper from two threads
+        assert self._busy.acquire(blocking=False)
+        try:
+            time.sleep(self.read_time)
+            if self.fail_reads:
+                raise IOError("no response")
+            return self.position
+        finally:
+            self._busy.release()
+
+    def move(self, position: float) -> None:
+        assert self._busy.acquire(blocking=False)
+        self.moves.append(position)
+        self.position = position
+        self._busy.release()
+
+
+def test_position_is_cached():
+    gripper = SlowGripper()
+    poller = GripperPoller(gripper, poll_rate=100.0)
+    try:
+        assert poller.position == 0.0
+        start = time.perf_counter()
+        for _ in range(100):
+            poller.position
+        # reading the cache never waits for the 5 ms serial read
+        assert time.perf_counter() - start < 0.005
+    finally:
+        poller.close()
+
+
+def test_moves_are_sent_and_read_back():
+    gripper = SlowGripper()
+    poller = GripperPoller(gripper, poll_rate=200.0)
+    try:
+        poller.latest()
+        poller.move(0.7)
+        deadline = time.monotonic() + 1.0
+        while poller.position != 0.7 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert gripper.moves == [0.7]
+        assert poller.position == 0.7
+    finally:
+        poller.close()
+
+
+def test_full_queue_keeps_newest_move():
+    gripper = SlowGripper()
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_move(position):
+        started.set()
+        release.wait()
+        gripper.moves.append(position)
+
+    gripper.move = blocking_move
+    poller = GripperPoller(gripper, poll_rate=100.0, queue_size=1)
+    try:
+        poller.move(0.1)
+        assert started.wait(1.0)
+        # the poller is stuck in the first move, these wait in the queue
+        for position in [0.2, 0.3, 0.4]:
+            poller.move(position)
+        release.set()
+        deadline = time.monotonic() + 1.0
+        while len(gripper.moves) < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+    finally:
+        release.set()
+        poller.close()
+    assert gripper.moves == [0.1, 0.4]
+    assert poller.stats()["dropped_moves"] == 2
+
+
+def test_failed_reads_keep_last_value_and_report_staleness():
+    gripper = SlowGripper(read_time=0.001)
+    gripper.position = 0.3
+    poller = GripperPoller(gripper, poll_rate=200.0)
+    try:
+        poller.latest()
+        gripper.fail_reads = True
+        time.sleep(0.05)
+        stats = poller.stats()
+        assert poller.position == 0.3
+        assert stats["read_errors"] > 0
+        assert stats["staleness_ms"] >= 40
+        assert stats["read_p50_ms"] >= 1
+        assert "staleness" in poller.format_stats()
+    finally:
+        poller.close()
+
+
+def test_no_read_times_out():
+    gripper = SlowGripper()
+    gripper.fail_reads = True
+    poller = GripperPoller(gripper, poll_rate=100.0)
+    try:
+        with pytest.raises(RuntimeError):
+            poller.latest(timeout=0.05)
+    finally:
+        poller.close()
+
+
+def test_targets_are_coalesced_deadbanded_and_rate_limited():
+    gripper = SlowGripper(read_time=0.001)
+    poller = GripperPoller(
+        gripper, poll_rate=100.0, deadband=0.05, max_command_rate=20.0
+    )
+    try:
+        poller.latest()
+        start = time.monotonic()
+        # a 100 Hz teleop stream ramping the gripper for 0.3 s
+        for i in range(30):
+            poller.set_target(i / 30)
+            time.sleep(0.01)
+        time.sleep(0.1)
+        elapsed = time.monotonic() - start
+    finally:
+        poller.close()
+    # at most one move per 50 ms, and the newest setpoint arrives
+    assert 3 <= len(gripper.moves) <= elapsed * 20 + 1
+    assert gripper.moves[-1] == 29 / 30
+    assert poller.stats()["coalesced_targets"] > 0
+
+    poller = GripperPoller(gripper, poll_rate=100.0, deadband=0.05)
+    try:
+        gripper.moves.clear()
+        poller.set_target(0.5)
+        time.sleep(0.1)
+        poller.set_target(0.52)
+        time.sleep(0.1)
+    finally:
+        poller.close()
+    assert gripper.moves == [0.5]
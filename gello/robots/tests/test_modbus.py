@@ -0,0 +1,101 @@
+import struct
+
+import pytest
+import serial
+
+from gello.robots.chingtek_gripper import chingtekGripper
+from gello.robots.dh_gripper import dh_gripper
+from gello.robots.modbus import (
+    FakeModbusDevice,
+    ModbusError,
+    ModbusRTU,
+    crc16,
+    read_registers_frame,
+    write_registers_frame,
+)
+
+
+def bitwise_crc16(data: bytes) -> int:
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+@pytest.fixture
+def device():
+    device = FakeModbusDevice()
+    yield device
+    device.close()
+
+
+def test_crc16_matches_bitwise_crc():
+    # example frame from the Modbus spec, CRC 0x0A84 is sent as 84 0A
+    assert read_registers_frame(1, 0, 1) == bytes.fromhex("010300000001840a")
+    for data in [b"", b"\x01", bytes(range(256)), b"\xff" * 17]:
+        assert crc16(data) == bitwise_crc16(data)
+
+
+def test_write_registers_frame_layout():
+    frame = write_registers_frame(1, 0x0102, (0, 9000, 100))
+    assert frame[:7] == bytes.fromhex("011001020003") + b"\x06"
+    assert struct.unpack(">3H", frame[7:13]) == (0, 9000, 100)
+    assert crc16(frame) == 0
+
+
+def test_read_and_write_registers(device):
+    device.registers.update({0x0609: 1, 0x060A: 2})
+    with serial.Serial(device.port, timeout=0.5) as port:
+        modbus = ModbusRTU(port)
+        assert modbus.read_registers(0x0609, 2) == [1, 2]
+        modbus.write_registers(0x0102, [3, 4, 5])
+        modbus.write_register(0x0108, 1)
+    written = [device.registers[a] for a in (0x0102, 0x0103, 0x0104, 0x0108)]
+    assert written == [3, 4, 5, 1]
+    assert device.num_requests == 3
+
+
+def test_timeout_raises(device):
+    with serial.Serial(device.port, timeout=0.05) as port:
+        modbus = ModbusRTU(port, slave=2, retries=1)
+        with pytest.raises(ModbusError):
+            modbus.read_registers(0, 1)
+
+
+def test_chingtek_move_writes_motion_then_trigger(device):
+    device.registers.update({0x0106: 7, 0x0107: 8, 0x0609: 0, 0x060A: 250})
+    gripper = chingtekGripper(PORT=device.port)
+    num_requests = device.num_requests
+    gripper.move(0.5)
+    assert device.num_requests == num_requests + 2
+    registers = [device.registers[0x0102 + i] for i in range(7)]
+    # position 4500, speed, force, the untouched registers and the trigger
+    assert registers == [0, 4500, 100, 100, 7, 8, 1]
+    # 0x0106 and 0x0107 are never written
+    assert all(
+        struct.unpack(">H", request[2:4])[0] in (0x0102, 0x0108)
+        for request in device.requests[num_requests:]
+    )
+
+    assert gripper.get_current_position() == 0.75
+    assert device.num_requests == num_requests + 3
+
+
+def test_dh_gripper_over_modbus(device):
+    # initialized and holding
+    device.registers.update({0x0200: 1, 0x0201: 2, 0x0202: 400})
+    gripper = dh_gripper(port=device.port)
+    assert device.registers[0x0100] == 0xA5
+    assert device.registers[0x0101] == 10
+    num_requests = device.num_requests
+    assert gripper.get_current_position() == 0.4
+    assert gripper.g_state == 2
+    # position, grip state and init state in one read
+    assert device.num_requests == num_requests + 1
+    gripper.move(0.7, speed=50)
+    assert device.registers[0x0103] == 700
+    assert device.registers[0x0104] == 50
+    assert device.num_requests == num_requests + 2
+    assert gripper.get_status() == (1, 2, 0.4)
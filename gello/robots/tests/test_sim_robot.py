@@ -0,0 +1,200 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from gello.robots.sim_robot import BatchedMujocoRobotServer, MujocoRobotServer
+from gello.zmq_core.robot_node import ZMQAsyncClientRobot, ZMQClientRobot
+
+ARM_XML = """
+<mujoco model="two_link">
+  <option timestep="0.002"/>
+  <worldbody>
+    <body name="link1">
+      <joint name="joint1" type="hinge" axis="0 0 1" damping="5"/>
+      <geom type="capsule" fromto="0 0 0 0.3 0 0" size="0.03"/>
+      <body name="link2" pos="0.3 0 0">
+        <joint name="joint2" type="hinge" axis="0 0 1" damping="5"/>
+        <geom type="capsule" fromto="0 0 0 0.3 0 0" size="0.03"/>
+        <site name="attachment_site" pos="0.3 0 0"/>
+      </body>
+    </body>
+  </worldbody>
+  <actuator>
+    <position joint="joint1" kp="50"/>
+    <position joint="joint2" kp="50"/>
+  </actuator>
+</mujoco>
+"""
+
+
+CAMERA = '<camera name="front" pos="0.3 -1 0.5" xyaxes="1 0 0 0 0.5 1"/>'
+
+
+def _require_gl():
+    import mujoco
+
+    try:
+        mujoco.Renderer(mujoco.MjModel.from_xml_string(ARM_XML), 32, 32).close()
+    except Exception as e:
+        pytest.skip(f"No OpenGL backend for offscreen rendering: {e}")
+
+
+@pytest.fixture
+def arm_xml(tmp_path, monkeypatch):
+    path = tmp_path / "arm.xml"
+    path.write_text(ARM_XML)
+    # nothing may be written to the working directory
+    monkeypatch.chdir(tmp_path)
+    return str(path)
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_headless_lock_step(arm_xml, tmp_path):
+    server = MujocoRobotServer(
+        arm_xml, port=16110, headless=True, lock_step=True, n_substeps=5
+    )
+    thread = _serve(server)
+    client = ZMQClientRobot(port=16110)
+    try:
+        assert client.num_dofs() == 2
+        for _ in range(10):
+            obs = client.step(np.array([0.5, -0.5]))
+        # the physics only advances with the commands
+        assert server.sim_time == pytest.approx(10 * 5 * 0.002)
+        time.sleep(0.05)
+        assert server.sim_time == pytest.approx(10 * 5 * 0.002)
+        assert obs["joint_positions"].shape == (2,)
+        assert obs["ee_pos_quat"].shape == (7,)
+        assert obs["joint_positions"][0] > 0
+    finally:
+        client.close()
+        server.stop()
+        thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert list(tmp_path.iterdir()) == [tmp_path / "arm.xml"]
+
+
+def test_headless_faster_than_real_time(arm_xml):
+    server = MujocoRobotServer(
+        arm_xml, port=16111, headless=True, n_substeps=10, real_time_factor=None
+    )
+    thread = _serve(server)
+    client = ZMQClientRobot(port=16111)
+    try:
+        start = time.perf_counter()
+        client.command_joint_state(np.array([0.2, 0.2]))
+        time.sleep(0.2)
+        obs = client.get_observations()
+        elapsed = time.perf_counter() - start
+        assert server.sim_time > 2 * elapsed
+        assert obs["joint_positions"] == pytest.approx([0.2, 0.2], abs=0.05)
+    finally:
+        client.close()
+        server.stop()
+        thread.join(timeout=5)
+
+
+def test_camera_rendered_on_serving_thread(tmp_path, monkeypatch):
+    _require_gl()
+    path = tmp_path / "arm.xml"
+    path.write_text(ARM_XML.replace("<worldbody>", "<worldbody>" + CAMERA))
+    monkeypatch.chdir(tmp_path)
+    server = MujocoRobotServer(
+        str(path),
+        port=16116,
+        headless=True,
+        lock_step=True,
+        cameras=["two_link/front"],
+        camera_size=(48, 64),
+    )
+    thread = _serve(server)
+    # times out instead of hanging when rendering fails on the server
+    client = ZMQAsyncClientRobot(port=16116, timeout_ms=5000)
+    try:
+        # rendered on the ZMQ thread, not the one that built the server
+        obs = client.step(np.array([0.5, -0.5]))
+        assert obs["two_link/front_rgb"].shape == (48, 64, 3)
+        assert obs["two_link/front_rgb"].dtype == np.uint8
+        assert obs["two_link/front_rgb"].any()
+        # and on another thread with its own renderer
+        assert server.get_observations()["two_link/front_rgb"].shape == (48, 64, 3)
+    finally:
+        client.close()
+        server.stop()
+        thread.join(timeout=5)
+        server.close()
+
+
+def test_invalid_substeps(arm_xml):
+    with pytest.raises(ValueError):
+        MujocoRobotServer(arm_xml, port=16112, headless=True, n_substeps=0)
+
+
+def test_batched_server_steps_all_envs(arm_xml):
+    server = BatchedMujocoRobotServer(
+        arm_xml, num_envs=5, n_substeps=20, num_threads=2, port=16113
+    )
+    thread = _serve(server)
+    client = ZMQClientRobot(port=16113)
+    try:
+        targets = np.linspace(-0.5, 0.5, 10).reshape(5, 2)
+        for _ in range(25):
+            obs = client.step(targets)
+        assert obs["joint_positions"].shape == (5, 2)
+        assert obs["ee_pos_quat"].shape == (5, 7)
+        assert obs["gripper_position"].shape == (5,)
+        assert obs["joint_positions"] == pytest.approx(targets, abs=0.05)
+        assert server.sim_time == pytest.approx(np.full(5, 25 * 20 * 0.002))
+    finally:
+        client.close()
+        server.stop()
+        thread.join(timeout=5)
+        server.close()
+
+
+@pytest.mark.parametrize("mode", ["binary", "pickle"])
+def test_batched_server_reset_over_zmq(arm_xml, mode):
+    server = BatchedMujocoRobotServer(arm_xml, num_envs=3, num_threads=1, port=16117)
+    thread = _serve(server)
+    client = ZMQClientRobot(port=16117, protocol=mode)
+    try:
+        for _ in range(10):
+            client.step(np.full((3, 2), 0.5))
+        qpos = np.array([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]])
+        obs = client.reset(qpos)
+        assert obs["joint_positions"] == pytest.approx(qpos)
+        assert server.sim_time == pytest.approx(np.zeros(3))
+        obs = client.reset()
+        assert obs["joint_positions"] == pytest.approx(np.zeros((3, 2)))
+    finally:
+        client.close()
+        server.stop()
+        thread.join(timeout=5)
+        server.close()
+
+
+def test_batched_server_matches_single_env(arm_xml):
+    server = BatchedMujocoRobotServer(arm_xml, num_envs=3, num_threads=3, port=16114)
+    single = MujocoRobotServer(arm_xml, port=16115, headless=True, lock_step=True)
+    try:
+        server.reset(qpos=np.array([0.1, 0.2]))
+        command = np.array([0.3, -0.3])
+        for _ in range(50):
+            obs = server.step(np.tile(command, (3, 1)))
+        # the single env starts from the same joint positions
+        single._data.qpos[:] = [0.1, 0.2]
+        for _ in range(50):
+            single.command_joint_state(command)
+        expected = single.get_observations()
+        for key in ("joint_positions", "ee_pos_quat"):
+            assert np.allclose(obs[key], expected[key])
+    finally:
+        server.close()
+        single.close()
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from gello.robots.ur import URRobot, limit_step
+
+
+def test_limit_step_caps_the_norm():
+    delta = np.array([0.3, -0.4, 0, 0, 0, 0])
+    step = limit_step(delta, 0.005)
+    assert np.isclose(np.linalg.norm(step), 0.005)
+    assert np.allclose(step / np.linalg.norm(step), delta / 0.5)
+
+
+def test_limit_step_reaches_the_target():
+    setpoint = np.zeros(6)
+    target = np.full(6, 0.01)
+    for _ in range(10):
+        setpoint = setpoint + limit_step(target - setpoint, 0.005)
+    assert np.allclose(setpoint, target)
+
+
+class FailingRTDE:
+    """servoJ raises after a few periods, like on a protective stop."""
+
+    def __init__(self, num_ok: int = 3):
+        self.num_ok = num_ok
+        self.num_servo = 0
+
+    def getActualQ(self):
+        return [0.0] * 6
+
+    def initPeriod(self):
+        return time.monotonic()
+
+    def servoJ(self, *args):
+        self.num_servo += 1
+        if self.num_servo > self.num_ok:
+            raise RuntimeError("RTDE control script is not running")
+
+    def waitPeriod(self, t_start):
+        time.sleep(0.001)
+
+
+def _servo_only_robot(rtde):
+    # only the parts of URRobot that the servo thread uses
+    robot = URRobot.__new__(URRobot)
+    robot.robot = robot.r_inter = rtde
+    robot.max_delta = 0.005
+    robot._control_period = 0.002
+    robot.target_command_lock = threading.Lock()
+    robot.target_command = None
+    robot._control_lock = threading.Lock()
+    robot._servo_error = None
+    robot._use_gripper = False
+    robot.running = True
+    robot.command_thread = threading.Thread(target=robot._robot_thread, daemon=True)
+    robot.command_thread.start()
+    return robot
+
+
+def test_servo_thread_error_reaches_callers():
+    rtde = FailingRTDE()
+    robot = _servo_only_robot(rtde)
+    robot.command_joint_state(np.full(6, 0.1))
+    robot.command_thread.join(timeout=2)
+    assert not robot.command_thread.is_alive()
+    assert not robot.running
+    with pytest.raises(RuntimeError, match="servo thread stopped"):
+        robot.command_joint_state(np.zeros(6))
+    assert rtde.num_servo == rtde.num_ok + 1
+
+
+def test_servo_thread_idles_without_target():
+    rtde = FailingRTDE(num_ok=10**6)
+    robot = _servo_only_robot(rtde)
+    time.sleep(0.05)
+    assert rtde.num_servo == 0
+    robot.command_joint_state(np.full(6, 0.1))
+    time.sleep(0.05)
+    assert rtde.num_servo > 0
+    robot.running = False
+    robot.command_thread.join(timeout=2)
@@ -1,14 +1,64 @@
-from typing import Dict
+from typing import Dict, Optional
 import sys
 sys.path.append("/home/ju/Workspace/gello_software")
+import threading
 import numpy as np
 from gello.robots.robot import Robot
 import time
 
+# servoJ parameters, velocity and acceleration are not used by servoJ
+SERVO_VELOCITY = 0.5
+SERVO_ACCELERATION = 0.5
+SERVO_LOOKAHEAD_TIME = 0.2
+SERVO_GAIN = 100
+
+
+def limit_step(delta: np.ndarray, max_delta: float) -> np.ndarray:
+    """Scale ``delta`` down so that its norm is at most ``max_delta``."""
+    norm = np.linalg.norm(delta)
+    if norm > max_delta:
+        return delta / norm * max_delta
+    return delta
+
+
 class URRobot(Robot):
     """A class representing a UR robot."""
 
-    def __init__(self, robot_ip: str = "192.168.1.10", no_gripper: bool = False, gripper_type: str = "chingtek"):
+    def __init__(
+        self,
+        robot_ip: str = "192.168.1.10",
+        no_gripper: bool = False,
+        gripper_type: str = "chingtek",
+        gripper_poll_rate: float = 50.0,
+        continuous_gripper: bool = False,
+        gripper_open_position: float = 0.7,
+        gripper_deadband: float = 0.01,
+        gripper_command_rate: float = 20.0,
+        control_frequency: float = 500.0,
+        max_delta: float = 0.005,
+        ee_model: Optional[str] = "ur5e",
+    ):
+        """
+        Args:
+            control_frequency: Rate of the servoJ thread, 500 Hz is the
+                native RTDE rate of e-Series controllers.
+            max_delta: Largest step of the servoJ setpoint per control tick,
+                in joint space norm (rad). 0.005 at 500 Hz is 2.5 rad/s.
+            ee_model: Arm model used for the end effector pose in the
+                observations, see ``gello.dm_control_tasks.arms.kinematics``.
+                None reports a zero pose.
+            gripper_poll_rate: Rate in Hz at which the gripper position is
+                read in the background. Observations use the latest read.
+            continuous_gripper: Follow the commanded gripper value
+                proportionally instead of toggling between open and closed
+                at 0.5.
+            gripper_open_position: Gripper position sent for a fully open
+                command.
+            gripper_deadband: Continuous setpoints closer than this to the
+                last sent one are not sent.
+            gripper_command_rate: Maximum continuous gripper moves per second,
+                bounded by what the serial bus sustains next to the reads.
+        """
         import rtde_control
         import rtde_receive
 
@@ -32,7 +82,19 @@ class URRobot(Robot):
             else :
                 print("no suitable gripper")
                 no_gripper = True
-
+        if not no_gripper:
+            from gello.robots.gripper_poller import GripperPoller
+
+            # all gripper I/O happens on the poller thread, the serial
+            # transactions take too long for the control loop
+            self.gripper_poller = GripperPoller(
+                self.gripper,
+                gripper_poll_rate,
+                deadband=gripper_deadband,
+                max_command_rate=gripper_command_rate,
+            )
+        self._continuous_gripper = continuous_gripper
+        self._gripper_open_position = gripper_open_position
 
         # self.movej([0.,-1.57,1.57,-3.14,-1.57,1.57])
 
@@ -44,6 +106,28 @@ class URRobot(Robot):
         self._use_gripper = not no_gripper
         # self.gripper_lock = threading.Lock()
 
+        # command_joint_state only posts the target, a dedicated thread runs
+        # servoJ at the controller rate and interpolates toward it, so the
+        # servo rate does not depend on how often the client sends commands
+        self.max_delta = max_delta
+        self._control_period = 1.0 / control_frequency
+        self.target_command_lock = threading.Lock()
+        self.target_command: Optional[np.ndarray] = None
+        # serializes the RTDE control interface between the servo thread and
+        # the blocking calls (moveJ, teach mode)
+        self._control_lock = threading.Lock()
+        # set when the servo thread died, raised to the callers
+        self._servo_error: Optional[Exception] = None
+        self.running = True
+        self.command_thread = threading.Thread(target=self._robot_thread, daemon=True)
+        self.command_thread.start()
+
+        self._fk = None
+        if ee_model is not None:
+            from gello.dm_control_tasks.arms.kinematics import ForwardKinematics
+
+            self._fk = ForwardKinematics.try_for_arm(ee_model)
+
     def num_dofs(self) -> int:
         """Get the number of joints of the robot.
 
@@ -55,11 +139,7 @@ class URRobot(Robot):
         return 6
 
     def _get_gripper_pos(self) -> float:
-        
-        time.sleep(0.01)
-        # with self.gripper_lock:
-        gripper_pos = self.gripper.get_current_position()
-        return gripper_pos
+        return self.gripper_poller.position
 
     def get_joint_state(self) -> np.ndarray:
         """Get the current state of the leader robot.
@@ -75,25 +155,22 @@ class URRobot(Robot):
             pos = robot_joints
         return pos
 
+    def get_joint_velocities(self) -> np.ndarray:
+        """Measured joint velocities, 0 for the gripper."""
+        velocities = np.array(self.r_inter.getActualQd())
+        if self._use_gripper:
+            velocities = np.append(velocities, 0.0)
+        return velocities
+
     def command_joint_state(self, joint_state: np.ndarray) -> None:
         """Command the leader robot to a given state.
 
         Args:
             joint_state (np.ndarray): The state to command the leader robot to.
         """
-        velocity = 0.5
-        acceleration = 0.5
-        dt = 1.0 / 500  # 2ms
-        lookahead_time = 0.2
-        gain = 100
-
-        robot_joints = joint_state[:6]
-        t_start = self.robot.initPeriod()
-        self.robot.servoJ(
-            robot_joints, velocity, acceleration, dt, lookahead_time, gain
-        )
-
-        self.robot.waitPeriod(t_start)
+        self._check_servo()
+        with self.target_command_lock:
+            self.target_command = np.array(joint_state[:6], dtype=float)
 
         if self._use_gripper:
             # 定义夹爪控制函数
@@ -108,12 +185,18 @@ class URRobot(Robot):
             # gripper_thread = threading.Thread(target=handle_gripper)
             # gripper_thread.start()
 
+            if self._continuous_gripper:
+                # only hands the setpoint to the poller thread, which
+                # coalesces, deadbands and rate limits the moves
+                target = float(np.clip(joint_state[-1], 0.0, 1.0))
+                self.gripper_poller.set_target(target * self._gripper_open_position)
+                return
             if joint_state[-1]< 0.5 and self.gripper.isOpen:
-                self.gripper.move(0)
+                self.gripper_poller.move(0)
                 self.gripper.isOpen = False
                 print("move 0")
             if joint_state[-1]> 0.5 and not self.gripper.isOpen:
-                self.gripper.move(0.7)
+                self.gripper_poller.move(self._gripper_open_position)
                 self.gripper.isOpen = True
 
                 print("move 700")
@@ -123,12 +206,80 @@ class URRobot(Robot):
             # print(gripper_pos)
             # self.gripper.move(int(gripper_pos), 100, 20)
 
+    def gripper_stats(self) -> Dict[str, float]:
+        """Read latency and staleness of the cached gripper position."""
+        if not self._use_gripper:
+            return {}
+        return self.gripper_poller.stats()
+
+    def close(self) -> None:
+        self.running = False
+        self.command_thread.join()
+        with self._control_lock:
+            self._stop_servo()
+        if self._use_gripper:
+            print(self.gripper_poller.format_stats())
+            self.gripper_poller.close()
+
+    def _check_servo(self) -> None:
+        """Raise the error that stopped the servo thread, if any."""
+        if self._servo_error is not None:
+            raise RuntimeError(
+                f"UR servo thread stopped: {self._servo_error!r}"
+            ) from self._servo_error
+
+    def _robot_thread(self) -> None:
+        try:
+            self._servo_loop()
+        except Exception as e:
+            # e.g. an RTDE disconnect or a protective stop; commands must not
+            # be accepted silently anymore
+            print(f"UR servo thread stopped: {e!r}")
+            self._servo_error = e
+            self.running = False
+
+    def _servo_loop(self) -> None:
+        setpoint = None
+        while self.running:
+            with self._control_lock:
+                # read under the control lock, so that moveJ / teach mode
+                # cannot clear the target between the check and servoJ
+                with self.target_command_lock:
+                    target = self.target_command
+                if target is not None:
+                    if setpoint is None:
+                        setpoint = np.array(self.r_inter.getActualQ())
+                    setpoint = setpoint + limit_step(target - setpoint, self.max_delta)
+                    t_start = self.robot.initPeriod()
+                    self.robot.servoJ(
+                        setpoint,
+                        SERVO_VELOCITY,
+                        SERVO_ACCELERATION,
+                        self._control_period,
+                        SERVO_LOOKAHEAD_TIME,
+                        SERVO_GAIN,
+                    )
+            if target is None:
+                # nothing to follow (yet, or after moveJ / teach mode)
+                setpoint = None
+                time.sleep(self._control_period)
+                continue
+            self.robot.waitPeriod(t_start)
+
+    def _stop_servo(self) -> None:
+        """Stop following the target, the caller holds ``_control_lock``."""
+        with self.target_command_lock:
+            self.target_command = None
+        self.robot.servoStop()
+
     def movej(self,joint_state):
         velocity = 0.5
         acceleration = 0.5
-        self.robot.moveJ(
-            joint_state, velocity, acceleration
-        )
+        with self._control_lock:
+            self._stop_servo()
+            self.robot.moveJ(
+                joint_state, velocity, acceleration
+            )
         time.sleep(2)
 
     def freedrive_enabled(self) -> bool:
@@ -145,20 +296,25 @@ class URRobot(Robot):
         Args:
             enable (bool): True to enable freedrive mode, False to disable it.
         """
-        if enable and not self._free_drive:
-            self._free_drive = True
-            self.robot.teachMode()
-        elif not enable and self._free_drive:
-            self._free_drive = False
-            self.robot.endTeachdriveMode()
+        with self._control_lock:
+            if enable and not self._free_drive:
+                self._free_drive = True
+                self._stop_servo()
+                self.robot.teachMode()
+            elif not enable and self._free_drive:
+                self._free_drive = False
+                self.robot.endTeachMode()
 
     def get_observations(self) -> Dict[str, np.ndarray]:
         joints = self.get_joint_state()
-        pos_quat = np.zeros(7)
+        if self._fk is not None:
+            pos_quat = self._fk.ee_pos_quat(joints[:6])
+        else:
+            pos_quat = np.zeros(7)
         gripper_pos = np.array([joints[-1]])
         return {
             "joint_positions": joints,
-            "joint_velocities": joints,
+            "joint_velocities": self.get_joint_velocities(),
             "ee_pos_quat": pos_quat,
             "gripper_position": gripper_pos,
         }
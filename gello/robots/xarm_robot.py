@@ -7,6 +7,7 @@ import numpy as np
 from pyquaternion import Quaternion
 
 from gello.robots.robot import Robot
+from gello.utils.rate import Rate
 
 
 def _aa_from_quat(quat: np.ndarray) -> np.ndarray:
@@ -99,23 +100,6 @@ class RobotState:
         return self.gripper
 
 
-class Rate:
-    def __init__(self, *, duration):
-        self.duration = duration
-        self.last = time.time()
-
-    def sleep(self, duration=None) -> None:
-        duration = self.duration if duration is None else duration
-        assert duration >= 0
-        now = time.time()
-        passed = now - self.last
-        remaining = duration - passed
-        assert passed >= 0
-        if remaining > 0.0001:
-            time.sleep(remaining)
-        self.last = time.time()
-
-
 class XArmRobot(Robot):
     GRIPPER_OPEN = 800
     GRIPPER_CLOSE = 0
@@ -238,9 +222,7 @@ class XArmRobot(Robot):
         #     time.sleep(0.01)
 
     def _robot_thread(self):
-        rate = Rate(
-            duration=1 / self._control_frequency
-        )  # command and update rate for robot
+        rate = Rate(self._control_frequency)  # command and update rate for robot
         step_times = []
         count = 0
 
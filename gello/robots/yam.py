@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 
 import numpy as np
 
@@ -8,11 +8,17 @@ from gello.robots.robot import Robot
 class YAMRobot(Robot):
     """A class representing a simulated YAM robot."""
 
-    def __init__(self, channel="can0"):
+    def __init__(self, channel="can0", ee_model: Optional[str] = "yam"):
         from i2rt.robots.get_robot import get_yam_robot
 
         self.robot = get_yam_robot(channel=channel)
 
+        self._fk = None
+        if ee_model is not None:
+            from gello.dm_control_tasks.arms.kinematics import ForwardKinematics
+
+            self._fk = ForwardKinematics.try_for_arm(ee_model)
+
         # YAM has 7 joints (6 arm joints + 1 gripper)
         self._joint_names = [
             "joint1",
@@ -56,7 +62,10 @@ class YAMRobot(Robot):
         self.command_joint_pos(joint_state)
 
     def get_observations(self) -> Dict[str, np.ndarray]:
-        ee_pos_quat = np.zeros(7)  # Placeholder for FK
+        if self._fk is not None:
+            ee_pos_quat = self._fk.ee_pos_quat(self._joint_state[:6])
+        else:
+            ee_pos_quat = np.zeros(7)
         return {
             "joint_positions": self._joint_state,
             "joint_velocities": self._joint_velocities,
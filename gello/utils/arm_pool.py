@@ -0,0 +1,112 @@
+"""Running the two arms of a bimanual setup at the same time.
+
+``BimanualRobot`` and ``BimanualAgent`` call into two independent arms every
+tick. Called one after the other, a tick takes the sum of both arms' latencies
+and the right half of an observation is read later than the left half.
+``ArmPool`` keeps two worker threads for the whole session and runs one call
+per arm on them. Both workers wait at a barrier before they start their call,
+so the two halves of an observation are captured together, and a tick takes
+about as long as the slower arm.
+
+Threads are enough here: the per-arm work is mostly serial or socket I/O, which
+releases the GIL.
+"""
+
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Dict, Tuple, TypeVar
+
+import numpy as np
+
+ARMS = ("left", "right")
+
+L = TypeVar("L")
+R = TypeVar("R")
+
+
+class ArmPool:
+    """Runs a left and a right arm call concurrently on two persistent threads.
+
+    ``run`` must only be called from one thread at a time.
+    """
+
+    def __init__(self, barrier_timeout: float = 1.0, num_latency_samples: int = 1000):
+        """
+        Args:
+            barrier_timeout: Seconds a worker waits for the other one to be
+                ready. If it times out the call runs anyway, unsynchronized.
+            num_latency_samples: Size of the window of latencies for ``stats``.
+        """
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="arm"
+        )
+        self._barrier = threading.Barrier(2, timeout=barrier_timeout)
+        # per call: left latency, right latency, wall time of the whole call
+        # and the skew between the starts of the two arms, in seconds
+        self._samples = np.zeros((num_latency_samples, 4), dtype=np.float64)
+        self._num_calls = 0
+        self._num_unsynchronized = 0
+
+    def run(self, left: Callable[[], L], right: Callable[[], R]) -> Tuple[L, R]:
+        """Call ``left`` and ``right`` at the same time and return both results.
+
+        If either call raises, the exception is raised once both have finished.
+        """
+        if self._barrier.broken:
+            # both workers are idle between calls, so this is safe
+            self._barrier.reset()
+        start = time.perf_counter()
+        futures = [self._executor.submit(self._call, fn) for fn in (left, right)]
+        concurrent.futures.wait(futures)
+        (left_result, left_start, left_end), (right_result, right_start, right_end) = (
+            future.result() for future in futures
+        )
+        end = time.perf_counter()
+
+        self._samples[self._num_calls % len(self._samples)] = (
+            left_end - left_start,
+            right_end - right_start,
+            end - start,
+            abs(left_start - right_start),
+        )
+        self._num_calls += 1
+        return left_result, right_result
+
+    def _call(self, fn: Callable) -> Tuple[object, float, float]:
+        try:
+            self._barrier.wait()
+        except threading.BrokenBarrierError:
+            # the other worker is stuck, do not hold this arm back as well
+            self._num_unsynchronized += 1
+        start = time.perf_counter()
+        result = fn()
+        return result, start, time.perf_counter()
+
+    def stats(self) -> Dict[str, float]:
+        """Per-arm and total latency (ms) and start skew (ms) of recent calls."""
+        num_samples = min(self._num_calls, len(self._samples))
+        stats = {"calls": self._num_calls, "unsynchronized": self._num_unsynchronized}
+        if num_samples:
+            samples = self._samples[:num_samples] * 1e3
+            for i, name in enumerate(ARMS + ("total",)):
+                p50, p99 = np.percentile(samples[:, i], [50, 99])
+                stats[f"{name}_p50_ms"] = p50
+                stats[f"{name}_p99_ms"] = p99
+            stats["skew_max_ms"] = samples[:, 3].max()
+        return stats
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        message = f"{stats['calls']} calls ({stats['unsynchronized']} unsynchronized)"
+        if "total_p50_ms" in stats:
+            message += "".join(
+                f", {name} p50 {stats[f'{name}_p50_ms']:.2f} ms "
+                f"p99 {stats[f'{name}_p99_ms']:.2f} ms"
+                for name in ARMS + ("total",)
+            )
+            message += f", start skew max {stats['skew_max_ms']:.3f} ms"
+        return message
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
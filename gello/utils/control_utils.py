@@ -9,6 +9,7 @@ import numpy as np
 
 from gello.agents.agent import Agent
 from gello.env import RobotEnv
+from gello.utils.tracing import LoopTracer
 
 DEFAULT_MAX_JOINT_DELTA = 1.0
 
@@ -77,6 +78,9 @@ class SaveInterface:
         data_dir: str = "data",
         agent_name: str = "Agent",
         expand_user: bool = False,
+        file_format: str = "hdf5",
+        queue_size: int = 256,
+        backpressure: str = "block",
     ):
         """Initialize save interface.
 
@@ -84,9 +88,19 @@ class SaveInterface:
             data_dir: Base directory for saving data
             agent_name: Name of agent (used for subdirectory)
             expand_user: Whether to expand ~ in data_dir path
+            file_format: "hdf5" appends each episode to one file, "pkl" writes
+                one pickle file per frame
+            queue_size: Frames buffered for the background writer, 0 writes
+                them on the control thread
+            backpressure: "block" waits for the writer when the queue is full,
+                "drop" skips the frame
         """
         from gello.data_utils.keyboard_interface import KBReset
+        from gello.data_utils.recorder import EpisodeRecorder
 
+        self.recorder = EpisodeRecorder(
+            file_format=file_format, queue_size=queue_size, backpressure=backpressure
+        )
         self.kb_interface = KBReset()
         self.data_dir = Path(data_dir).expanduser() if expand_user else Path(data_dir)
         self.agent_name = agent_name
@@ -106,24 +120,24 @@ class SaveInterface:
         Returns:
             Optional[str]: "quit" if user wants to exit, None otherwise
         """
-        from gello.data_utils.format_obs import save_frame
-
         dt = datetime.datetime.now()
         state = self.kb_interface.update()
 
         if state == "start":
+            self.close()
             dt_time = datetime.datetime.now()
             self.save_path = (
                 self.data_dir / self.agent_name / dt_time.strftime("%m%d_%H%M%S")
             )
-            self.save_path.mkdir(parents=True, exist_ok=True)
+            self.recorder.start_episode(self.save_path)
             print(f"Saving to {self.save_path}")
         elif state == "save":
             if self.save_path is not None:
-                save_frame(self.save_path, dt, obs, action)
+                self.recorder.record(dt, obs, action)
         elif state == "normal":
-            self.save_path = None
+            self.close()
         elif state == "quit":
+            self.close()
             print("\nExiting.")
             return "quit"
         else:
@@ -131,6 +145,37 @@ class SaveInterface:
 
         return None
 
+    def close(self) -> None:
+        """Finish the episode being recorded, if any.
+
+        The episode file is closed by the writer thread once the queued frames
+        are written, this does not wait for it.
+        """
+        if self.save_path is None:
+            return
+        self.recorder.end_episode()
+        self.save_path = None
+        self.print_stats()
+
+    def shutdown(self) -> None:
+        """Finish the episode and wait until every queued frame is written."""
+        self.close()
+        self.recorder.close()
+
+    def print_stats(self) -> None:
+        stats = self.recorder.stats()
+        message = (
+            f"\nRecorder: {stats['enqueued']} frames, {stats['dropped']} dropped, "
+            f"max queue size {stats['max_queue_size']}"
+        )
+        if "enqueue_p50_us" in stats:
+            message += (
+                f", enqueue p50 {stats['enqueue_p50_us']:.1f} us "
+                f"p99 {stats['enqueue_p99_us']:.1f} us "
+                f"max {stats['enqueue_max_us']:.1f} us"
+            )
+        print(message)
+
 
 def run_control_loop(
     env: RobotEnv,
@@ -138,6 +183,9 @@ def run_control_loop(
     save_interface: Optional[SaveInterface] = None,
     print_timing: bool = True,
     use_colors: bool = False,
+    tracer: Optional[LoopTracer] = None,
+    trace_path: Optional[str] = None,
+    trace_summary_interval: float = 5.0,
 ) -> None:
     """Run the main control loop.
 
@@ -147,6 +195,11 @@ def run_control_loop(
         save_interface: Optional save interface for data collection
         print_timing: Whether to print timing information
         use_colors: Whether to use colored terminal output
+        tracer: Optional tracer that records the duration of every phase of
+            a tick, also used by the environment
+        trace_path: Where to export the trace on exit, .csv for CSV and
+            Chrome trace JSON otherwise
+        trace_summary_interval: Seconds between phase timing summaries
     """
     # Check if we can use colors
     colors_available = False
@@ -165,25 +218,52 @@ def run_control_loop(
 
     start_time = time.time()
     obs = env.get_obs()
-
-    while True:
-        if print_timing:
-            num = time.time() - start_time
-            message = f"\rTime passed: {round(num, 2)}          "
-
-            if colors_available:
-                print(
-                    colored(message, color="white", attrs=["bold"]), end="", flush=True
-                )
-            else:
-                print(message, end="", flush=True)
-
-        action = agent.act(obs)
-
-        # Handle save interface
+    env.tracer = tracer
+    last_summary = start_time
+
+    try:
+        while True:
+            if tracer is not None:
+                tracer.begin_tick()
+                if time.time() - last_summary > trace_summary_interval:
+                    last_summary = time.time()
+                    print(f"\n{tracer.format_summary()}")
+
+            if print_timing:
+                num = time.time() - start_time
+                message = f"\rTime passed: {round(num, 2)}          "
+
+                if colors_available:
+                    print(
+                        colored(message, color="white", attrs=["bold"]),
+                        end="",
+                        flush=True,
+                    )
+                else:
+                    print(message, end="", flush=True)
+            if tracer is not None:
+                tracer.lap("print")
+
+            action = agent.act(obs)
+            if tracer is not None:
+                tracer.lap("agent.act")
+
+            # Handle save interface
+            if save_interface is not None:
+                result = save_interface.update(obs, action)
+                if tracer is not None:
+                    tracer.lap("save_interface.update")
+                if result == "quit":
+                    break
+
+            obs = env.step(action)
+    finally:
+        print(f"\nControl loop: {env.rate.format_stats()}")
+        if hasattr(agent, "format_stats"):
+            print(agent.format_stats())
+        if tracer is not None:
+            print(tracer.format_summary())
+            if trace_path is not None:
+                tracer.export(Path(trace_path).expanduser())
         if save_interface is not None:
-            result = save_interface.update(obs, action)
-            if result == "quit":
-                break
-
-        obs = env.step(action)
+            save_interface.shutdown()
@@ -0,0 +1,161 @@
+"""Fixed-rate loop scheduling with low jitter.
+
+``Rate`` keeps an absolute schedule on the monotonic ``perf_counter_ns`` clock,
+so a late tick is made up on the next one instead of pushing every later tick
+back. Waiting is split in two: ``time.sleep`` for most of the remaining time,
+then a short spin for the last ``spin_threshold`` seconds, because the OS can
+wake a sleeping thread up to a few hundred microseconds late.
+"""
+
+import os
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def configure_realtime(
+    cpu: Optional[int] = None, priority: Optional[int] = None
+) -> None:
+    """Pin the calling thread to a CPU and/or give it a real-time priority.
+
+    Both need Linux, and a real-time priority needs CAP_SYS_NICE (or an
+    rtprio limit). Failures only print a warning, the loop still runs.
+
+    Args:
+        cpu: Index of the CPU to run on.
+        priority: SCHED_FIFO priority, 1 (lowest) to 99.
+    """
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (AttributeError, OSError) as e:
+            print(f"Warning: could not pin loop to CPU {cpu}: {e}")
+    if priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except (AttributeError, OSError) as e:
+            print(f"Warning: could not set real-time priority {priority}: {e}")
+
+
+class Rate:
+    """Sleeps so that a loop calling ``sleep`` once per tick runs at ``rate`` Hz.
+
+    If a tick overruns by less than a period the next deadline is kept, so the
+    loop catches up. If it overruns by one or more full periods those deadlines
+    are skipped rather than run back to back.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        spin_threshold: float = 0.0005,
+        cpu: Optional[int] = None,
+        priority: Optional[int] = None,
+        num_period_samples: int = 1000,
+    ):
+        """
+        Args:
+            rate: Loop frequency in Hz.
+            spin_threshold: Seconds before the deadline at which to stop
+                sleeping and spin. 0 only sleeps.
+            cpu: Pin the thread that calls ``sleep`` to this CPU.
+            priority: Give the thread that calls ``sleep`` this SCHED_FIFO
+                priority.
+            num_period_samples: Number of recent periods kept for ``stats``.
+        """
+        self.rate = rate
+        self._period_ns = int(round(1e9 / rate))
+        self._spin_ns = int(spin_threshold * 1e9)
+        self._cpu = cpu
+        self._priority = priority
+        self._configured = cpu is None and priority is None
+
+        self._periods = np.zeros(num_period_samples, dtype=np.int64)
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart the schedule from now and clear the statistics."""
+        now = time.perf_counter_ns()
+        self._last_wake = now
+        self._deadline = now + self._period_ns
+        self._num_ticks = 0
+        self._num_missed = 0
+        self._num_skipped = 0
+        self._max_lateness_ns = 0
+        self.lateness = 0.0
+
+    @property
+    def period(self) -> float:
+        return self._period_ns / 1e9
+
+    def sleep(self) -> bool:
+        """Wait for the next deadline.
+
+        ``lateness`` is set to how far past the deadline the call was, in
+        seconds.
+
+        Returns:
+            False if the deadline had already passed.
+        """
+        if not self._configured:
+            configure_realtime(self._cpu, self._priority)
+            self._configured = True
+
+        deadline = self._deadline
+        now = time.perf_counter_ns()
+        on_time = now < deadline
+        self.lateness = 0.0
+        if on_time:
+            remaining = deadline - now
+            if remaining > self._spin_ns:
+                time.sleep((remaining - self._spin_ns) / 1e9)
+            while time.perf_counter_ns() < deadline:
+                # releases the GIL so that other threads are not starved
+                time.sleep(0)
+        else:
+            lateness = now - deadline
+            self.lateness = lateness / 1e9
+            self._num_missed += 1
+            self._max_lateness_ns = max(self._max_lateness_ns, lateness)
+            skipped = lateness // self._period_ns
+            self._num_skipped += skipped
+            deadline += skipped * self._period_ns
+
+        now = time.perf_counter_ns()
+        self._periods[self._num_ticks % len(self._periods)] = now - self._last_wake
+        self._num_ticks += 1
+        self._last_wake = now
+        self._deadline = deadline + self._period_ns
+        return on_time
+
+    def stats(self) -> Dict[str, float]:
+        """Period statistics (ms) over the recent ticks and deadline counters."""
+        num_samples = min(self._num_ticks, len(self._periods))
+        stats = {
+            "ticks": self._num_ticks,
+            "missed": self._num_missed,
+            "skipped": self._num_skipped,
+            "max_lateness_ms": self._max_lateness_ns / 1e6,
+        }
+        if num_samples:
+            periods = self._periods[:num_samples] / 1e6
+            p50, p99 = np.percentile(periods, [50, 99])
+            stats.update(
+                period_p50_ms=p50, period_p99_ms=p99, period_max_ms=periods.max()
+            )
+        return stats
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        message = (
+            f"{stats['ticks']} ticks at {self.rate:g} Hz, "
+            f"{stats['missed']} missed deadlines ({stats['skipped']} skipped)"
+        )
+        if "period_p50_ms" in stats:
+            message += (
+                f", period p50 {stats['period_p50_ms']:.3f} ms "
+                f"p99 {stats['period_p99_ms']:.3f} ms "
+                f"max {stats['period_max_ms']:.3f} ms"
+            )
+        return message
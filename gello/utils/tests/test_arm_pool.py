@@ -0,0 +1,117 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from gello.agents.agent import BimanualAgent
+from gello.robots.robot import BimanualRobot, PrintRobot
+from gello.utils.arm_pool import ArmPool
+
+
+class SlowRobot(PrintRobot):
+    """Takes ``delay`` seconds per observation and notes when it was read."""
+
+    def __init__(self, num_dofs: int, delay: float):
+        super().__init__(num_dofs, dont_print=True)
+        self.delay = delay
+        self.read_times = []
+        self.threads = set()
+
+    def get_observations(self):
+        self.read_times.append(time.perf_counter())
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return super().get_observations()
+
+
+class SlowAgent:
+    def __init__(self, num_dofs: int, delay: float):
+        self.num_dofs = num_dofs
+        self.delay = delay
+        self.obs = None
+
+    def act(self, obs):
+        self.obs = obs
+        time.sleep(self.delay)
+        return np.full(self.num_dofs, self.delay)
+
+
+def test_arm_pool_runs_arms_concurrently():
+    pool = ArmPool()
+    start = time.perf_counter()
+    for _ in range(5):
+        left, right = pool.run(lambda: time.sleep(0.02) or "l", lambda: "r")
+    elapsed = time.perf_counter() - start
+    pool.close()
+
+    assert (left, right) == ("l", "r")
+    stats = pool.stats()
+    assert stats["calls"] == 5
+    assert stats["unsynchronized"] == 0
+    assert stats["left_p50_ms"] > 15
+    assert stats["right_p50_ms"] < 5
+    assert elapsed < 5 * 0.02 + 0.05
+
+
+def test_arm_pool_raises_after_both_arms_finished():
+    pool = ArmPool()
+    finished = threading.Event()
+
+    def fail():
+        raise ValueError("left arm failed")
+
+    def slow():
+        time.sleep(0.02)
+        finished.set()
+
+    with pytest.raises(ValueError):
+        pool.run(fail, slow)
+    assert finished.is_set()
+    # the pool is still usable
+    assert pool.run(lambda: 1, lambda: 2) == (1, 2)
+    pool.close()
+
+
+def test_bimanual_robot_reads_arms_together():
+    robot_l, robot_r = SlowRobot(7, 0.03), SlowRobot(7, 0.03)
+    robot = BimanualRobot(robot_l, robot_r)
+    robot.command_joint_state(np.arange(14, dtype=np.float64))
+
+    start = time.perf_counter()
+    obs = robot.get_observations()
+    elapsed = time.perf_counter() - start
+    robot.close()
+
+    assert np.allclose(obs["joint_positions"], np.arange(14))
+    assert obs["gripper_position"].shape == (2,)
+    # read at the same moment on two threads, not one after the other
+    assert elapsed < 0.055
+    assert abs(robot_l.read_times[0] - robot_r.read_times[0]) < 0.01
+    assert robot_l.threads != robot_r.threads
+    assert "left_p50_ms" in robot.stats()
+
+
+def test_bimanual_robot_sequential():
+    robot = BimanualRobot(PrintRobot(2, True), PrintRobot(3, True), concurrent=False)
+    obs = robot.step(np.arange(5, dtype=np.float64))
+    assert np.allclose(obs["joint_positions"], np.arange(5))
+    assert robot.stats() == {}
+
+
+def test_bimanual_agent_acts_concurrently():
+    agent_l, agent_r = SlowAgent(7, 0.03), SlowAgent(7, 0.01)
+    agent = BimanualAgent(agent_l, agent_r)
+    obs = {
+        "joint_positions": np.arange(14),
+        "base_rgb": np.zeros((4, 6, 3)),
+    }
+    start = time.perf_counter()
+    action = agent.act(obs)
+    elapsed = time.perf_counter() - start
+    agent.close()
+
+    assert np.allclose(action, [0.03] * 7 + [0.01] * 7)
+    assert elapsed < 0.038
+    assert agent_r.obs["base_rgb"].shape == (4, 6, 3)
+    assert agent.stats()["left_p50_ms"] > agent.stats()["right_p50_ms"]
@@ -0,0 +1,31 @@
+import time
+
+from gello.utils.rate import Rate
+
+
+def test_rate_keeps_absolute_schedule():
+    rate = Rate(200)
+    start = time.perf_counter()
+    for i in range(20):
+        if i == 5:
+            # overrun by less than a period, made up on the next ticks
+            time.sleep(0.007)
+        rate.sleep()
+    elapsed = time.perf_counter() - start
+    assert abs(elapsed - 20 / 200) < 0.01
+    stats = rate.stats()
+    assert stats["ticks"] == 20
+    assert stats["missed"] >= 1
+    assert stats["skipped"] == 0
+
+
+def test_rate_skips_deadlines_after_long_overrun():
+    rate = Rate(1000)
+    rate.sleep()
+    time.sleep(0.0105)
+    assert not rate.sleep()
+    lateness = rate.lateness
+    # back on schedule instead of bursting through the missed ticks
+    assert rate.sleep()
+    assert lateness > 0.009
+    assert rate.stats()["skipped"] >= 9
@@ -0,0 +1,91 @@
+import csv
+import json
+
+import numpy as np
+
+from gello.env import RobotEnv
+from gello.robots.robot import PrintRobot
+from gello.utils.tracing import LoopTracer
+
+
+def test_tracer_records_laps_in_a_ring(tmp_path):
+    tracer = LoopTracer(capacity=8)
+    for i in range(20):
+        tracer.begin_tick()
+        tracer.lap("a")
+        if i % 2:
+            tracer.lap("b")
+    assert tracer.num_ticks == 20
+    assert tracer.phases == ["tick", "a", "b"]
+
+    summary = tracer.summary()
+    assert set(summary) == {"tick", "a", "b"}
+    assert summary["a"]["p50"] <= summary["a"]["max"]
+
+    tracer.export(tmp_path / "trace.csv")
+    with open(tmp_path / "trace.csv") as f:
+        rows = list(csv.DictReader(f))
+    # the last 7 complete ticks, 12 to 18
+    ticks = sorted({int(row["tick"]) for row in rows})
+    assert ticks == list(range(12, 19))
+    assert sum(row["phase"] == "b" for row in rows) == 3
+
+    tracer.export(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    assert len(events) == len(rows)
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
+def test_env_step_phases():
+    env = RobotEnv(PrintRobot(3, dont_print=True), control_rate_hz=500)
+    env.tracer = LoopTracer()
+    for _ in range(3):
+        env.tracer.begin_tick()
+        env.step(np.zeros(3))
+    env.tracer.begin_tick()
+    assert set(env.tracer.summary()) == {
+        "tick",
+        "robot.command_joint_state",
+        "rate.sleep",
+        "robot.get_observations",
+    }
+
+
+class _AsyncRobot(PrintRobot):
+    def __init__(self, events):
+        super().__init__(3, dont_print=True)
+        self.events = events
+
+    def step_async(self, joint_state):
+        self.events.append("step_async")
+        self.command_joint_state(joint_state)
+
+    def step_result(self):
+        self.events.append("step_result")
+        return self.get_observations()
+
+
+class _RecordingRate:
+    def __init__(self, events):
+        self.events = events
+
+    def sleep(self):
+        self.events.append("sleep")
+        return True
+
+
+def test_env_step_sends_command_before_sleep():
+    events = []
+    env = RobotEnv(_AsyncRobot(events), rate=_RecordingRate(events))
+    env.tracer = LoopTracer()
+    env.tracer.begin_tick()
+    env.step(np.ones(3))
+    env.tracer.begin_tick()
+    assert events == ["step_async", "sleep", "step_result"]
+    assert set(env.tracer.summary()) == {
+        "tick",
+        "robot.step_async",
+        "rate.sleep",
+        "robot.step_result",
+    }
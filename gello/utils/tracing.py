@@ -0,0 +1,170 @@
+"""Per-tick timing of the phases of a control loop.
+
+A ``LoopTracer`` stores, for every tick, when each phase started and how long
+it took, in preallocated arrays used as a ring buffer. Phases are recorded as
+laps: ``lap(name)`` closes the phase that started at the previous lap (or at
+``begin_tick``), so recording costs one clock read and two array writes. The
+buffers are ``array.array`` rather than NumPy arrays because writing single
+python ints into them takes about half the time, they are viewed with NumPy
+only for summaries and exports.
+
+Code that can be traced keeps an optional tracer and checks it for ``None``,
+so tracing costs nothing when it is disabled.
+
+The trace can be exported as CSV or as Chrome trace JSON, which can be opened
+in ``chrome://tracing`` or https://ui.perfetto.dev.
+"""
+
+import array
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+TICK = "tick"
+
+
+class LoopTracer:
+    """Records phase durations of the most recent ``capacity`` ticks."""
+
+    def __init__(self, capacity: int = 10000, max_phases: int = 16):
+        self.capacity = capacity
+        self.max_phases = max_phases
+        self._phases: Dict[str, int] = {TICK: 0}
+        # start of each phase and its duration, in perf_counter_ns; a duration
+        # of -1 means the phase did not run in that tick
+        self._starts = array.array("q", bytes(8 * capacity * max_phases))
+        self._durations = array.array("q", [-1]) * (capacity * max_phases)
+        self._empty_row = array.array("q", [-1]) * max_phases
+        self._num_ticks = 0
+        # offset of the current tick's row in the flat buffers
+        self._row = -1
+        self._tick_start = 0
+        self._last = 0
+
+    @property
+    def num_ticks(self) -> int:
+        return self._num_ticks
+
+    @property
+    def phases(self) -> List[str]:
+        return list(self._phases)
+
+    def begin_tick(self) -> None:
+        """Start a new tick, closing the previous one."""
+        now = time.perf_counter_ns()
+        self._end_tick(now)
+        row = self._row = (self._num_ticks % self.capacity) * self.max_phases
+        self._durations[row : row + self.max_phases] = self._empty_row
+        self._num_ticks += 1
+        self._tick_start = now
+        self._last = now
+
+    def lap(self, phase: str) -> None:
+        """Record that ``phase`` ran from the previous lap until now."""
+        now = time.perf_counter_ns()
+        if self._row < 0:
+            return
+        index = self._phases.get(phase)
+        if index is None:
+            if len(self._phases) == self.max_phases:
+                raise ValueError(f"More than {self.max_phases} phases")
+            index = self._phases[phase] = len(self._phases)
+        self._starts[self._row + index] = self._last
+        self._durations[self._row + index] = now - self._last
+        self._last = now
+
+    def _end_tick(self, now: int) -> None:
+        if self._row >= 0:
+            self._starts[self._row] = self._tick_start
+            self._durations[self._row] = now - self._tick_start
+
+    def _recent(self) -> np.ndarray:
+        """Indices of the completed ticks still in the buffer, oldest first."""
+        # the current tick is still running, leave it out
+        num_complete = min(self._num_ticks - 1, self.capacity - 1)
+        return np.arange(self._num_ticks - 1 - num_complete, self._num_ticks - 1)
+
+    def _arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        shape = (self.capacity, self.max_phases)
+        starts = np.frombuffer(self._starts, dtype=np.int64).reshape(shape)
+        durations = np.frombuffer(self._durations, dtype=np.int64).reshape(shape)
+        return starts, durations
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p99/max duration in ms of every phase over the buffered ticks.
+
+        The ``tick`` phase is the time from one ``begin_tick`` to the next.
+        """
+        rows = self._recent() % self.capacity
+        _, all_durations = self._arrays()
+        summary = {}
+        for phase, index in self._phases.items():
+            durations = all_durations[rows, index]
+            durations = durations[durations >= 0] / 1e6
+            if len(durations) == 0:
+                continue
+            p50, p99 = np.percentile(durations, [50, 99])
+            summary[phase] = {"p50": p50, "p99": p99, "max": durations.max()}
+        return summary
+
+    def format_summary(self) -> str:
+        lines = [f"{'phase':<28} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for phase, stats in self.summary().items():
+            lines.append(
+                f"{phase:<28} {stats['p50']:8.3f} {stats['p99']:8.3f} "
+                f"{stats['max']:8.3f}"
+            )
+        return "\n".join(lines)
+
+    def _events(self) -> Iterator[Tuple[int, str, float, float]]:
+        """Tick, phase, start and duration (us) of every recorded phase."""
+        ticks = self._recent()
+        if len(ticks) == 0:
+            return
+        starts, durations = self._arrays()
+        origin = starts[ticks[0] % self.capacity, 0]
+        for tick in ticks:
+            row = tick % self.capacity
+            for phase, index in self._phases.items():
+                duration = durations[row, index]
+                if duration >= 0:
+                    start = starts[row, index] - origin
+                    yield int(tick), phase, start / 1e3, duration / 1e3
+
+    def export_csv(self, path: Path) -> None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tick", "phase", "start_us", "duration_us"])
+            for tick, phase, start, duration in self._events():
+                writer.writerow([tick, phase, f"{start:.3f}", f"{duration:.3f}"])
+
+    def export_chrome_trace(self, path: Path) -> None:
+        events = []
+        for tick, phase, start, duration in self._events():
+            events.append(
+                {
+                    "name": phase,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": duration,
+                    "pid": 0,
+                    # ticks on their own row, phases below them
+                    "tid": 0 if phase == TICK else 1,
+                    "args": {"tick": tick},
+                }
+            )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, path: Path) -> None:
+        """Export to CSV if ``path`` ends with .csv, otherwise Chrome JSON."""
+        path = Path(path)
+        if path.suffix == ".csv":
+            self.export_csv(path)
+        else:
+            self.export_chrome_trace(path)
+        print(f"Saved timing trace of {len(self._recent())} ticks to {path}")
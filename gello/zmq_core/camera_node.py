@@ -1,11 +1,13 @@
 import pickle
 import threading
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import numpy as np
 import zmq
 
 from gello.cameras.camera import CameraDriver
+from gello.zmq_core.shared_memory import DEFAULT_NUM_SLOTS, SharedFrameRing
+from gello.zmq_core.streaming import LatestValueSubscriber, StreamPublisher
 
 DEFAULT_CAMERA_PORT = 5000
 
@@ -13,10 +15,27 @@ DEFAULT_CAMERA_PORT = 5000
 class ZMQClientCamera(CameraDriver):
     """A class representing a ZMQ client for a leader robot."""
 
-    def __init__(self, port: int = DEFAULT_CAMERA_PORT, host: str = "127.0.0.1"):
+    def __init__(
+        self,
+        port: int = DEFAULT_CAMERA_PORT,
+        host: str = "127.0.0.1",
+        shared_memory: bool = False,
+    ):
+        """Connect to a camera server.
+
+        Args:
+            port: Port of the camera server.
+            host: Host of the camera server.
+            shared_memory: Receive frames through shared memory instead of the
+                socket. Only works when the server runs on the same host. The
+                returned arrays are views that the server overwrites after
+                the ring of frames wraps around, copy them to keep them.
+        """
         self._context = zmq.Context()
         self._socket = self._context.socket(zmq.REQ)
         self._socket.connect(f"tcp://{host}:{port}")
+        self._shared_memory = shared_memory
+        self._ring: Optional[SharedFrameRing] = None
 
     def read(
         self,
@@ -27,12 +46,26 @@ class ZMQClientCamera(CameraDriver):
         Returns:
             T: The current state of the leader robot.
         """
+        if self._shared_memory:
+            return self._read_shared(img_size)
         # pack the image_size and send it to the server
         send_message = pickle.dumps(img_size)
         self._socket.send(send_message)
         state_dict = pickle.loads(self._socket.recv())
         return state_dict
 
+    def _read_shared(
+        self, img_size: Optional[Tuple[int, int]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        request = {"method": "read_shared", "img_size": img_size}
+        self._socket.send(pickle.dumps(request))
+        reply = pickle.loads(self._socket.recv())
+        # the server reallocates the ring when the frame size changes
+        name = reply["infos"][2]
+        if self._ring is None or self._ring.name != name:
+            self._ring = SharedFrameRing.attach(reply["infos"])
+        return self._ring.view(reply["slot"])
+
 
 class ZMQServerCamera:
     def __init__(
@@ -40,8 +73,11 @@ class ZMQServerCamera:
         camera: CameraDriver,
         port: int = DEFAULT_CAMERA_PORT,
         host: str = "127.0.0.1",
+        shared_memory_slots: int = DEFAULT_NUM_SLOTS,
     ):
         self._camera = camera
+        self._shared_memory_slots = shared_memory_slots
+        self._ring: Optional[SharedFrameRing] = None
         self._context = zmq.Context()
         self._socket = self._context.socket(zmq.REP)
         addr = f"tcp://{host}:{port}"
@@ -54,16 +90,105 @@ class ZMQServerCamera:
     def serve(self) -> None:
         """Serve the leader robot state over ZMQ."""
         self._socket.setsockopt(zmq.RCVTIMEO, 1000)  # Set timeout to 1000 ms
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    message = self._socket.recv()
+                    request = pickle.loads(message)
+                    if isinstance(request, dict):
+                        reply = self._read_shared(request["img_size"])
+                        self._socket.send(pickle.dumps(reply))
+                        continue
+                    camera_read = self._camera.read(request)
+                    self._socket.send(pickle.dumps(camera_read))
+                except zmq.Again:
+                    print(self._timout_message)
+                    # Timeout occurred, check if the stop event is set
+        finally:
+            # closed by the serving thread, which is the only user of the
+            # socket and the ring
+            self.close()
+
+    def _read_shared(self, img_size: Optional[Tuple[int, int]]) -> Dict[str, Any]:
+        """Read a frame into the shared memory ring for a co-located client."""
+        image, depth = self._camera.read(img_size)
+        if self._ring is None or not self._ring.matches(image, depth):
+            # clients attach to the new ring by name, free the old one now
+            # instead of leaving it in /dev/shm
+            self._close_ring()
+            self._ring = SharedFrameRing.create(
+                image, depth, num_slots=self._shared_memory_slots
+            )
+        slot = self._ring.write(image, depth)
+        return {"slot": slot, "infos": self._ring.infos}
+
+    def _close_ring(self) -> None:
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def stop(self) -> None:
+        """Signal the server to stop serving."""
+        self._stop_event.set()
+
+    def close(self) -> None:
+        """Unlink the shared memory ring and release the socket."""
+        self._close_ring()
+        if not self._socket.closed:
+            self._socket.close()
+            self._context.term()
+
+
+class ZMQPublisherCamera:
+    """Streams camera frames as fast as the camera produces them."""
+
+    def __init__(
+        self,
+        camera: CameraDriver,
+        port: int = DEFAULT_CAMERA_PORT,
+        host: str = "127.0.0.1",
+        img_size: Optional[Tuple[int, int]] = None,
+    ):
+        self._camera = camera
+        self._img_size = img_size
+        self._publisher = StreamPublisher(port=port, host=host)
+        self._stop_event = threading.Event()
+
+    def serve(self) -> None:
+        """Publish frames until stopped; the camera read sets the pace."""
         while not self._stop_event.is_set():
-            try:
-                message = self._socket.recv()
-                img_size = pickle.loads(message)
-                camera_read = self._camera.read(img_size)
-                self._socket.send(pickle.dumps(camera_read))
-            except zmq.Again:
-                print(self._timout_message)
-                # Timeout occurred, check if the stop event is set
+            image, depth = self._camera.read(self._img_size)
+            self._publisher.publish({"rgb": image, "depth": depth})
+        self._publisher.close()
 
     def stop(self) -> None:
         """Signal the server to stop serving."""
         self._stop_event.set()
+
+
+class ZMQStreamingClientCamera(CameraDriver):
+    """Reads the newest frame streamed by a ``ZMQPublisherCamera``.
+
+    ``read`` returns immediately with the cached frame, so a control loop
+    faster than the camera frame rate is never blocked by it. The image size is
+    chosen on the publisher side.
+    """
+
+    def __init__(self, port: int = DEFAULT_CAMERA_PORT, host: str = "127.0.0.1"):
+        self._subscriber = LatestValueSubscriber(port=port, host=host)
+
+    @property
+    def subscriber(self) -> LatestValueSubscriber:
+        return self._subscriber
+
+    def read(
+        self,
+        img_size: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if img_size is not None:
+            raise ValueError("Set img_size on the ZMQPublisherCamera instead")
+        _, _, frame = self._subscriber.latest()
+        return frame["rgb"], frame["depth"]
+
+    def close(self) -> None:
+        self._subscriber.close()
@@ -0,0 +1,209 @@
+"""Compact binary wire protocol for the ZMQ robot nodes.
+
+A binary message is a multipart ZMQ message. The first frame starts with a
+fixed header (magic, version, opcode, number of fields) followed by one
+descriptor per field (dtype code, shape, name and where its bytes live). Raw
+array buffers are decoded with ``np.frombuffer``, so joint states and
+observations are never serialized.
+
+Small arrays are appended to the first frame: every extra ZMQ frame costs a
+few microseconds, which is more than copying a joint vector. Arrays of
+``ZERO_COPY_THRESHOLD`` bytes or more get a frame of their own and are sent
+with ``copy=False``.
+
+Pickle stays available as a fallback. Which protocol a connection uses is
+negotiated on the first, pickled ``num_dofs`` request: the client lists the
+protocols it speaks under ``NEGOTIATE_KEY`` and a server that knows the key
+answers with its choice. Servers that predate the binary protocol ignore the
+extra key and answer with the plain number of joints, so the client falls back
+to pickle instead of crashing them with an unknown method.
+"""
+
+import pickle
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PROTOCOL_BINARY = "binary"
+PROTOCOL_PICKLE = "pickle"
+PROTOCOLS = (PROTOCOL_BINARY, PROTOCOL_PICKLE)
+NEGOTIATE_KEY = "protocols"
+
+MAGIC = b"GZ"
+VERSION = 1
+
+OP_ERROR = 0
+OP_NUM_DOFS = 1
+OP_GET_JOINT_STATE = 2
+OP_COMMAND_JOINT_STATE = 3
+OP_GET_OBSERVATIONS = 4
+OP_STEP = 5
+OP_RESET = 6
+
+METHOD_TO_OPCODE: Dict[str, int] = {
+    "num_dofs": OP_NUM_DOFS,
+    "get_joint_state": OP_GET_JOINT_STATE,
+    "command_joint_state": OP_COMMAND_JOINT_STATE,
+    "get_observations": OP_GET_OBSERVATIONS,
+    "step": OP_STEP,
+    "reset": OP_RESET,
+}
+OPCODE_TO_METHOD: Dict[int, str] = {v: k for k, v in METHOD_TO_OPCODE.items()}
+
+# magic, version, opcode, number of fields
+_HEADER = struct.Struct("<2sBBH")
+# dtype code, ndim, name length, frame index (0 for inline), payload size;
+# followed by ndim int64 dims and the utf-8 name
+_FIELD = struct.Struct("<BBBHQ")
+
+# Same default as pyzmq's copy_threshold, below which zero-copy sends are
+# copied anyway.
+ZERO_COPY_THRESHOLD = 65536
+
+# dtype code 0 marks a field whose payload is a pickled python object, used for
+# values that are not plain numeric arrays.
+_OBJECT_CODE = 0
+_DTYPES: List[np.dtype] = [
+    np.dtype("float64"),
+    np.dtype("float32"),
+    np.dtype("int64"),
+    np.dtype("int32"),
+    np.dtype("int16"),
+    np.dtype("uint8"),
+    np.dtype("uint16"),
+    np.dtype("bool"),
+]
+_DTYPE_TO_CODE: Dict[np.dtype, int] = {d: i + 1 for i, d in enumerate(_DTYPES)}
+_CODE_TO_DTYPE: Dict[int, np.dtype] = {i + 1: d for i, d in enumerate(_DTYPES)}
+
+# Name used for the single field of a reply that is not a dictionary.
+_VALUE_FIELD = ""
+
+
+def is_binary_message(first_frame: Any) -> bool:
+    """Check whether a message was encoded with the binary protocol.
+
+    Pickled messages start with the pickle protocol opcode (0x80), so the magic
+    bytes are enough to tell the two apart.
+    """
+    return bytes(memoryview(first_frame)[: len(MAGIC)]) == MAGIC
+
+
+def choose_protocol(
+    requested: Sequence[str], supported: Sequence[str]
+) -> Optional[str]:
+    """Pick the first protocol in ``requested`` that is also ``supported``."""
+    for protocol in requested:
+        if protocol in supported:
+            return protocol
+    return None
+
+
+def _as_array(value: Any) -> Optional[np.ndarray]:
+    if isinstance(value, np.ndarray):
+        arr = value
+    elif isinstance(value, (int, float, bool, np.generic)):
+        arr = np.asarray(value)
+    else:
+        return None
+    if arr.dtype not in _DTYPE_TO_CODE:
+        return None
+    if not arr.flags.c_contiguous:
+        arr = np.ascontiguousarray(arr)
+    return arr
+
+
+def encode_message(opcode: int, payload: Any = None) -> List[Any]:
+    """Encode a request or reply as a list of frames.
+
+    Args:
+        opcode: The method opcode, or ``OP_ERROR``.
+        payload: ``None``, a single value (array or scalar) or a dictionary of
+            values keyed by field name.
+
+    Returns:
+        List of frames to pass to ``socket.send_multipart(..., copy=False)``.
+    """
+    if payload is None:
+        fields: Dict[str, Any] = {}
+    elif isinstance(payload, dict):
+        fields = payload
+    else:
+        fields = {_VALUE_FIELD: payload}
+
+    header = [_HEADER.pack(MAGIC, VERSION, opcode, len(fields))]
+    inline: List[Any] = []
+    frames: List[Any] = [b""]
+    for name, value in fields.items():
+        encoded_name = name.encode()
+        arr = _as_array(value)
+        if arr is None:
+            code, shape, buffer = _OBJECT_CODE, (), pickle.dumps(value)
+            nbytes = len(buffer)
+        else:
+            code, shape, buffer = _DTYPE_TO_CODE[arr.dtype], arr.shape, arr.data
+            nbytes = arr.nbytes
+        if nbytes >= ZERO_COPY_THRESHOLD:
+            frame_index = len(frames)
+            frames.append(buffer)
+        else:
+            frame_index = 0
+            inline.append(buffer)
+        header.append(
+            _FIELD.pack(code, len(shape), len(encoded_name), frame_index, nbytes)
+        )
+        header.append(struct.pack(f"<{len(shape)}q", *shape))
+        header.append(encoded_name)
+    frames[0] = b"".join(header + inline)
+    return frames
+
+
+def decode_message(frames: Sequence[Any]) -> Tuple[int, Any]:
+    """Decode frames produced by :func:`encode_message`.
+
+    Arrays are returned as read-only views into the received frames.
+
+    Returns:
+        Tuple of the opcode and the payload, with the same structure that was
+        passed to :func:`encode_message`.
+    """
+    first = bytes(frames[0])
+    magic, version, opcode, num_fields = _HEADER.unpack_from(first)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported message header: {magic!r} v{version}")
+
+    descriptors = []
+    offset = _HEADER.size
+    for _ in range(num_fields):
+        code, ndim, name_len, frame_index, nbytes = _FIELD.unpack_from(first, offset)
+        offset += _FIELD.size
+        shape = struct.unpack_from(f"<{ndim}q", first, offset)
+        offset += 8 * ndim
+        name = first[offset : offset + name_len].decode()
+        offset += name_len
+        descriptors.append((name, code, shape, frame_index, nbytes))
+
+    fields = {}
+    for name, code, shape, frame_index, nbytes in descriptors:
+        if frame_index == 0:
+            buffer = memoryview(first)[offset : offset + nbytes]
+            offset += nbytes
+        else:
+            buffer = memoryview(frames[frame_index])
+        if code == _OBJECT_CODE:
+            fields[name] = pickle.loads(buffer)
+        else:
+            arr = np.frombuffer(buffer, dtype=_CODE_TO_DTYPE[code])
+            fields[name] = arr.reshape(shape)
+
+    if not fields:
+        return opcode, None
+    if len(fields) == 1 and _VALUE_FIELD in fields:
+        return opcode, fields[_VALUE_FIELD]
+    return opcode, fields
+
+
+def encode_error(message: str) -> List[Any]:
+    """Encode an error reply."""
+    return encode_message(OP_ERROR, {"error": message})
@@ -1,11 +1,14 @@
 import pickle
 import threading
-from typing import Any, Dict
+import time
+from typing import Any, Dict, List, Optional, Sequence
 
 import numpy as np
 import zmq
 
 from gello.robots.robot import Robot
+from gello.zmq_core import protocol
+from gello.zmq_core.streaming import LatestValueSubscriber, StreamPublisher
 
 DEFAULT_ROBOT_PORT = 6000
 
@@ -16,8 +19,25 @@ class ZMQServerRobot:
         robot: Robot,
         port: int = DEFAULT_ROBOT_PORT,
         host: str = "127.0.0.1",
+        protocols: Sequence[str] = protocol.PROTOCOLS,
+        publish_port: Optional[int] = None,
+        publish_hz: float = 100.0,
     ):
+        """Serve a robot over a ZMQ REP socket.
+
+        Args:
+            robot: The robot to serve.
+            port: Port to bind to.
+            host: Host to bind to.
+            protocols: Wire protocols accepted by this server, in order of
+                preference. Pickled requests are always understood so that
+                clients can negotiate.
+            publish_port: If set, observations are also streamed on this port
+                at ``publish_hz`` for ``ZMQStreamingClientRobot``.
+            publish_hz: Rate at which observations are streamed.
+        """
         self._robot = robot
+        self._protocols = tuple(protocols)
         self._context = zmq.Context()
         self._socket = self._context.socket(zmq.REP)
         addr = f"tcp://{host}:{port}"
@@ -27,38 +47,99 @@ class ZMQServerRobot:
         self._socket.bind(addr)
         self._stop_event = threading.Event()
 
+        self._publisher: Optional[StreamPublisher] = None
+        self._publish_period = 1.0 / publish_hz
+        if publish_port is not None:
+            self._publisher = StreamPublisher(port=publish_port, host=host)
+
+    def _call(self, method: str, args: Dict[str, Any]) -> Any:
+        """Call the appropriate robot method based on the request."""
+        result: Any
+        if method == "num_dofs":
+            result = self._robot.num_dofs()
+        elif method == "get_joint_state":
+            result = self._robot.get_joint_state()
+        elif method == "command_joint_state":
+            result = self._robot.command_joint_state(**args)
+        elif method == "get_observations":
+            result = self._robot.get_observations()
+        elif method == "step":
+            self._robot.command_joint_state(**args)
+            result = self._robot.get_observations()
+        elif method == "reset":
+            # only simulated robots can be reset
+            if hasattr(self._robot, "reset"):
+                result = self._robot.reset(**args)
+            else:
+                result = {"error": f"Robot does not support reset: {self._robot}"}
+        else:
+            result = {"error": "Invalid method"}
+            print(result)
+            raise NotImplementedError(f"Invalid method: {method}, {args, result}")
+        return result
+
+    def _handle_pickle(self, message: bytes) -> bytes:
+        request = pickle.loads(message)
+        method = request.get("method")
+        args = request.get("args", {})
+        result = self._call(method, args)
+        if protocol.NEGOTIATE_KEY in request:
+            chosen = protocol.choose_protocol(
+                request[protocol.NEGOTIATE_KEY], self._protocols
+            )
+            result = {"protocol": chosen, "result": result}
+        return pickle.dumps(result)
+
+    def _handle_binary(self, frames: List[zmq.Frame]) -> List[Any]:
+        if protocol.PROTOCOL_BINARY not in self._protocols:
+            return protocol.encode_error("Binary protocol disabled on this server")
+        opcode, payload = protocol.decode_message(frames)
+        method = protocol.OPCODE_TO_METHOD.get(opcode)
+        if method is None:
+            return protocol.encode_error(f"Invalid opcode: {opcode}")
+        if method in ("command_joint_state", "step"):
+            args = {"joint_state": payload}
+        elif method == "reset":
+            args = {"qpos": payload}
+        else:
+            args = {}
+        return protocol.encode_message(opcode, self._call(method, args))
+
     def serve(self) -> None:
         """Serve the leader robot state over ZMQ."""
         self._socket.setsockopt(zmq.RCVTIMEO, 1000)  # Set timeout to 1000 ms
-        while not self._stop_event.is_set():
-            try:
-                # Wait for next request from client
-                message = self._socket.recv()
-                request = pickle.loads(message)
-
-                # Call the appropriate method based on the request
-                method = request.get("method")
-                args = request.get("args", {})
-                result: Any
-                if method == "num_dofs":
-                    result = self._robot.num_dofs()
-                elif method == "get_joint_state":
-                    result = self._robot.get_joint_state()
-                elif method == "command_joint_state":
-                    result = self._robot.command_joint_state(**args)
-                elif method == "get_observations":
-                    result = self._robot.get_observations()
+        # Requests and publishing share this thread, so the robot is never
+        # accessed concurrently.
+        next_publish = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                timeout_ms = 1000
+                if self._publisher is not None:
+                    now = time.monotonic()
+                    if now >= next_publish:
+                        self._publisher.publish(self._robot.get_observations())
+                        next_publish = max(next_publish + self._publish_period, now)
+                    timeout_ms = max(0, int((next_publish - now) * 1000))
+                if not self._socket.poll(timeout_ms):
+                    # Timeout occurred - don't spam the console
+                    continue
+
+                # Handle the next request from the client
+                frames = self._socket.recv_multipart(copy=False)
+                if protocol.is_binary_message(frames[0]):
+                    # small buffers are copied by pyzmq, large ones are sent as-is
+                    self._socket.send_multipart(self._handle_binary(frames), copy=False)
                 else:
-                    result = {"error": "Invalid method"}
-                    print(result)
-                    raise NotImplementedError(
-                        f"Invalid method: {method}, {args, result}"
-                    )
+                    self._socket.send(self._handle_pickle(frames[0].bytes))
+        finally:
+            # the publisher is only used by the serving thread, release its
+            # port here so that a new server can bind it
+            self._close_publisher()
 
-                self._socket.send(pickle.dumps(result))
-            except zmq.Again:
-                # Timeout occurred - don't spam the console
-                pass
+    def _close_publisher(self) -> None:
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
 
     def stop(self) -> None:
         """Signal the server to stop serving."""
@@ -68,22 +149,108 @@ class ZMQServerRobot:
 class ZMQClientRobot(Robot):
     """A class representing a ZMQ client for a leader robot."""
 
-    def __init__(self, port: int = DEFAULT_ROBOT_PORT, host: str = "127.0.0.1"):
+    _socket_type = zmq.REQ
+
+    def __init__(
+        self,
+        port: int = DEFAULT_ROBOT_PORT,
+        host: str = "127.0.0.1",
+        protocol: str = "auto",
+    ):
+        """Connect to a robot server.
+
+        Args:
+            port: Port of the robot server.
+            host: Host of the robot server.
+            protocol: Wire protocol to use. "binary" or "pickle" force a mode,
+                "auto" negotiates with the server and prefers binary, falling
+                back to pickle for servers that predate the binary protocol.
+                Negotiation happens on the first request.
+        """
+        if protocol not in ("auto", "binary", "pickle"):
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self._requested_protocol = protocol
+        self._protocol: Optional[str] = None
+        self._num_dofs: Optional[int] = None
         self._context = zmq.Context()
-        self._socket = self._context.socket(zmq.REQ)
+        self._socket = self._context.socket(self._socket_type)
         self._socket.connect(f"tcp://{host}:{port}")
 
+    @property
+    def protocol(self) -> str:
+        """The wire protocol used by this client."""
+        if self._protocol is None:
+            self._protocol = self._negotiate(self._requested_protocol)
+        return self._protocol
+
+    def _negotiate(self, requested: str) -> str:
+        if requested == protocol.PROTOCOL_PICKLE:
+            return requested
+        if requested == "auto":
+            candidates = list(protocol.PROTOCOLS)
+        else:
+            candidates = [requested]
+        # ride on num_dofs, which every server answers, so that old servers
+        # are not killed by a method they do not know
+        request = {"method": "num_dofs", protocol.NEGOTIATE_KEY: candidates}
+        self._socket.send_multipart(self._envelope() + [pickle.dumps(request)])
+        reply = pickle.loads(self._recv_frames()[-1].bytes)
+        if isinstance(reply, dict):
+            chosen = reply["protocol"]
+            self._num_dofs = int(reply["result"])
+        else:
+            # a server that predates negotiation only speaks pickle
+            chosen = protocol.PROTOCOL_PICKLE if requested == "auto" else None
+            self._num_dofs = int(reply)
+        if chosen is None:
+            raise RuntimeError(f"Robot server does not support protocol {requested}")
+        return chosen
+
+    def _send(self, method: str, args: Any = None) -> None:
+        if self.protocol == protocol.PROTOCOL_PICKLE:
+            request = {"method": method}
+            if args is not None:
+                request["args"] = args
+            self._socket.send_multipart(self._envelope() + [pickle.dumps(request)])
+        else:
+            opcode = protocol.METHOD_TO_OPCODE[method]
+            # binary requests carry at most one array, the value of the only arg
+            value = None if args is None else next(iter(args.values()))
+            payload = None if value is None else np.asarray(value)
+            self._socket.send_multipart(
+                self._envelope() + protocol.encode_message(opcode, payload), copy=False
+            )
+
+    def _envelope(self) -> List[bytes]:
+        """Frames that precede the next request on this socket type."""
+        return []
+
+    def _recv_frames(self) -> List[zmq.Frame]:
+        """The frames of the reply to the last request, without the envelope."""
+        return self._socket.recv_multipart(copy=False)
+
+    def _recv(self) -> Any:
+        frames = self._recv_frames()
+        if self.protocol == protocol.PROTOCOL_PICKLE:
+            return pickle.loads(frames[0].bytes)
+        # errors come back as {"error": message}, like with pickle
+        _, result = protocol.decode_message(frames)
+        return result
+
+    def _request(self, method: str, args: Any = None) -> Any:
+        self._send(method, args)
+        return self._recv()
+
     def num_dofs(self) -> int:
         """Get the number of joints in the robot.
 
         Returns:
             int: The number of joints in the robot.
         """
-        request = {"method": "num_dofs"}
-        send_message = pickle.dumps(request)
-        self._socket.send(send_message)
-        result = pickle.loads(self._socket.recv())
-        return result
+        # the number of joints never changes, so only ask the server once
+        if self._num_dofs is None:
+            self._num_dofs = int(self._request("num_dofs"))
+        return self._num_dofs
 
     def get_joint_state(self) -> np.ndarray:
         """Get the current state of the leader robot.
@@ -91,11 +258,8 @@ class ZMQClientRobot(Robot):
         Returns:
             T: The current state of the leader robot.
         """
-        request = {"method": "get_joint_state"}
-        send_message = pickle.dumps(request)
         try:
-            self._socket.send(send_message)
-            result = pickle.loads(self._socket.recv())
+            result = self._request("get_joint_state")
             if isinstance(result, dict) and "error" in result:
                 raise RuntimeError(result["error"])
             return result
@@ -108,14 +272,7 @@ class ZMQClientRobot(Robot):
         Args:
             joint_state (T): The state to command the leader robot to.
         """
-        request = {
-            "method": "command_joint_state",
-            "args": {"joint_state": joint_state},
-        }
-        send_message = pickle.dumps(request)
-        self._socket.send(send_message)
-        result = pickle.loads(self._socket.recv())
-        return result
+        return self._request("command_joint_state", {"joint_state": joint_state})
 
     def get_observations(self) -> Dict[str, np.ndarray]:
         """Get the current observations of the leader robot.
@@ -123,11 +280,58 @@ class ZMQClientRobot(Robot):
         Returns:
             Dict[str, np.ndarray]: The current observations of the leader robot.
         """
-        request = {"method": "get_observations"}
-        send_message = pickle.dumps(request)
         try:
-            self._socket.send(send_message)
-            result = pickle.loads(self._socket.recv())
+            result = self._request("get_observations")
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+            return result
+        except zmq.Again:
+            raise RuntimeError("ZMQ timeout - robot may be disconnected")
+
+    def step(self, joint_state: np.ndarray) -> Dict[str, np.ndarray]:
+        """Command the robot and return the resulting observations.
+
+        This costs a single round trip instead of one for
+        ``command_joint_state`` and one for ``get_observations``.
+
+        Args:
+            joint_state (np.ndarray): The state to command the robot to.
+
+        Returns:
+            Dict[str, np.ndarray]: The observations right after the command.
+        """
+        self.step_async(joint_state)
+        return self.step_result()
+
+    def step_async(self, joint_state: np.ndarray) -> None:
+        """Send a step request without waiting for the reply.
+
+        Must be followed by ``step_result`` before the next request.
+        """
+        self._send("step", {"joint_state": joint_state})
+
+    def step_result(self) -> Dict[str, np.ndarray]:
+        """Wait for the reply to a request sent by ``step_async``."""
+        try:
+            result = self._recv()
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+            return result
+        except zmq.Again:
+            raise RuntimeError("ZMQ timeout - robot may be disconnected")
+
+    def reset(self, qpos: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Reset a simulated robot, e.g. ``BatchedMujocoRobotServer``.
+
+        Args:
+            qpos (np.ndarray): Joint positions to reset to, None for the
+                simulation's default.
+
+        Returns:
+            Dict[str, np.ndarray]: The observations after the reset.
+        """
+        try:
+            result = self._request("reset", {"qpos": qpos})
             if isinstance(result, dict) and "error" in result:
                 raise RuntimeError(result["error"])
             return result
@@ -138,3 +342,109 @@ class ZMQClientRobot(Robot):
         """Close the ZMQ socket and context."""
         self._socket.close()
         self._context.term()
+
+
+class ZMQAsyncClientRobot(ZMQClientRobot):
+    """A ZMQ client on a DEALER socket.
+
+    A DEALER socket does not enforce the strict send/recv alternation of REQ,
+    so a request that gets no reply within ``timeout_ms`` raises ``zmq.Again``
+    and the socket stays usable. Each request starts with a request id frame
+    and the empty delimiter frame that the REP socket of the server expects.
+    REP echoes both back, so it works with any robot server, and a late reply
+    to a request that timed out is recognized by its id and dropped instead
+    of being returned for the next request. Only one request is outstanding
+    at a time.
+    """
+
+    _socket_type = zmq.DEALER
+
+    def __init__(
+        self,
+        port: int = DEFAULT_ROBOT_PORT,
+        host: str = "127.0.0.1",
+        protocol: str = "auto",
+        timeout_ms: int = 1000,
+    ):
+        """Connect to a robot server.
+
+        Args:
+            port: Port of the robot server.
+            host: Host of the robot server.
+            protocol: Wire protocol, see ``ZMQClientRobot``.
+            timeout_ms: How long to wait for a reply.
+        """
+        super().__init__(port=port, host=host, protocol=protocol)
+        self._timeout_ms = timeout_ms
+        self._request_id = 0
+
+    def _envelope(self) -> List[bytes]:
+        self._request_id += 1
+        return [self._request_id.to_bytes(8, "little"), b""]
+
+    def _recv_frames(self) -> List[zmq.Frame]:
+        request_id = self._request_id.to_bytes(8, "little")
+        deadline = time.monotonic() + self._timeout_ms / 1e3
+        while True:
+            remaining_ms = int((deadline - time.monotonic()) * 1e3)
+            if remaining_ms <= 0 or not self._socket.poll(remaining_ms, zmq.POLLIN):
+                raise zmq.Again("No reply from the robot server")
+            frames = self._socket.recv_multipart(copy=False)
+            if frames[0].bytes == request_id:
+                return frames[2:]
+            # the late reply to a request that timed out
+
+
+class ZMQStreamingClientRobot(ZMQClientRobot):
+    """A ZMQ robot client that reads observations from a stream.
+
+    Commands still go through the request/reply socket, but observations come
+    from the latest-value cache fed by a server started with ``publish_port``,
+    so ``get_observations`` never waits on the robot. ``step_async`` only
+    sends the command, and ``step_result`` waits for its acknowledgement and
+    returns the latest streamed observation, so ``RobotEnv.step`` never asks
+    the server for observations either.
+    """
+
+    def __init__(
+        self,
+        port: int = DEFAULT_ROBOT_PORT,
+        host: str = "127.0.0.1",
+        protocol: str = "auto",
+        publish_port: int = DEFAULT_ROBOT_PORT + 1,
+    ):
+        super().__init__(port=port, host=host, protocol=protocol)
+        self._subscriber = LatestValueSubscriber(port=publish_port, host=host)
+
+    @property
+    def subscriber(self) -> LatestValueSubscriber:
+        return self._subscriber
+
+    def get_joint_state(self) -> np.ndarray:
+        return self.get_observations()["joint_positions"]
+
+    def get_observations(self) -> Dict[str, np.ndarray]:
+        _, _, obs = self._subscriber.latest()
+        return obs
+
+    def step(self, joint_state: np.ndarray) -> Dict[str, np.ndarray]:
+        self.command_joint_state(joint_state)
+        return self.get_observations()
+
+    def step_async(self, joint_state: np.ndarray) -> None:
+        """Send the command without waiting for the reply."""
+        self._send("command_joint_state", {"joint_state": joint_state})
+
+    def step_result(self) -> Dict[str, np.ndarray]:
+        """Wait for the command to be acknowledged, then read the stream."""
+        try:
+            result = self._recv()
+        except zmq.Again:
+            raise RuntimeError("ZMQ timeout - robot may be disconnected")
+        if isinstance(result, dict) and "error" in result:
+            raise RuntimeError(result["error"])
+        return self.get_observations()
+
+    def close(self) -> None:
+        self._subscriber.close()
+        super().close()
@@ -0,0 +1,103 @@
+"""Shared-memory frame ring for camera nodes on the same host as their clients.
+
+The camera server writes each frame into the next slot of a ring that lives in
+``multiprocessing.shared_memory`` (through ``SharedGDict``) and only sends the
+slot index over ZMQ. The client maps the same memory and returns NumPy views,
+so frames are never pickled or copied through the loopback socket.
+"""
+
+from multiprocessing import resource_tracker
+from typing import Any, Dict, Set, Tuple
+
+import numpy as np
+
+from gello.data_utils.gdict.data import GDict, SharedGDict
+
+DEFAULT_NUM_SLOTS = 4
+
+# names of the shared memory segments created, and not yet unlinked, by this
+# process
+_created: Set[str] = set()
+
+
+class SharedFrameRing:
+    """A ring of color and depth frames in shared memory."""
+
+    def __init__(self, shared: SharedGDict):
+        self._shared = shared
+        self._images = shared.memory["rgb"]
+        self._depths = shared.memory["depth"]
+        self._next_slot = 0
+
+    @classmethod
+    def create(
+        cls, image: np.ndarray, depth: np.ndarray, num_slots: int = DEFAULT_NUM_SLOTS
+    ) -> "SharedFrameRing":
+        """Allocate a ring whose slots match the given frames."""
+        frames = GDict(
+            {
+                "rgb": np.zeros((num_slots,) + image.shape, dtype=image.dtype),
+                "depth": np.zeros((num_slots,) + depth.shape, dtype=depth.dtype),
+            }
+        )
+        ring = cls(SharedGDict(frames))
+        _created.update(ring.name.values())
+        return ring
+
+    @classmethod
+    def attach(cls, infos: Tuple[Any, Any, Any]) -> "SharedFrameRing":
+        """Map a ring created by another process from its ``infos``."""
+        shared = SharedGDict(None, *infos)
+        # Only the creating process may unlink the memory. Before python 3.13
+        # attaching also registers it with this process' resource tracker,
+        # which would unlink it when the client exits. The creating process
+        # keeps its registration, it is dropped again by ``close``.
+        for memory in shared.shared_memory.values():
+            if memory.name not in _created:
+                resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(shared)
+
+    def close(self) -> None:
+        """Unmap the ring, and unlink its memory if this process created it.
+
+        Views returned by ``view`` must not be used afterwards.
+        """
+        # the buffers cannot be closed while this ring's arrays still map them
+        self._images = self._depths = None
+        self._shared.memory = None
+        for memory in self._shared.shared_memory.values():
+            memory.close()
+            if memory.name in _created:
+                memory.unlink()
+                _created.discard(memory.name)
+        # SharedGDict.__del__ would unlink the memory a second time
+        self._shared.is_new = False
+
+    @property
+    def infos(self) -> Tuple[Any, Any, Any]:
+        """Shapes, dtypes and shared memory names needed by ``attach``."""
+        return self._shared.get_infos()
+
+    @property
+    def name(self) -> Dict[str, str]:
+        return self._shared.shared_name
+
+    def matches(self, image: np.ndarray, depth: np.ndarray) -> bool:
+        return (
+            self._images.shape[1:] == image.shape
+            and self._images.dtype == image.dtype
+            and self._depths.shape[1:] == depth.shape
+            and self._depths.dtype == depth.dtype
+        )
+
+    def write(self, image: np.ndarray, depth: np.ndarray) -> int:
+        """Copy a frame into the next slot and return the slot index."""
+        slot = self._next_slot
+        self._images[slot] = image
+        self._depths[slot] = depth
+        self._next_slot = (slot + 1) % len(self._images)
+        return slot
+
+    def view(self, slot: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Views of the frame in ``slot``, valid until the slot is rewritten."""
+        return self._images[slot], self._depths[slot]
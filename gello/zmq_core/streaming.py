@@ -0,0 +1,127 @@
+"""Publish/subscribe streaming of robot observations and camera frames.
+
+A publisher pushes the newest value on its own clock, tagged with a sequence
+number and a timestamp. A subscriber drains its socket on a background thread
+into a latest-value cache, so readers never block on the sensor or the network.
+
+Both ends use a tiny high-water mark, so when a reader falls behind ZMQ drops
+stale messages instead of queueing them. ``ZMQ_CONFLATE`` would be the natural
+option but it does not support multipart messages.
+"""
+
+import struct
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import zmq
+
+from gello.zmq_core import protocol
+
+# sequence number, publish timestamp (time.time())
+_STAMP = struct.Struct("<Qd")
+
+DEFAULT_HWM = 2
+
+
+class StreamPublisher:
+    """Publishes values with a sequence number and timestamp on a PUB socket."""
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        hwm: int = DEFAULT_HWM,
+    ):
+        self._context = zmq.Context()
+        self._socket = self._context.socket(zmq.PUB)
+        self._socket.setsockopt(zmq.SNDHWM, hwm)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        addr = f"tcp://{host}:{port}"
+        print(f"Stream Publisher Binding to {addr}")
+        self._socket.bind(addr)
+        self._seq = 0
+
+    def publish(self, value: Any) -> None:
+        """Publish a value (an array or a dictionary of arrays)."""
+        self._seq += 1
+        frames = [_STAMP.pack(self._seq, time.time())]
+        frames += protocol.encode_message(protocol.OP_GET_OBSERVATIONS, value)
+        self._socket.send_multipart(frames, copy=False)
+
+    def close(self) -> None:
+        self._socket.close()
+        self._context.term()
+
+
+class LatestValueSubscriber:
+    """Keeps the most recent value published by a ``StreamPublisher``."""
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        hwm: int = DEFAULT_HWM,
+    ):
+        self._context = zmq.Context()
+        self._socket = self._context.socket(zmq.SUB)
+        self._socket.setsockopt(zmq.RCVHWM, hwm)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.setsockopt(zmq.SUBSCRIBE, b"")
+        self._socket.connect(f"tcp://{host}:{port}")
+
+        self._lock = threading.Lock()
+        self._has_value = threading.Event()
+        self._stop_event = threading.Event()
+        self._latest: Tuple[int, float, Any] = (0, 0.0, None)
+        self._num_received = 0
+        self._num_dropped = 0
+
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def _receive(self) -> None:
+        while not self._stop_event.is_set():
+            if not self._socket.poll(100):
+                continue
+            frames = self._socket.recv_multipart(copy=False)
+            seq, stamp = _STAMP.unpack(frames[0].bytes)
+            _, value = protocol.decode_message(frames[1:])
+            with self._lock:
+                last_seq = self._latest[0]
+                if last_seq and seq > last_seq + 1:
+                    self._num_dropped += seq - last_seq - 1
+                self._num_received += 1
+                self._latest = (seq, stamp, value)
+            self._has_value.set()
+
+    def latest(self, timeout: Optional[float] = 5.0) -> Tuple[int, float, Any]:
+        """Get the newest value.
+
+        Only blocks until the first value has arrived.
+
+        Args:
+            timeout: Seconds to wait for the first value, None waits forever.
+
+        Returns:
+            Tuple of the sequence number, the publish timestamp and the value.
+        """
+        if not self._has_value.wait(timeout):
+            raise RuntimeError("No message received from stream publisher")
+        with self._lock:
+            return self._latest
+
+    @property
+    def num_received(self) -> int:
+        return self._num_received
+
+    @property
+    def num_dropped(self) -> int:
+        """Messages skipped by the high-water mark, from sequence number gaps."""
+        return self._num_dropped
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self._socket.close()
+        self._context.term()
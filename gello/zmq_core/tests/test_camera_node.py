@@ -0,0 +1,37 @@
+import os
+import threading
+
+import numpy as np
+
+from gello.cameras.camera import DummyCamera
+from gello.zmq_core.camera_node import ZMQClientCamera, ZMQServerCamera
+
+
+def _in_dev_shm(ring_name):
+    return any(name in os.listdir("/dev/shm") for name in ring_name.values())
+
+
+def test_shared_memory_read():
+    camera = DummyCamera()
+    server = ZMQServerCamera(camera, port=16020, shared_memory_slots=2)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    client = ZMQClientCamera(port=16020, shared_memory=True)
+    image, depth = client.read()
+    assert image.shape == (480, 640, 3) and image.dtype == np.uint8
+    assert depth.shape == (480, 640, 1) and depth.dtype == np.uint16
+    # frames are views into the ring, not copies
+    assert not image.flags.owndata
+
+    first_ring = client._ring.name
+    image, depth = client.read((48, 64))
+    assert image.shape == (48, 64, 3)
+    # the ring of the old frame size is unlinked when it is replaced
+    assert client._ring.name != first_ring
+    assert not _in_dev_shm(first_ring)
+    assert _in_dev_shm(client._ring.name)
+
+    server.stop()
+    thread.join()
+    assert not _in_dev_shm(client._ring.name)
@@ -0,0 +1,195 @@
+import pickle
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from gello.robots.robot import BimanualRobot, PrintRobot
+from gello.zmq_core import protocol
+from gello.zmq_core.robot_node import (
+    ZMQAsyncClientRobot,
+    ZMQClientRobot,
+    ZMQServerRobot,
+)
+
+
+def test_roundtrip_array():
+    joints = np.arange(7, dtype=np.float64)
+    opcode, payload = protocol.decode_message(
+        protocol.encode_message(protocol.OP_COMMAND_JOINT_STATE, joints)
+    )
+    assert opcode == protocol.OP_COMMAND_JOINT_STATE
+    assert np.array_equal(payload, joints)
+
+
+def test_roundtrip_observations():
+    obs = {
+        "joint_positions": np.ones(7),
+        "ee_pos_quat": np.zeros(7, dtype=np.float32),
+        "gripper_position": np.array(0),
+        "image": np.zeros((240, 320, 3), dtype=np.uint8),
+        "label": "left",
+    }
+    frames = protocol.encode_message(protocol.OP_GET_OBSERVATIONS, obs)
+    # only the image is large enough to get its own zero-copy frame
+    assert len(frames) == 2
+    _, payload = protocol.decode_message(frames)
+    assert payload.keys() == obs.keys()
+    assert payload["label"] == "left"
+    for key, value in obs.items():
+        if isinstance(value, np.ndarray):
+            assert np.array_equal(payload[key], value)
+            assert payload[key].dtype == value.dtype
+            assert payload[key].shape == value.shape
+
+
+def test_roundtrip_none():
+    _, payload = protocol.decode_message(protocol.encode_message(protocol.OP_NUM_DOFS))
+    assert payload is None
+
+
+def test_is_binary_message():
+    frames = protocol.encode_message(protocol.OP_NUM_DOFS)
+    assert protocol.is_binary_message(frames[0])
+    assert not protocol.is_binary_message(b"\x80\x04")
+
+
+def _start_server(port):
+    server = ZMQServerRobot(PrintRobot(7, dont_print=True), port=port)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    return server, thread
+
+
+@pytest.fixture
+def robot_server():
+    server, thread = _start_server(16000)
+    yield server
+    server.stop()
+    thread.join()
+
+
+@pytest.fixture
+def right_robot_server():
+    server, thread = _start_server(16001)
+    yield server
+    server.stop()
+    thread.join()
+
+
+@pytest.mark.parametrize("mode", ["auto", "binary", "pickle"])
+def test_client_server(robot_server, mode):
+    client = ZMQClientRobot(port=16000, protocol=mode)
+    assert client.protocol == ("binary" if mode == "auto" else mode)
+    assert client.num_dofs() == 7
+    client.command_joint_state(np.full(7, 0.5))
+    obs = client.get_observations()
+    assert np.allclose(obs["joint_positions"], 0.5)
+    assert np.allclose(client.get_joint_state(), 0.5)
+    client.close()
+
+
+class LegacyServerRobot(ZMQServerRobot):
+    """Answers pickled requests like the servers that predate negotiation."""
+
+    def _handle_pickle(self, message: bytes) -> bytes:
+        request = pickle.loads(message)
+        method = request.get("method")
+        if method not in (
+            "num_dofs",
+            "get_joint_state",
+            "command_joint_state",
+            "get_observations",
+        ):
+            # the old serve loop died on unknown methods
+            raise NotImplementedError
+        return pickle.dumps(self._call(method, request.get("args", {})))
+
+
+def test_auto_falls_back_to_pickle_for_legacy_server():
+    server = LegacyServerRobot(PrintRobot(7, dont_print=True), port=16003)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    client = ZMQClientRobot(port=16003)
+    try:
+        assert client.protocol == "pickle"
+        assert client.num_dofs() == 7
+        client.command_joint_state(np.full(7, 0.5))
+        assert np.allclose(client.get_joint_state(), 0.5)
+        assert thread.is_alive()
+        binary_client = ZMQClientRobot(port=16003, protocol="binary")
+        with pytest.raises(RuntimeError, match="does not support protocol"):
+            binary_client.protocol
+        binary_client.close()
+        assert thread.is_alive()
+    finally:
+        client.close()
+        server.stop()
+        thread.join()
+
+
+@pytest.mark.parametrize("mode", ["binary", "pickle"])
+def test_client_step(robot_server, mode):
+    client = ZMQClientRobot(port=16000, protocol=mode)
+    obs = client.step(np.full(7, 0.25))
+    assert np.allclose(obs["joint_positions"], 0.25)
+    client.close()
+
+
+@pytest.mark.parametrize("mode", ["binary", "pickle"])
+def test_reset_unsupported(robot_server, mode):
+    client = ZMQClientRobot(port=16000, protocol=mode)
+    with pytest.raises(RuntimeError, match="does not support reset"):
+        client.reset()
+    # the server keeps serving
+    assert client.num_dofs() == 7
+    client.close()
+
+
+def test_bimanual_async_step(robot_server, right_robot_server):
+    robot = BimanualRobot(
+        ZMQAsyncClientRobot(port=16000), ZMQAsyncClientRobot(port=16001)
+    )
+    joints = np.arange(14, dtype=np.float64)
+    obs = robot.step(joints)
+    assert np.allclose(obs["joint_positions"], joints)
+    assert np.allclose(robot.get_joint_state(), joints)
+
+    # the split used by RobotEnv.step: send, sleep, then collect
+    robot.step_async(joints + 1)
+    obs = robot.step_result()
+    assert np.allclose(obs["joint_positions"], joints + 1)
+
+
+class SlowObservationsRobot(PrintRobot):
+    def __init__(self):
+        super().__init__(7, dont_print=True)
+        self.delay = 0.0
+
+    def get_observations(self):
+        time.sleep(self.delay)
+        return super().get_observations()
+
+
+def test_async_client_timeout_drops_late_reply():
+    robot = SlowObservationsRobot()
+    server = ZMQServerRobot(robot, port=16002)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    client = ZMQAsyncClientRobot(port=16002, timeout_ms=100)
+    try:
+        client.command_joint_state(np.full(7, 0.5))
+        robot.delay = 0.3
+        with pytest.raises(RuntimeError, match="timeout"):
+            client.get_observations()
+        robot.delay = 0.0
+        time.sleep(0.3)
+        # the late observations are queued first and must not be taken as the
+        # reply to this request
+        assert client.num_dofs() == 7
+        assert np.allclose(client.get_joint_state(), 0.5)
+    finally:
+        client.close()
+        server.stop()
+        thread.join()
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import numpy as np
+
+from gello.cameras.camera import DummyCamera
+from gello.env import RobotEnv
+from gello.robots.robot import PrintRobot
+from gello.zmq_core.camera_node import ZMQPublisherCamera, ZMQStreamingClientCamera
+from gello.zmq_core.robot_node import ZMQServerRobot, ZMQStreamingClientRobot
+from gello.zmq_core.streaming import LatestValueSubscriber, StreamPublisher
+
+
+def test_latest_value():
+    publisher = StreamPublisher(port=16010)
+    subscriber = LatestValueSubscriber(port=16010)
+    # PUB drops messages until the subscription has propagated
+    while subscriber.num_received == 0:
+        publisher.publish({"value": np.zeros(3)})
+        time.sleep(0.01)
+    for i in range(1, 4):
+        publisher.publish({"value": np.full(3, i)})
+        time.sleep(0.01)
+    time.sleep(0.1)
+    seq, stamp, value = subscriber.latest()
+    assert np.array_equal(value["value"], np.full(3, 3))
+    assert stamp <= time.time()
+    subscriber.close()
+    publisher.close()
+
+
+def test_streaming_robot_client():
+    server = ZMQServerRobot(
+        PrintRobot(7, dont_print=True), port=16011, publish_port=16012
+    )
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    client = ZMQStreamingClientRobot(port=16011, publish_port=16012)
+    client.command_joint_state(np.full(7, 0.5))
+    deadline = time.time() + 2
+    while not np.allclose(client.get_observations()["joint_positions"], 0.5):
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    client.close()
+    server.stop()
+    thread.join()
+
+
+def test_restart_server_on_same_publish_port():
+    for port in (16016, 16017):
+        server = ZMQServerRobot(
+            PrintRobot(7, dont_print=True), port=port, publish_port=16018
+        )
+        thread = threading.Thread(target=server.serve, daemon=True)
+        thread.start()
+        client = ZMQStreamingClientRobot(port=port, publish_port=16018)
+        assert client.get_observations()["joint_positions"].shape == (7,)
+        client.close()
+        server.stop()
+        thread.join()
+
+
+class _RecordingServer(ZMQServerRobot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.methods = []
+
+    def _call(self, method, args):
+        self.methods.append(method)
+        return super()._call(method, args)
+
+
+def test_env_step_with_streaming_client_reads_the_stream():
+    server = _RecordingServer(
+        PrintRobot(7, dont_print=True), port=16014, publish_port=16015
+    )
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    client = ZMQStreamingClientRobot(port=16014, publish_port=16015)
+    env = RobotEnv(client, control_rate_hz=200)
+    try:
+        deadline = time.time() + 2
+        obs = None
+        while obs is None or not np.allclose(obs["joint_positions"], 0.25):
+            assert time.time() < deadline
+            obs = env.step(np.full(7, 0.25))
+        assert "step" not in server.methods
+        assert "get_observations" not in server.methods
+        assert "command_joint_state" in server.methods
+    finally:
+        client.close()
+        server.stop()
+        thread.join()
+
+
+def test_streaming_camera_client():
+    server = ZMQPublisherCamera(DummyCamera(), port=16013, img_size=(48, 64))
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+
+    client = ZMQStreamingClientCamera(port=16013)
+    image, depth = client.read()
+    assert image.shape == (48, 64, 3)
+    assert depth.shape == (48, 64, 1)
+
+    client.close()
+    server.stop()
+    thread.join()
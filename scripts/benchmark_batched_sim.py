@@ -0,0 +1,132 @@
+"""Compare stepping K simulated arms through K servers or one batched server.
+
+The baseline is what policy evaluation did before: one lock-step
+``MujocoRobotServer`` per environment, each stepped with its own ZMQ request.
+The batched server steps all environments with a single request.
+
+Without --xml the Menagerie UR5e is used, or a UR5e built from its DH
+parameters when the submodule is not checked out.
+"""
+
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import tyro
+
+from gello.dm_control_tasks.arms.kinematics import dh_arm_xml
+from gello.robots.sim_robot import BatchedMujocoRobotServer, MujocoRobotServer
+from gello.zmq_core.robot_node import ZMQClientRobot
+
+MENAGERIE_UR5E = (
+    Path(__file__).parent.parent
+    / "third_party"
+    / "mujoco_menagerie"
+    / "universal_robots_ur5e"
+    / "ur5e.xml"
+)
+
+
+@dataclass
+class Args:
+    xml: Optional[str] = None
+    num_envs: int = 16
+    n_substeps: int = 10
+    num_threads: Optional[int] = None
+    num_steps: int = 200
+    port: int = 16200
+
+
+def dh_arm_with_actuators(path: Path) -> str:
+    actuators = "".join(f'<position joint="joint{i}" kp="100"/>' for i in range(1, 7))
+    # the bare arm has almost no inertia, armature and damping keep it stable
+    xml = (
+        dh_arm_xml()
+        .replace(
+            "<mujoco>", '<mujoco><default><joint armature="0.1" damping="5"/></default>'
+        )
+        .replace("</mujoco>", f"<actuator>{actuators}</actuator></mujoco>")
+    )
+    path.write_text(xml)
+    return str(path)
+
+
+def serve(server) -> threading.Thread:
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    return thread
+
+
+def main(args: Args) -> None:
+    tmp = tempfile.TemporaryDirectory()
+    xml = args.xml
+    if xml is None:
+        if MENAGERIE_UR5E.exists():
+            xml = str(MENAGERIE_UR5E)
+        else:
+            xml = dh_arm_with_actuators(Path(tmp.name) / "ur5e_dh.xml")
+
+    batched = BatchedMujocoRobotServer(
+        xml,
+        num_envs=args.num_envs,
+        n_substeps=args.n_substeps,
+        num_threads=args.num_threads,
+        port=args.port,
+    )
+    num_dofs = batched.num_dofs()
+    commands = np.random.default_rng(0).uniform(
+        -0.5, 0.5, (args.num_steps, args.num_envs, num_dofs)
+    )
+
+    thread = serve(batched)
+    client = ZMQClientRobot(port=args.port)
+    client.step(commands[0])
+    start = time.perf_counter()
+    for command in commands:
+        client.step(command)
+    batched_time = time.perf_counter() - start
+    client.close()
+    batched.stop()
+    thread.join()
+    batched.close()
+
+    servers = [
+        MujocoRobotServer(
+            xml,
+            port=args.port + 1 + i,
+            headless=True,
+            lock_step=True,
+            n_substeps=args.n_substeps,
+        )
+        for i in range(args.num_envs)
+    ]
+    threads = [serve(server) for server in servers]
+    clients = [ZMQClientRobot(port=args.port + 1 + i) for i in range(args.num_envs)]
+    for env, client in enumerate(clients):
+        client.step(commands[0, env])
+    start = time.perf_counter()
+    for command in commands:
+        for env, client in enumerate(clients):
+            client.step(command[env])
+    separate_time = time.perf_counter() - start
+    for client, server, thread in zip(clients, servers, threads):
+        client.close()
+        server.stop()
+        thread.join()
+        server.close()
+
+    env_steps = args.num_steps * args.num_envs
+    print(f"{args.num_envs} envs, {args.n_substeps} substeps, {num_dofs} DOF")
+    for name, elapsed in (("separate", separate_time), ("batched", batched_time)):
+        print(
+            f"{name:>9}: {env_steps / elapsed:9.0f} env steps/s, "
+            f"{elapsed / args.num_steps * 1e3:7.3f} ms per batch"
+        )
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Args))
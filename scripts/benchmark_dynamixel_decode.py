@@ -0,0 +1,136 @@
+"""Microbenchmark of decoding a Dynamixel sync read and packing a sync write.
+
+Compares the per-servo ``isAvailable``/``getData`` and ``DXL_LOBYTE`` path with
+the vectorized ``decode_sync_read``/``pack_sync_write`` used by the driver. No
+hardware is needed, the sync read result is filled in by hand.
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import tyro
+from dynamixel_sdk.group_sync_read import GroupSyncRead
+from dynamixel_sdk.group_sync_write import GroupSyncWrite
+from dynamixel_sdk.packet_handler import PacketHandler
+from dynamixel_sdk.robotis_def import DXL_HIBYTE, DXL_HIWORD, DXL_LOBYTE, DXL_LOWORD
+
+from gello.dynamixel.driver import (
+    ADDR_GOAL_POSITION,
+    ADDR_PRESENT_POSITION,
+    ADDR_PRESENT_VELOCITY,
+    GOAL_POSITION_DTYPE,
+    LEN_GOAL_POSITION,
+    LEN_PRESENT_POSITION,
+    LEN_PRESENT_VELOCITY,
+    POSITION_TO_RAD,
+    STATE_DTYPE,
+    decode_sync_read,
+    pack_sync_write,
+)
+
+
+@dataclass
+class Args:
+    num_servos: int = 8
+    iterations: int = 20000
+
+
+def _measure(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(args: Args) -> None:
+    ids = list(range(1, args.num_servos + 1))
+    packet_handler = PacketHandler(2.0)
+    sync_read = GroupSyncRead(
+        None,
+        packet_handler,
+        ADDR_PRESENT_VELOCITY,
+        LEN_PRESENT_VELOCITY + LEN_PRESENT_POSITION,
+    )
+    state = np.zeros(args.num_servos, STATE_DTYPE)
+    state["velocity"] = np.random.randint(-1000, 1000, args.num_servos)
+    state["position"] = np.random.randint(-4096, 4096, args.num_servos)
+    for dxl_id, block in zip(ids, state):
+        sync_read.addParam(dxl_id)
+        sync_read.data_dict[dxl_id] = list(block.tobytes())
+    sync_read.last_result = True
+
+    def per_servo_decode():
+        angles = np.zeros(len(ids), dtype=int)
+        velocities = np.zeros(len(ids), dtype=int)
+        for i, dxl_id in enumerate(ids):
+            if sync_read.isAvailable(
+                dxl_id, ADDR_PRESENT_VELOCITY, LEN_PRESENT_VELOCITY
+            ):
+                velocity = sync_read.getData(
+                    dxl_id, ADDR_PRESENT_VELOCITY, LEN_PRESENT_VELOCITY
+                )
+                if velocity > 0x7FFFFFFF:
+                    velocity -= 0x100000000
+                velocities[i] = velocity
+            if sync_read.isAvailable(
+                dxl_id, ADDR_PRESENT_POSITION, LEN_PRESENT_POSITION
+            ):
+                angle = sync_read.getData(
+                    dxl_id, ADDR_PRESENT_POSITION, LEN_PRESENT_POSITION
+                )
+                if angle > 0x7FFFFFFF:
+                    angle -= 0x100000000
+                angles[i] = angle
+        return angles, velocities
+
+    out = np.zeros(args.num_servos, STATE_DTYPE)
+
+    def vectorized_decode():
+        return decode_sync_read(sync_read.data_dict.values(), out)
+
+    expected, _ = per_servo_decode()
+    assert np.array_equal(vectorized_decode()["position"], expected)
+
+    sync_write = GroupSyncWrite(
+        None, packet_handler, ADDR_GOAL_POSITION, LEN_GOAL_POSITION
+    )
+    joint_angles = np.random.uniform(-np.pi, np.pi, args.num_servos)
+
+    def per_servo_pack():
+        for dxl_id, angle in zip(ids, joint_angles):
+            value = int(angle * 2048 / np.pi)
+            sync_write.addParam(
+                dxl_id,
+                [
+                    DXL_LOBYTE(DXL_LOWORD(value)),
+                    DXL_HIBYTE(DXL_LOWORD(value)),
+                    DXL_LOBYTE(DXL_HIWORD(value)),
+                    DXL_HIBYTE(DXL_HIWORD(value)),
+                ],
+            )
+        sync_write.makeParam()
+        param = sync_write.param
+        sync_write.clearParam()
+        return param
+
+    goal = np.zeros(args.num_servos, GOAL_POSITION_DTYPE)
+    goal["id"] = ids
+
+    def vectorized_pack():
+        return pack_sync_write(goal, joint_angles / POSITION_TO_RAD)
+
+    assert bytes(per_servo_pack()) == vectorized_pack()
+
+    print(f"{args.num_servos} servos, us per call")
+    for name, fn in [
+        ("per-servo decode", per_servo_decode),
+        ("vectorized decode", vectorized_decode),
+        ("per-servo pack", per_servo_pack),
+        ("vectorized pack", vectorized_pack),
+    ]:
+        print(f"{name:<20} {_measure(fn, args.iterations):8.2f}")
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Args))
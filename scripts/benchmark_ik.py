@@ -0,0 +1,116 @@
+"""Compare the teleop IK solvers on a joint trajectory.
+
+Each tick takes the flange pose of the next frame as the target and solves
+from the current frame's joints, like the spacemouse and Quest agents do. The
+"dm_control" path is what the agents used before: a physics step for FK, then
+``qpos_from_site_pose`` with tol=1e-14 and 400 steps, then a physics reset.
+
+Without --episode a smooth random trajectory is used. Without the Menagerie
+submodule, --model dh builds a UR5e from its DH parameters.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import tyro
+from dm_control import mjcf
+from dm_control.utils.inverse_kinematics import qpos_from_site_pose
+
+from gello.agents.spacemouse_agent import make_ik_solver
+from gello.data_utils.format_obs import load_episode
+from gello.dm_control_tasks.arms.kinematics import (
+    InverseKinematics,
+    dh_arm_xml,
+    make_ur_seeds,
+)
+
+SITE = "attachment_site"
+JOINTS = [f"joint{i}" for i in range(1, 7)]
+
+
+@dataclass
+class Args:
+    model: str = "ur5e"
+    """"ur5e" for the Menagerie model (as the agents use it), "dh" for a model
+    built from DH parameters."""
+    episode: Optional[str] = None
+    """episode.h5 of a recorded UR demo, its joint_positions are the trajectory."""
+    num_frames: int = 500
+    seed: int = 0
+
+
+def make_trajectory(args: Args) -> np.ndarray:
+    if args.episode is not None:
+        return load_episode(args.episode)["joint_positions"][:, :6]
+    random = np.random.RandomState(args.seed)
+    home = np.array([0.0, -1.57, 1.57, -1.57, -1.57, 0.0])
+    t = np.linspace(0, 2 * np.pi, args.num_frames)[:, None]
+    phases = random.uniform(0, 2 * np.pi, 6)
+    return home + 0.5 * np.sin(t * random.uniform(0.5, 2.0, 6) + phases)
+
+
+def make_physics(args: Args) -> mjcf.Physics:
+    if args.model == "dh":
+        return mjcf.Physics.from_xml_string(dh_arm_xml())
+    from gello.dm_control_tasks.arms.ur5e import UR5e
+
+    return mjcf.Physics.from_mjcf_model(UR5e().mjcf_model)
+
+
+def make_solver(args: Args) -> InverseKinematics:
+    if args.model == "dh":
+        return InverseKinematics.from_xml_string(
+            dh_arm_xml(), SITE, JOINTS, seeds=make_ur_seeds(np.eye(4))
+        )
+    return make_ik_solver("ur5")
+
+
+def report(name: str, times: np.ndarray, successes: np.ndarray) -> None:
+    times = times * 1e3
+    print(
+        f"{name:<12} success {successes.mean() * 100:6.1f}%  "
+        f"p50 {np.percentile(times, 50):7.3f} ms  "
+        f"p99 {np.percentile(times, 99):7.3f} ms  max {times.max():7.3f} ms"
+    )
+
+
+def main(args: Args) -> None:
+    trajectory = make_trajectory(args)
+    solver = make_solver(args)
+    targets = [solver.ee_pos_quat(q) for q in trajectory[1:]]
+    num_ticks = len(targets)
+    print(f"{num_ticks} ticks on the {args.model} model")
+
+    physics = make_physics(args)
+    times = np.zeros(num_ticks)
+    successes = np.zeros(num_ticks, dtype=bool)
+    for i, target in enumerate(targets):
+        start = time.perf_counter()
+        physics.data.qpos[:6] = trajectory[i]
+        physics.step()
+        result = qpos_from_site_pose(
+            physics,
+            SITE,
+            target_pos=target[:3],
+            target_quat=target[3:],
+            tol=1e-14,
+            max_steps=400,
+        )
+        physics.reset()
+        times[i] = time.perf_counter() - start
+        successes[i] = result.success
+    report("dm_control", times, successes)
+
+    for i, target in enumerate(targets):
+        start = time.perf_counter()
+        solver.ee_pose(trajectory[i])
+        result = solver.solve(target[:3], target[3:], trajectory[i])
+        times[i] = time.perf_counter() - start
+        successes[i] = result.success
+    report("dls", times, successes)
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Args))
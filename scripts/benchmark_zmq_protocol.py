@@ -0,0 +1,64 @@
+"""Microbenchmark of ZMQ robot round-trip latency for each wire protocol."""
+
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import tyro
+
+from gello.robots.robot import PrintRobot
+from gello.zmq_core.robot_node import ZMQClientRobot, ZMQServerRobot
+
+
+@dataclass
+class Args:
+    port: int = 6100
+    hostname: str = "127.0.0.1"
+    num_dofs: int = 14
+    """14 matches a bimanual arm with grippers."""
+    iterations: int = 5000
+    warmup: int = 200
+
+
+def _measure(fn, iterations: int, warmup: int) -> np.ndarray:
+    for _ in range(warmup):
+        fn()
+    times = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    return times * 1e6
+
+
+def main(args: Args) -> None:
+    server = ZMQServerRobot(
+        PrintRobot(args.num_dofs, dont_print=True), port=args.port, host=args.hostname
+    )
+    server_thread = threading.Thread(target=server.serve, daemon=True)
+    server_thread.start()
+
+    joints = np.random.uniform(-np.pi, np.pi, args.num_dofs)
+    print(f"{'protocol':<8} {'method':<20} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+    for protocol in ("pickle", "binary"):
+        client = ZMQClientRobot(port=args.port, host=args.hostname, protocol=protocol)
+        calls = {
+            "command_joint_state": lambda: client.command_joint_state(joints),
+            "get_observations": client.get_observations,
+            "step": lambda: client.step(joints),
+        }
+        for name, fn in calls.items():
+            times = _measure(fn, args.iterations, args.warmup)
+            print(
+                f"{protocol:<8} {name:<20} {np.percentile(times, 50):8.1f} "
+                f"{np.percentile(times, 99):8.1f} {times.max():8.1f}"
+            )
+        client.close()
+
+    server.stop()
+    server_thread.join()
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Args))